@@ -0,0 +1,131 @@
+# 비교용 청커 (고정 크기 / FastCDC / Rabin)
+#   모두 (offset, length) 레코드를 순서대로 생성하며, 청크는 빈틈 없이 입력 전체를 덮는다
+#   롤링 해시는 창 안의 바이트로만 결정되므로 전체 위치의 해시를 NumPy로 한 번에 계산한 뒤
+#   청크 시작점마다 조건을 만족하는 첫 후보를 이분 탐색으로 찾는다 (구현은 NumPy, 순수 C 구현보다 느림)
+
+import numpy as np
+from typing import Iterator, Tuple
+
+BLOCK = 256 * 1024          # 해시를 계산하는 구간 크기 (캐시에 맞춤)
+
+# ------------------------- 고정 크기 -------------------------
+def iter_fixed(buf, size: int) -> Iterator[Tuple[int, int]]:
+    n = len(buf)
+    for off in range(0, n, size):
+        yield off, min(size, n - off)
+
+# ------------------------- 공통: 후보 위치로 컷 찾기 -------------------------
+def _walk(n: int, strict: np.ndarray, loose: np.ndarray,
+          min_size: int, normal_size: int, max_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    청크 시작점 off마다
+      - [off+min, off+normal) 에서 strict 후보가 있으면 그 위치에서 컷
+      - 없으면 [off+normal, off+max) 에서 loose 후보
+      - 그래도 없으면 max (또는 입력 끝)
+    strict / loose: 조건을 만족하는 위치(청크의 마지막 바이트) 오름차순 배열
+    """
+    off = 0
+    while off < n:
+        end = min(off + max_size, n)
+        lo, mid = off + min_size - 1, min(off + normal_size - 1, end)
+        cut = None
+        j = np.searchsorted(strict, lo)
+        if j < len(strict) and strict[j] < mid:
+            cut = int(strict[j])
+        else:
+            j = np.searchsorted(loose, mid)
+            if j < len(loose) and loose[j] < end:
+                cut = int(loose[j])
+        if cut is None:
+            cut = end - 1
+        yield off, cut - off + 1
+        off = cut + 1
+
+# ------------------------- FastCDC -------------------------
+# Xia et al., "FastCDC" (USENIX ATC '16): gear 해시 + normalized chunking (level 2)
+#   gear 해시 h = (h << 1) + GEAR[b] 는 32비트에서 마지막 32바이트로만 결정된다
+GEAR = np.random.default_rng(0x5EED).integers(0, 2 ** 32, 256, dtype=np.uint64).astype(np.uint32)
+GEAR_SPAN = 32
+
+def _gear_hashes(x: np.ndarray) -> np.ndarray:
+    n = len(x)
+    out = np.empty(n, dtype=np.uint32)
+    g = GEAR[x]
+    for a in range(0, n, BLOCK):
+        lo = max(0, a - GEAR_SPAN + 1)
+        seg = g[lo:a + BLOCK]
+        h = np.zeros(len(seg), dtype=np.uint32)
+        for k in range(GEAR_SPAN):
+            h[k:] += seg[:len(seg) - k] << np.uint32(k)
+        out[a:a + BLOCK] = h[a - lo:]
+    return out
+
+def _top_mask(bits: int) -> np.uint32:
+    """상위 bits개 비트 마스크 (상위 비트일수록 창 안의 더 많은 바이트가 섞여 있음)"""
+    bits = max(1, min(bits, 32))
+    return np.uint32(((1 << bits) - 1) << (32 - bits))
+
+def iter_fastcdc(buf, min_size: int, avg_size: int, max_size: int,
+                 level: int = 2) -> Iterator[Tuple[int, int]]:
+    x = np.frombuffer(buf, dtype=np.uint8)
+    if len(x) == 0:
+        return
+    bits = avg_size.bit_length() - 1
+    h = _gear_hashes(x)
+    strict = np.flatnonzero((h & _top_mask(bits + level)) == 0)
+    loose = np.flatnonzero((h & _top_mask(bits - level)) == 0)
+    yield from _walk(len(x), strict, loose, max(min_size, GEAR_SPAN), avg_size, max_size)
+
+# ------------------------- Rabin -------------------------
+# LBFS 방식 Rabin fingerprint: 48바이트 창을 GF(2)에서 기약다항식 POLY로 나눈 나머지
+#   fingerprint는 창의 바이트에 대해 선형이므로 fp = XOR_k T[k][창의 k번째 바이트]
+#   두 바이트씩 묶은 65536-entry 테이블로 gather 횟수를 절반으로 줄인다
+POLY = 0x3DA3358B4DC173     # 53차 기약다항식
+RABIN_WIN = 48
+_rabin_tables = None
+
+def _mulx8(v: int) -> int:
+    deg = POLY.bit_length() - 1
+    for _ in range(8):
+        v <<= 1
+        if v >> deg & 1:
+            v ^= POLY
+    return v
+
+def _pair_tables() -> np.ndarray:
+    global _rabin_tables
+    if _rabin_tables is None:
+        row, single = list(range(256)), []
+        for _ in range(RABIN_WIN):
+            single.append(np.array(row, dtype=np.uint64))
+            row = [_mulx8(v) for v in row]
+        # 쌍 (앞 바이트, 뒤 바이트) → 두 바이트의 기여를 합친 값
+        _rabin_tables = np.stack([(single[2 * j + 1][:, None] ^ single[2 * j][None, :]).ravel()
+                                  for j in range(RABIN_WIN // 2)])
+    return _rabin_tables
+
+def _rabin_hashes(x: np.ndarray) -> np.ndarray:
+    n = len(x)
+    tables = _pair_tables()
+    pair = np.zeros(n, dtype=np.uint16)
+    pair[0] = x[0]
+    pair[1:] = (x[:-1].astype(np.uint16) << 8) | x[1:]
+    out = np.empty(n, dtype=np.uint64)
+    for a in range(0, n, BLOCK):
+        lo = max(0, a - RABIN_WIN)
+        seg = pair[lo:a + BLOCK]
+        h = np.zeros(len(seg), dtype=np.uint64)
+        for j in range(RABIN_WIN // 2):
+            h[2 * j:] ^= tables[j][seg[:len(seg) - 2 * j]]
+        out[a:a + BLOCK] = h[a - lo:]
+    return out
+
+def iter_rabin(buf, min_size: int, avg_size: int, max_size: int) -> Iterator[Tuple[int, int]]:
+    """fp의 하위 bits 비트가 모두 1이면 컷, 2^bits ≈ avg - min 이 되도록 bits를 정함"""
+    x = np.frombuffer(buf, dtype=np.uint8)
+    if len(x) == 0:
+        return
+    bits = max(avg_size - min_size, 2).bit_length() - 1
+    mask = np.uint64((1 << bits) - 1)
+    cand = np.flatnonzero((_rabin_hashes(x) & mask) == mask)
+    yield from _walk(len(x), cand, cand, max(min_size, RABIN_WIN), max_size, max_size)
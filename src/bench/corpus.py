@@ -0,0 +1,80 @@
+# 벤치마크용 입력: 기준 이미지 + 편집(삽입/삭제/덮어쓰기)을 누적 적용한 버전들
+#   같은 seed면 항상 같은 바이트가 나오므로 결과를 실행 사이에 비교할 수 있다
+#   기준 이미지는 실제 파일(앞부분)을 쓰거나, 없으면 텍스트 / 난수 / 반복 / 0 구간을 섞어 만든다
+
+import random
+import numpy as np
+
+EDIT_KINDS = ("insert", "delete", "overwrite")
+WORDS = 2048                # 텍스트 구간에 쓰는 단어 수
+SEGMENT_MIN = 4 * 1024      # 합성 이미지 구간 크기 범위
+SEGMENT_MAX = 256 * 1024
+
+def _text(rng: np.random.Generator, vocab, size: int) -> bytes:
+    # 단어 빈도는 Zipf 분포 → 실제 설정 파일 / 스크립트처럼 잘 압축되고 반복이 많다
+    idx = np.minimum(rng.zipf(1.3, size // 4 + 1), len(vocab)) - 1
+    out = b" ".join(vocab[i] for i in idx)
+    return out[:size]
+
+def synthetic_base(size: int, seed: int) -> bytes:
+    """텍스트 / 난수 / 앞 구간 반복 / 0 구간을 무작위 길이로 이어 붙인 size 바이트"""
+    rng = np.random.default_rng(seed)
+    vocab = [bytes(rng.integers(97, 123, rng.integers(2, 10), dtype=np.uint8)) for _ in range(WORDS)]
+    parts, total = [], 0
+    while total < size:
+        n = int(rng.integers(SEGMENT_MIN, SEGMENT_MAX))
+        kind = rng.choice(4, p=(0.45, 0.35, 0.15, 0.05))
+        if kind == 0:
+            seg = _text(rng, vocab, n)
+        elif kind == 1:
+            seg = rng.bytes(n)
+        elif kind == 2 and parts:                   # 이미지 안의 중복 (같은 파일이 여러 번 들어 있는 경우)
+            seg = parts[int(rng.integers(len(parts)))]
+        else:
+            seg = bytes(n)
+        parts.append(seg)
+        total += len(seg)
+    return b"".join(parts)[:size]
+
+def load_base(path: str, size: int) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(size)
+
+def mutate(data: bytes, edits: int, max_len: int, seed: int):
+    """
+    data에 edits번의 편집을 무작위 위치에 적용한 새 버전과 편집 목록을 반환
+    편집 길이는 1 .. max_len 에서 log-uniform (작은 패치가 많고 큰 변경은 드묾)
+    반환: (새 데이터, [(종류, 위치, 길이), ...])
+    """
+    rng = random.Random(seed)
+    buf = bytearray(data)
+    log = []
+    for _ in range(edits):
+        kind = rng.choice(EDIT_KINDS)
+        ln = max(1, int(round(2 ** rng.uniform(0, max_len.bit_length() - 1))))
+        pos = rng.randrange(len(buf) + 1)
+        if kind == "insert":
+            buf[pos:pos] = rng.randbytes(ln)
+        elif kind == "delete":
+            ln = min(ln, len(buf) - pos)
+            del buf[pos:pos + ln]
+        else:
+            ln = min(ln, len(buf) - pos)
+            buf[pos:pos + ln] = rng.randbytes(ln)
+        log.append((kind, pos, ln))
+    return bytes(buf), log
+
+def versions(base: bytes, count: int, edits: int, max_len: int, seed: int):
+    """
+    base에서 시작해 직전 버전에 편집을 누적 적용한 count개 버전
+    반환: [(데이터, 편집 목록), ...]  (첫 항목은 편집 없는 base)
+    """
+    out = [(base, [])]
+    for v in range(count):
+        data, log = mutate(out[-1][0], edits, max_len, seed * 1000 + v + 1)
+        out.append((data, log))
+    return out
+
+def shifted(base: bytes, shift: int, seed: int) -> bytes:
+    """맨 앞에 shift 바이트를 끼워 넣은 버전 (경계 이동 실험용)"""
+    return random.Random(seed * 7919 + shift).randbytes(shift) + base
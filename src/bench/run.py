@@ -0,0 +1,177 @@
+# 청커 벤치마크: python3 -m bench.run  (src/ 에서 실행)
+#   고정 크기 / FastCDC / Rabin / AE-CDC 두 가지(test1 바이트 극값, test2 gear 해시 극값)를
+#   같은 seed의 합성 코퍼스(기준 이미지 + 편집 누적 버전)에 돌려 JSON으로 기록
+#   - chunking_MBps : 경계 계산 처리량 (해시 / 저장 제외)
+#   - size          : 기준 이미지의 청크 크기 분포
+#   - dedup_ratio   : 모든 버전의 전체 크기 / 고유 청크 크기 합
+#   - reuse_ratio   : 각 버전에서 직전 버전에 이미 있던 청크가 덮는 바이트 비율
+#   - shift_resilience : 맨 앞에 s바이트를 끼워 넣었을 때 기준 이미지 청크를 그대로 재사용하는 비율
+
+import os, sys, json, time, hashlib, statistics
+from bench import baselines, corpus
+from test1.chunkers.ae_cdc_np import iter_ae_cdc
+from test2 import ae_cdc as gear_ae_cdc
+
+SEED = int(os.environ.get("BENCH_SEED", 42))
+SIZE = int(float(os.environ.get("BENCH_SIZE_MB", 16)) * 1024 * 1024)   # 기준 이미지 크기
+BASE = os.environ.get("BENCH_BASE")                 # 기준 이미지로 쓸 파일 (없으면 합성)
+AVG = int(os.environ.get("BENCH_AVG", 64 * 1024))   # 목표 평균 청크 크기
+VERSIONS = int(os.environ.get("BENCH_VERSIONS", 4)) # 편집을 누적한 버전 수
+EDITS = int(os.environ.get("BENCH_EDITS", 32))      # 버전마다 적용하는 편집 수
+EDIT_MAX = int(os.environ.get("BENCH_EDIT_MAX", 8192))   # 편집 하나의 최대 길이
+SHIFTS = [int(s) for s in os.environ.get("BENCH_SHIFTS", "1,7,64,4096").split(",")]
+CHUNKERS = os.environ.get("BENCH_CHUNKERS", "fixed,fastcdc,rabin,ae_cdc_byte,ae_cdc_gear").split(",")
+OUT_PATH = os.environ.get("BENCH_OUT", "metrics/bench_result.json")
+COMPARE = os.environ.get("BENCH_COMPARE")           # 이전 결과 JSON (있으면 변화량 출력)
+
+# 청커 이름 → (buf를 받아 (offset, length)를 생성하는 함수, 기록할 파라미터)
+def registry(avg: int):
+    return {
+        "fixed": (lambda b: baselines.iter_fixed(b, avg), {"size": avg}),
+        "fastcdc": (lambda b: baselines.iter_fastcdc(b, avg // 4, avg, avg * 4),
+                    {"min": avg // 4, "avg": avg, "max": avg * 4, "level": 2}),
+        "rabin": (lambda b: baselines.iter_rabin(b, avg // 4, avg, avg * 4),
+                  {"min": avg // 4, "avg": avg, "max": avg * 4, "window": baselines.RABIN_WIN}),
+        # test1: 바이트 값 극값 (좌 256 / 우 512 창). 컷 지점 바이트는 청크에 포함되지 않음 (coverage < 1)
+        "ae_cdc_byte": (lambda b: iter_ae_cdc(b, min_chunk=avg, max_chunk=avg * 4),
+                        {"min": avg, "max": avg * 4, "left_win": 256, "right_win": 512}),
+        # test2: gear 해시 좌측창 극값 (container_dedup과 같은 MIN/AVG/MAX 비율)
+        "ae_cdc_gear": (lambda b: gear_ae_cdc.iter_chunks_fast(memoryview(b), avg // 2, avg, avg * 2,
+                                                               win_left=256, mode="max"),
+                        {"min": avg // 2, "avg": avg, "max": avg * 2, "win_left": 256, "mode": "max"}),
+    }
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0
+    k = max(int(-(-q * len(sorted_values) // 100)) - 1, 0)
+    return sorted_values[min(k, len(sorted_values) - 1)]
+
+def chunk_list(fn, data: bytes):
+    """(청크 목록, 경계 계산 시간)"""
+    t = time.perf_counter()
+    chunks = [(int(o), int(n)) for o, n in fn(data)]
+    return chunks, time.perf_counter() - t
+
+def digests(data: bytes, chunks):
+    view = memoryview(data)
+    return [(hashlib.sha256(view[o:o + n]).digest(), n) for o, n in chunks]
+
+def reused_bytes(entries, known) -> int:
+    return sum(n for d, n in entries if d in known)
+
+def size_summary(chunks, total: int):
+    sizes = sorted(n for _, n in chunks)
+    return {
+        "count": len(sizes),
+        "mean": round(statistics.fmean(sizes), 1) if sizes else 0.0,
+        "stdev": round(statistics.pstdev(sizes), 1) if sizes else 0.0,
+        "min": sizes[0] if sizes else 0,
+        "p50": percentile(sizes, 50),
+        "p95": percentile(sizes, 95),
+        "max": sizes[-1] if sizes else 0,
+        "coverage": round(sum(sizes) / total, 6) if total else 0.0,
+    }
+
+def bench_chunker(fn, inputs, shifted):
+    """inputs: [(데이터, 편집 목록), ...] (0번 = 기준), shifted: {s: 데이터}"""
+    elapsed, nbytes = 0.0, 0
+    per_version, unique, logical = [], {}, 0
+    prev = None
+    for i, (data, log) in enumerate(inputs):
+        chunks, t = chunk_list(fn, data)
+        elapsed += t; nbytes += len(data); logical += len(data)
+        entries = digests(data, chunks)
+        for d, n in entries:
+            unique[d] = n
+        if i == 0:
+            base_chunks, base_set = chunks, {d for d, _ in entries}
+        else:
+            per_version.append({
+                "size": len(data),
+                "edits": len(log),
+                "chunks": len(chunks),
+                "reuse_ratio": round(reused_bytes(entries, prev) / len(data), 4) if data else 0.0,
+            })
+        prev = {d for d, _ in entries}
+
+    resilience = {}
+    for s, data in shifted.items():
+        chunks, t = chunk_list(fn, data)
+        elapsed += t; nbytes += len(data)
+        resilience[str(s)] = round(reused_bytes(digests(data, chunks), base_set) / len(data), 4)
+
+    unique_bytes = sum(unique.values())
+    return {
+        "chunking_MBps": round(nbytes / 1024 / 1024 / (elapsed + 1e-9), 2),
+        "size": size_summary(base_chunks, len(inputs[0][0])),
+        "dedup_ratio": round(logical / unique_bytes, 4) if unique_bytes else 0.0,
+        "unique_bytes": unique_bytes,
+        "mean_reuse_ratio": round(statistics.fmean(v["reuse_ratio"] for v in per_version), 4) if per_version else 0.0,
+        "versions": per_version,
+        "shift_resilience": resilience,
+    }
+
+def build_corpus():
+    base = corpus.load_base(BASE, SIZE) if BASE else corpus.synthetic_base(SIZE, SEED)
+    inputs = corpus.versions(base, VERSIONS, EDITS, EDIT_MAX, SEED)
+    shifted = {s: corpus.shifted(base, s, SEED) for s in SHIFTS}
+    info = {
+        "seed": SEED,
+        "source": BASE or "synthetic",
+        "base_size": len(base),
+        "versions": [{"size": len(d), **{k: sum(1 for e in log if e[0] == k) for k in corpus.EDIT_KINDS},
+                      "edited_bytes": sum(e[2] for e in log)} for d, log in inputs[1:]],
+        "shifts": SHIFTS,
+    }
+    return inputs, shifted, info
+
+def compare(prev, cur):
+    """이전 결과 대비 처리량 / dedup 변화 출력 (회귀 추적용)"""
+    if prev.get("corpus") != cur["corpus"] or prev.get("config", {}).get("avg") != cur["config"]["avg"]:
+        print("  [!] corpus or avg differs from the previous run, dedup numbers are not comparable")
+    for name, r in cur["chunkers"].items():
+        p = prev.get("chunkers", {}).get(name)
+        if p is None:
+            continue
+        dv = (r["chunking_MBps"] / p["chunking_MBps"] - 1) * 100 if p["chunking_MBps"] else 0.0
+        print(f"  {name:12s} MB/s {p['chunking_MBps']:.2f} → {r['chunking_MBps']:.2f} ({dv:+.1f}%), "
+              f"dedup {p['dedup_ratio']:.4f} → {r['dedup_ratio']:.4f}")
+
+def main():
+    table = registry(AVG)
+    unknown = [c for c in CHUNKERS if c not in table]
+    if unknown:
+        sys.exit(f"unknown chunker(s): {', '.join(unknown)} (choose from {', '.join(table)})")
+
+    t0 = time.time()
+    inputs, shifted, info = build_corpus()
+    print(f"[*] Corpus: {info['source']} {info['base_size']/1024/1024:.2f} MB, "
+          f"{VERSIONS} versions x {EDITS} edits, seed={SEED} ({time.time() - t0:.2f} s)")
+
+    results = {}
+    for name in CHUNKERS:
+        fn, params = table[name]
+        r = bench_chunker(fn, inputs, shifted)
+        results[name] = {"params": params, **r}
+        sz = r["size"]
+        print(f"[+] {name:12s} {r['chunking_MBps']:8.2f} MB/s, chunks {sz['count']:,} (mean {sz['mean']/1024:.1f} KiB, "
+              f"p95 {sz['p95']/1024:.1f} KiB), dedup {r['dedup_ratio']:.3f}, reuse {r['mean_reuse_ratio']:.3f}, "
+              f"shift {' '.join(f'{s}:{v:.2f}' for s, v in r['shift_resilience'].items())}")
+
+    report = {
+        "config": {"avg": AVG, "versions": VERSIONS, "edits": EDITS, "edit_max": EDIT_MAX, "chunkers": CHUNKERS},
+        "corpus": info,
+        "chunkers": results,
+    }
+    if COMPARE:
+        with open(COMPARE, "r") as f:
+            print(f"[*] Compared with {COMPARE}")
+            compare(json.load(f), report)
+    os.makedirs(os.path.dirname(OUT_PATH) or ".", exist_ok=True)
+    with open(OUT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[+] Wrote {OUT_PATH}")
+
+if __name__ == "__main__":
+    main()
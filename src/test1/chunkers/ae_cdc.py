@@ -6,8 +6,15 @@ def ae_cdc(
     left_win: int = 256,
     right_win: int = 512,
     min_chunk: int = 512 * 1024,        # 0.5 MB
-    max_chunk: int = 8 * 1024 * 1024    # 8 MB
+    max_chunk: int = 8 * 1024 * 1024,   # 8 MB
+    engine: str = "deque"               # "deque" 또는 "numpy"
 ) -> List[Tuple[int, int]]:
+    if engine == "numpy":
+        from chunkers.ae_cdc_np import ae_cdc_np
+        return ae_cdc_np(stream, left_win, right_win, min_chunk, max_chunk)
+    if engine != "deque":
+        raise ValueError(f"unknown AE-CDC engine: {engine}")
+
     n = len(stream)
     chunks, start = [], 0
     left, right = deque(), deque()
@@ -0,0 +1,167 @@
+import mmap
+import numpy as np
+from typing import Iterator, List, Tuple
+
+BLOCK_MIN = 4 * 1024        # 첫 후보 구간 크기 (컷은 보통 min_chunk 직후에 나옴)
+BLOCK_MAX = 1024 * 1024     # 후보 구간 최대 크기
+READ_SIZE = 4 * 1024 * 1024 # file object 입력 시 한 번에 읽는 크기
+
+def _window_max(x: np.ndarray, w: int) -> np.ndarray:
+    """
+    x[k:k+w]의 최댓값 (k = 0 .. len(x)-w)
+    블록 단위 prefix/suffix max (van Herk / Gil-Werman)로 O(n) 계산
+    """
+    m = len(x) - w + 1
+    if m <= 0:
+        return np.empty(0, dtype=x.dtype)
+    nb = -(-len(x) // w)
+    padded = np.zeros(nb * w, dtype=x.dtype)
+    padded[:len(x)] = x
+    blocks = padded.reshape(nb, w)
+    pre = np.maximum.accumulate(blocks, axis=1).ravel()
+    suf = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suf[:m], pre[w - 1:w - 1 + m])
+
+def _cut_mask(x: np.ndarray, a: int, e: int, start: int, right_lo: int,
+              left_win: int, right_win: int) -> np.ndarray:
+    """
+    위치 i in [a, e)가 극값 조건을 만족하는지 배열 비교로 판정
+      - 좌측 창: [max(start, i-left_win+1), i]
+      - 우측 창: [max(min(i, T)+1, right_lo), min(i+right_win, n-1)],  T = n-right_win-1
+    바이트 값은 0 이상이므로 창 밖은 0으로 채워도 최댓값이 바뀌지 않고,
+    빈 창(최댓값 0)은 항상 통과한다 (deque 버전의 `not right`와 동일)
+    """
+    n = len(x)
+    t = n - right_win - 1
+    v = x[a:e]
+
+    # 좌측 창 최댓값
+    base = max(start, a - left_win + 1)
+    xl = x[base:e]
+    lpad = left_win - 1 - (a - base)
+    if lpad:
+        xl = np.concatenate((np.zeros(lpad, dtype=x.dtype), xl))
+    ok = v >= _window_max(xl, left_win)
+
+    # 우측 창 최댓값
+    rmax = np.zeros(e - a, dtype=x.dtype)
+    e1 = min(e, t + 1)
+    if e1 > a:                          # i <= T: 창이 매 스텝 한 칸씩 밀림
+        xr = x[a + 1:e1 + right_win]
+        if right_lo > a + 1:            # 최대 크기 컷 직후: 우측 창이 비어서 다시 채워지는 중
+            xr = xr.copy()
+            xr[:right_lo - (a + 1)] = 0
+        rmax[:e1 - a] = _window_max(xr, right_win)
+    t1 = max(a, t + 1)
+    if e > t1:                          # i > T: 창이 더 이상 갱신되지 않음
+        lo = max(t + 1, right_lo)
+        rmax[t1 - a:] = x[lo:n].max() if lo < n else 0
+    return ok & (v >= rmax)
+
+class _Reader:
+    """
+    청킹 대상 바이트를 구간 단위로 제공
+      - bytes / bytearray / mmap: 복사 없이 전체를 NumPy 뷰로 노출 (필요한 페이지만 읽힘)
+      - file object: 크기가 고정된 버퍼에 read()로 채우며, start 이전 바이트는 버림
+    """
+    def __init__(self, src, cap: int, read_size: int):
+        if hasattr(src, "read") and not isinstance(src, mmap.mmap):
+            self.f = src
+            self.buf = np.empty(cap, dtype=np.uint8)
+            self.base, self.fill, self.eof = 0, 0, False
+            self.read_size = read_size
+        else:
+            self.f = None
+            self.buf = np.frombuffer(src, dtype=np.uint8)
+            self.base, self.fill, self.eof = 0, len(self.buf), True
+
+    def window(self, start: int, need: int) -> Tuple[np.ndarray, int, bool]:
+        """절대 위치 [start, need)를 포함하는 (배열, 배열 시작 위치, EOF 여부) 반환"""
+        if self.base + self.fill < need and not self.eof:
+            keep = self.base + self.fill - start
+            self.buf[:keep] = self.buf[start - self.base:self.fill]
+            self.base, self.fill = start, keep
+            while self.base + self.fill < need:
+                data = self.f.read(min(self.read_size, len(self.buf) - self.fill))
+                if not data:
+                    self.eof = True
+                    break
+                self.buf[self.fill:self.fill + len(data)] = np.frombuffer(data, dtype=np.uint8)
+                self.fill += len(data)
+        return self.buf[:self.fill], self.base, self.eof
+
+def iter_ae_cdc(
+    src,
+    left_win: int = 256,
+    right_win: int = 512,
+    min_chunk: int = 512 * 1024,        # 0.5 MB
+    max_chunk: int = 8 * 1024 * 1024,   # 8 MB
+    read_size: int = READ_SIZE
+) -> Iterator[Tuple[int, int]]:
+    """
+    ae_cdc()와 동일한 컷 지점을 (offset, length) 레코드로 순차 생성
+    청크 사이의 창 상태는 start와 우측 창 하한(right_lo)뿐이므로
+    버퍼를 다시 채워도 이 두 값만 이어 가면 되고,
+    메모리는 max_chunk + right_win + read_size 로 제한된다
+    """
+    reader = _Reader(src, max_chunk + right_win + 1 + read_size, read_size)
+    start, right_lo = 0, 1
+
+    while True:
+        cut = None
+        limit = start + max_chunk               # strong cut 위치
+        a = start + min_chunk
+        block = BLOCK_MIN
+        while a <= limit:
+            e = min(a + block, limit + 1)
+            x, base, eof = reader.window(start, e + right_win)
+            if eof:
+                e = min(e, base + len(x))
+                if a >= e:
+                    break
+            mask = _cut_mask(x, a - base, e - base, start - base, right_lo - base,
+                             left_win, right_win)
+            hit = np.flatnonzero(mask)
+            if len(hit):
+                cut = a + int(hit[0])
+                break
+            a = e
+            block = min(block * 2, BLOCK_MAX)
+
+        if cut is not None:                     # normal cut: 우측 창을 새로 채움
+            yield start, cut - start
+            start = cut + 1
+            right_lo = start + 1
+            continue
+
+        x, base, eof = reader.window(start, limit + 1)
+        n = base + len(x)
+        if limit < n:                           # strong cut: 우측 창을 비움
+            yield start, limit - start
+            start = limit + 1
+            right_lo = start + right_win
+        else:
+            if start < n:
+                yield start, n - start
+            return
+
+def ae_cdc_bounds(
+    stream: bytes,
+    left_win: int = 256,
+    right_win: int = 512,
+    min_chunk: int = 512 * 1024,        # 0.5 MB
+    max_chunk: int = 8 * 1024 * 1024    # 8 MB
+) -> List[Tuple[int, int]]:
+    """ae_cdc()와 동일한 컷 지점을 (start, end) 목록으로 반환"""
+    return [(off, off + ln) for off, ln in
+            iter_ae_cdc(stream, left_win, right_win, min_chunk, max_chunk)]
+
+def ae_cdc_np(
+    stream: bytes,
+    left_win: int = 256,
+    right_win: int = 512,
+    min_chunk: int = 512 * 1024,        # 0.5 MB
+    max_chunk: int = 8 * 1024 * 1024    # 8 MB
+) -> List[bytes]:
+    bounds = ae_cdc_bounds(stream, left_win, right_win, min_chunk, max_chunk)
+    return [stream[s:e] for s, e in bounds]
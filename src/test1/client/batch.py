@@ -0,0 +1,102 @@
+import hashlib, os
+import requests, urllib3
+from utils.framing import read_header, MISSING
+from utils import chunk_codec
+
+READ_BLOCK = 64 * 1024
+
+
+def fetch_batch(session, server_url, entries, out_dir, by="names", out_name="filename", stats=None):
+    """
+    entries(매니페스트 항목 목록)를 /firmware/batch 한 번으로 받아 out_dir에 저장
+    응답을 프레임 단위로 읽으면서 바로 파일에 쓰고 SHA-256을 누적 계산해 검증
+    검증을 통과한 파일만 최종 이름으로 바꾸므로 중간에 끊겨도 덜 받은 파일이 남지 않는다
+    by: "names"(파일명으로 요청) 또는 "digests"(sha256으로 요청)
+    out_name: 저장할 이름으로 쓸 항목 키 ("sha256"이면 내용 주소 저장)
+    압축된 청크(meta["codec"])는 받으면서 해제해 원본으로 저장 (stats: chunk_codec 해제 통계, 선택)
+    연결 오류, 응답이 중간에 끊김, 요청하지 않은(또는 이미 받은) 이름의 프레임은 예외 대신 거기서 멈추고
+    아직 받지 못한 항목을 실패로 돌려준다
+    반환: (받은 바이트, 실패한 항목의 파일명 목록)
+    """
+    key = "filename" if by == "names" else "sha256"
+    pending = {}
+    for meta in entries:
+        pending.setdefault(meta[key], []).append(meta)
+    total, failed = 0, []
+    if stats is None:
+        stats = chunk_codec.new_stats()
+
+    try:
+        with session.post(f"{server_url}/firmware/batch", json={by: [m[key] for m in entries]},
+                          stream=True, timeout=30) as r:
+            r.raise_for_status()
+            raw = r.raw
+            while True:
+                head = read_header(raw)
+                if head is None:
+                    break
+                status, name, size = head
+                if not pending.get(name):
+                    break       # 요청하지 않았거나 두 번째로 온 이름: 이후 프레임도 믿을 수 없으므로 중단
+                meta = pending[name].pop(0)
+                if status == MISSING:
+                    failed.append(meta["filename"])
+                    continue
+
+                out_path = os.path.join(out_dir, meta[out_name])
+                tmp_path = out_path + ".part"
+                try:
+                    ok, written = _receive(raw, size, meta, tmp_path, stats)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    pending[name].insert(0, meta)   # 받던 항목도 아래에서 실패로
+                    raise
+                total += size
+                if not ok:
+                    os.remove(tmp_path)
+                    failed.append(meta["filename"])
+                else:
+                    chunk_codec.count_put(stats, chunk_codec.codec_id(meta.get("codec", "none")), written, size)
+                    os.replace(tmp_path, out_path)
+    except (EOFError, ValueError, OSError, requests.RequestException, urllib3.exceptions.HTTPError):
+        pass            # 응답이 중간에 끊기거나 형식이 깨짐: 남은 항목은 아래에서 실패로
+
+    # 응답이 중간에 끝나 받지 못한 항목
+    failed.extend(m["filename"] for ms in pending.values() for m in ms)
+    return total, failed
+
+
+def _receive(raw, size, meta, tmp_path, stats):
+    """
+    프레임 데이터 size바이트를 tmp_path에 쓰면서 (압축 해제 후) 크기와 SHA-256을 검증
+    반환: (검증 통과 여부, 쓴 바이트). 스트림이 프레임 중간에 끝나면 EOFError
+    """
+    codec = chunk_codec.codec_id(meta.get("codec", "none"))
+    dec = chunk_codec.Decoder(codec) if codec else None
+    h, written, ok = hashlib.sha256(), 0, True
+    with open(tmp_path, "wb") as f:
+        left = size
+        while left > 0:
+            b = raw.read(min(READ_BLOCK, left))
+            if not b:
+                raise EOFError(f"batch stream ended inside {meta['filename']}")
+            left -= len(b)
+            if dec is not None and ok:
+                try:
+                    b = chunk_codec.timed_feed(stats, dec, b)
+                except ValueError:
+                    ok = False      # 깨진 압축 데이터: 프레임 나머지는 읽고 버림
+            if ok:
+                f.write(b)
+                h.update(b)
+                written += len(b)
+        if dec is not None and ok:
+            try:
+                b = dec.finish()
+                f.write(b)
+                h.update(b)
+                written += len(b)
+            except ValueError:
+                ok = False
+    return ok and written == meta["size"] and h.hexdigest() == meta["sha256"], written
@@ -0,0 +1,83 @@
+import os, time
+from client.manifest import get_manifest
+from client.batch import fetch_batch
+from client.run_bench import new_session
+from metrics.evaluator import log_delta_metrics
+from utils import chunk_codec
+
+SERVER_URL = "http://127.0.0.1:8000"
+CACHE_DIR = "data/cache"                    # 내용 주소 청크 캐시: <sha256> 파일
+OUTPUT_FILE = "data/reconstructed_delta.bin"
+DELTA_BATCH = int(os.environ.get("DELTA_BATCH", 64))   # 배치 요청 하나에 담을 청크 수
+
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+
+def cache_path(digest):
+    return os.path.join(CACHE_DIR, digest)
+
+
+# 캐시에 없는 청크 (sha256 기준 중복 제거, 매니페스트 순서 유지)
+def missing_chunks(manifest):
+    seen, missing = set(), []
+    for meta in manifest:
+        d = meta["sha256"]
+        if d in seen:
+            continue
+        seen.add(d)
+        if not os.path.exists(cache_path(d)):
+            missing.append(meta)
+    return missing
+
+
+# 빠진 청크만 sha256으로 요청해 캐시에 저장 (압축된 청크는 해제된 원본으로 저장)
+def fetch_missing(session, missing, stats=None):
+    total, failed = 0, []
+    for i in range(0, len(missing), DELTA_BATCH):
+        got, bad = fetch_batch(session, SERVER_URL, missing[i:i + DELTA_BATCH], CACHE_DIR,
+                               by="digests", out_name="sha256", stats=stats)
+        total += got
+        failed += bad
+    return total, failed
+
+
+# 매니페스트 순서대로 캐시의 청크를 이어 붙여 이미지 복원
+def rebuild(manifest, out_path):
+    total = 0
+    with open(out_path, "wb") as out_f:
+        for meta in manifest:
+            with open(cache_path(meta["sha256"]), "rb") as f:
+                data = f.read()
+            if len(data) != meta["size"]:
+                raise ValueError(f"Cached chunk size mismatch for {meta['filename']}")
+            out_f.write(data)
+            total += len(data)
+    return total
+
+
+def main():
+    manifest = get_manifest(SERVER_URL)
+    image_size = sum(m["size"] for m in manifest)
+
+    t0 = time.time()
+    missing = missing_chunks(manifest)
+    unique = len({m["sha256"] for m in manifest})
+    print(f"[*] {len(manifest)} chunks ({unique} unique), {len(missing)} missing from cache "
+          f"({sum(m['size'] for m in missing)/1024/1024:.2f} MB of {image_size/1024/1024:.2f} MB)")
+
+    stats = chunk_codec.new_stats()
+    with new_session(1) as session:
+        transferred, failed = fetch_missing(session, missing, stats)
+    if failed:
+        print(f"[!] {len(failed)} chunks failed: {failed[:5]}")
+        return
+    restored = rebuild(manifest, OUTPUT_FILE)
+    t1 = time.time()
+    print(f"[+] Rebuilt {OUTPUT_FILE} ({restored/1024/1024:.2f} MB)")
+
+    log_delta_metrics(len(manifest), unique, len(missing), image_size, transferred, t0, t1,
+                      chunk_codec.summarize(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from client.manifest import get_manifest
+from client.run_bench import download_file, new_download_stats, new_session
+from metrics.evaluator import log_image_metrics
+
+SERVER_URL = "http://127.0.0.1:8000"
+OUTPUT_FILE = "data/reconstructed.bin"      # restore.py 결과와 같은 이미지
+CONCURRENCY = int(os.environ.get("DIRECT_CONCURRENCY", 8))   # 동시에 받는 청크 수
+
+
+# 매니페스트 순서대로 청크 크기를 누적해 이미지 안의 위치(offset)를 붙임
+def with_offsets(manifest):
+    out, off = [], 0
+    for meta in manifest:
+        out.append({**meta, "offset": off})
+        off += meta["size"]
+    return out, off
+
+
+# 이미지 파일을 전체 크기로 미리 할당 (fallocate가 없으면 ftruncate로 크기만 맞춤)
+def preallocate(fd, size):
+    os.ftruncate(fd, size)
+    if size and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass
+
+
+def download_image(manifest, out_path, concurrency=CONCURRENCY):
+    """
+    매니페스트의 청크를 동시에 받아 out_path 이미지의 최종 위치에 바로 pwrite
+    청크는 받으면서 SHA-256을 검증하므로 받은 뒤 다시 읽지 않고, 완료 순서와 상관없이 제자리에 쓰인다
+    모든 항목이 검증되면 임시 파일을 out_path로 교체
+    반환: (이미지 크기, 검증된 청크 수, 실패한 파일명 목록, 합친 다운로드 통계)
+    """
+    entries, total = with_offsets(manifest)
+    stats = new_download_stats()
+    done = [False] * len(entries)
+
+    tmp_path = out_path + ".part"
+    fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        preallocate(fd, total)
+        with new_session(concurrency) as session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+            def one(meta):
+                st = new_download_stats()
+                try:
+                    return download_file(meta, st, session, image_fd=fd), st
+                except Exception as e:
+                    return e, st
+            futs = {pool.submit(one, meta): i for i, meta in enumerate(entries)}
+            for fut in as_completed(futs):
+                i = futs[fut]
+                res, st = fut.result()
+                for k in stats:
+                    stats[k] += st[k]
+                if isinstance(res, Exception):
+                    print(f"[!] Error {entries[i]['filename']}: {res}")
+                else:
+                    done[i] = True
+
+        # 최종 확인: 매니페스트의 모든 항목이 크기와 해시 검증을 통과했고 이미지 크기가 맞는지
+        failed = [entries[i]["filename"] for i, ok in enumerate(done) if not ok]
+        if os.fstat(fd).st_size != total:
+            failed.append("<image size>")
+        if not failed:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+    if failed:
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, out_path)
+    return total, sum(done), failed, stats
+
+
+def main():
+    manifest = get_manifest(SERVER_URL)
+    print(f"[*] Downloading {len(manifest)} chunks directly into {OUTPUT_FILE} (concurrency={CONCURRENCY})")
+    t0 = time.time()
+    total, verified, failed, stats = download_image(manifest, OUTPUT_FILE)
+    t1 = time.time()
+    if failed:
+        print(f"[!] {len(failed)} chunks failed, image not written: {failed[:5]}")
+    else:
+        print(f"[+] Wrote {OUTPUT_FILE} ({total/1024/1024:.2f} MB, {verified} chunks verified)")
+
+    log_image_metrics(len(manifest), verified, len(failed), total, t0, t1, stats)
+
+
+if __name__ == "__main__":
+    main()
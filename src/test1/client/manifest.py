@@ -1,7 +1,44 @@
-import requests
+import os, requests
+from utils import manifest_bin
+
+CACHE_PATH = "data/manifest_cache.bin"      # 마지막으로 받은 바이너리 매니페스트
+ETAG_PATH = CACHE_PATH + ".etag"
+
+
+def _read_cached():
+    try:
+        with open(CACHE_PATH, "rb") as f:
+            raw = f.read()
+        with open(ETAG_PATH, "r") as f:
+            return raw, f.read().strip()
+    except OSError:
+        return None, None
+
+
+def _write_cached(raw, etag):
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    with open(CACHE_PATH + ".tmp", "wb") as f:
+        f.write(raw)
+    os.replace(CACHE_PATH + ".tmp", CACHE_PATH)
+    with open(ETAG_PATH, "w") as f:
+        f.write(etag or "")
+
 
 def get_manifest(server_url: str):
-    url = f"{server_url}/firmware/manifest"
-    resp = requests.get(url, timeout=5)
+    """
+    바이너리 매니페스트를 받아 [{filename, size, sha256}, ...] 목록으로 반환
+    이전에 받은 사본의 ETag를 If-None-Match로 보내고, 바뀌지 않았으면(304) 사본을 그대로 사용
+    서버에 바이너리 매니페스트가 없으면 JSON으로 받음
+    """
+    raw, etag = _read_cached()
+    headers = {"If-None-Match": etag} if raw is not None and etag else {}
+    resp = requests.get(f"{server_url}/firmware/manifest.bin", headers=headers, timeout=5)
+    if resp.status_code == 404:
+        resp = requests.get(f"{server_url}/firmware/manifest", timeout=5)
+        resp.raise_for_status()
+        return resp.json()
     resp.raise_for_status()
-    return resp.json()
+    if resp.status_code != 304:
+        raw = resp.content
+        _write_cached(raw, resp.headers.get("ETag"))
+    return manifest_bin.Manifest(raw).to_json()
@@ -1,7 +1,9 @@
-import requests, time, os, random, json
+import requests, time, os, random, json, hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from client.manifest import get_manifest
-from utils.hasher import sha256_bytes
 from metrics.evaluator import log_metrics
+from utils import chunk_codec
 
 SERVER_URL = "http://127.0.0.1:8000"
 OUT_DIR = "data/received"
@@ -12,72 +14,266 @@ INTERRUPT_BYTES = 128 * 1024            # 128 KiB 이상 수신 시 인터럽트
 INTERRUPT_RATE = 0.04                   # 약 4% 확률로 중간 인터럽트 발생
 MIN_INTERRUPT_SIZE = 1 * 1024 * 1024    # 1 MiB 이상 파일만 인터럽트 대상
 
-random.seed(42)
+# 재시도 / 이어받기
+MAX_ATTEMPTS = int(os.environ.get("MAX_ATTEMPTS", 5))   # 파일당 최대 시도 횟수
+RESUME = os.environ.get("RESUME", "1") != "0"   # 0이면 재시도마다 처음부터 다시 받음
+RETRY_BACKOFF = float(os.environ.get("RETRY_BACKOFF", 0.05))  # 재시도 대기(s), 시도마다 2배
+MAX_BACKOFF = 1.0
+
+# 동시 다운로드: 수준별로 매니페스트 전체를 받아 비교 (각 수준 = 동시에 진행하는 요청 수 상한)
+CONCURRENCY = [int(x) for x in os.environ.get("CONCURRENCY", "1,4,8").split(",")]
+
+# 실패 주입 난수는 청크마다 (SEED, 파일명)으로 만든다 → 스레드 실행 순서와 무관하게 같은 시나리오
+SEED = 42
 os.makedirs(OUT_DIR, exist_ok=True)
 
 
-def download_file(meta):
+def new_download_stats():
+    # codec별 해제 통계(chunk_codec.new_stats)도 같은 dict에 합산
+    return {"attempts": 0, "retries": 0, "resumes": 0,
+            "bytes_transferred": 0, "resumed_bytes_saved": 0, **chunk_codec.new_stats()}
+
+
+def new_part(meta, size=0, sha=None):
     """
-    서버로부터 개별 파일을 다운로드하며
-    실패 및 인터럽트를 시뮬레이션
+    이어받기 상태: size/sha = 디스크에 쓴 (해제된) 내용, stored = 서버에서 받은 바이트 (Range 위치)
+    압축된 청크는 해제기(dec) 상태가 메모리에만 있으므로 항상 처음(size 0)부터 만든다
     """
-    filename = meta["filename"]
-    url = f"{SERVER_URL}/firmware/file/{filename}"
-    out_path = os.path.join(OUT_DIR, filename)
+    codec = chunk_codec.codec_id(meta.get("codec", "none"))
+    return {"size": size, "stored": size, "sha": sha or hashlib.sha256(),
+            "dec": chunk_codec.Decoder(codec) if codec else None}
+
+
+def _hash_prefix(path, size):
+    """디스크에 있는 앞부분 size 바이트의 해시 (누적 해시와 파일 크기가 어긋난 경우에만 사용)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        left = size
+        while left > 0:
+            b = f.read(min(1024 * 1024, left))
+            if not b:
+                break
+            h.update(b)
+            left -= len(b)
+    return h
+
+
+def new_session(pool_size):
+    """keep-alive 연결을 pool_size개까지 재사용하는 공유 세션"""
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
 
+
+class ImageWriter:
+    """
+    이미지 파일의 정해진 위치부터 pwrite로 이어 쓰는 출력 (파일 객체처럼 write만 제공)
+    청크마다 자기 위치에만 쓰므로 여러 스레드가 같은 fd에 순서와 상관없이 쓸 수 있다
+    """
+    def __init__(self, fd, pos):
+        self.fd, self.pos = fd, pos
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            n = os.pwrite(self.fd, view, self.pos)
+            self.pos += n
+            view = view[n:]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _retryable(e):
+    """연결 오류 / 타임아웃 / 5xx만 다시 시도. 4xx나 잘못된 요청은 다시 보내도 같으므로 바로 실패"""
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code >= 500
+    return isinstance(e, (ConnectionError, requests.ConnectionError, requests.Timeout,
+                          requests.exceptions.ChunkedEncodingError))
+
+
+def _fetch(url, open_out, meta, part, stats, http, rng):
+    """
+    part["stored"] 위치부터 받아 (압축된 청크는 해제하면서) open_out(part)가 연 출력에 이어 쓰고 part["sha"]를 갱신
+    실패 및 인터럽트를 시뮬레이션
+    """
     # 1단계: 인위적 네트워크 실패
-    if random.random() < FAIL_PROB:
+    if rng.random() < FAIL_PROB:
         raise ConnectionError("Simulated network failure")
 
-    with requests.get(url, stream=True, timeout=10) as r:
+    offset = part["stored"]
+    headers = {}
+    if offset:
+        # If-Range: 청크 내용(sha256)과 codec이 그대로일 때만 206, 바뀌었으면 서버가 전체(200)를 보냄
+        etag = chunk_codec.etag(meta["sha256"], meta.get("codec"))
+        headers = {"Range": f"bytes={offset}-", "If-Range": f'"{etag}"'}
+
+    with http.get(url, stream=True, timeout=10, headers=headers) as r:
         r.raise_for_status()
+        if offset and r.status_code != 206:
+            offset = 0
+            part.update(new_part(meta))
+        if offset:
+            stats["resumes"] += 1
+            stats["resumed_bytes_saved"] += offset
 
         total = 0
-        with open(out_path, "wb") as f:
+        with open_out(part) as f:
             for chunk in r.iter_content(chunk_size=8192):
                 if not chunk:
                     continue
-                f.write(chunk)
+                part["stored"] += len(chunk)
                 total += len(chunk)
+                stats["bytes_transferred"] += len(chunk)
+                if part["dec"] is not None:
+                    try:
+                        chunk = chunk_codec.timed_feed(stats, part["dec"], chunk)
+                    except ValueError as e:
+                        part.update(new_part(meta))     # 해제기 상태가 깨졌으므로 처음부터
+                        raise ConnectionError(f"Corrupt compressed chunk: {e}") from e
+                f.write(chunk)
+                part["sha"].update(chunk)
+                part["size"] += len(chunk)
 
-                # 2단계: 인터럽트 발생 조건 체크
+                # 2단계: 인터럽트 발생 조건 체크 (이번 시도에서 받은 양 기준)
                 if total >= INTERRUPT_BYTES:
                     # 파일이 충분히 큰 경우만 후보로
-                    if meta["size"] >= MIN_INTERRUPT_SIZE and random.random() < INTERRUPT_RATE:
+                    if meta["size"] >= MIN_INTERRUPT_SIZE and rng.random() < INTERRUPT_RATE:
                         raise ConnectionAbortedError("Intentional interrupt")
 
-    # 3단계: 데이터 무결성 검증
-    with open(out_path, "rb") as f:
-        data = f.read()
+            if part["dec"] is not None:
+                try:
+                    tail = part["dec"].finish()
+                except ValueError as e:
+                    part.update(new_part(meta))
+                    raise ConnectionError(f"Incomplete compressed chunk: {e}") from e
+                f.write(tail)
+                part["sha"].update(tail)
+                part["size"] += len(tail)
 
-    file_hash = sha256_bytes(data)
-    if file_hash != meta["sha256"]:
-        raise ValueError(f"Hash mismatch for {filename}")
 
-    return len(data)
+def download_file(meta, stats=None, session=None, image_fd=None):
+    """
+    서버로부터 개별 파일을 다운로드하며 실패 및 인터럽트를 시뮬레이션
+    연결 오류 / 타임아웃 / 5xx면 MAX_ATTEMPTS까지 (RETRY_BACKOFF부터 2배씩 기다리며) 다시 시도하고 (4xx는 바로 실패),
+    RESUME이면 디스크에 받아 둔 위치부터 Range로 이어받음
+    SHA-256은 받는 순서대로 누적 계산하므로 이어받아도 받은 부분을 다시 읽지 않는다
+    압축된 청크(meta["codec"])는 받으면서 해제해 원본을 저장하고, 해시와 size도 원본 기준으로 검증
+    image_fd가 있으면 청크 파일 대신 이미지의 meta["offset"] 위치에 바로 pwrite (이어받기 상태는 메모리에만)
+    """
+    if stats is None:
+        stats = new_download_stats()
+    http = session or requests
+    rng = random.Random(f"{SEED}:{meta['filename']}")
+    filename = meta["filename"]
+    url = f"{SERVER_URL}/firmware/file/{filename}"
+    out_path = os.path.join(OUT_DIR, filename)
+    if image_fd is None:
+        # 받은 크기만큼 이어 쓰기, 처음부터 받으면 파일을 비움
+        open_out = lambda part: open(out_path, "ab" if part["size"] else "wb")
+    else:
+        open_out = lambda part: ImageWriter(image_fd, meta["offset"] + part["size"])
 
+    part = new_part(meta)
+    err = None
+    for attempt in range(MAX_ATTEMPTS):
+        stats["attempts"] += 1
+        if attempt:
+            stats["retries"] += 1
+            time.sleep(min(RETRY_BACKOFF * 2 ** (attempt - 1), MAX_BACKOFF))
+        if attempt and image_fd is None:
+            on_disk = os.path.getsize(out_path) if RESUME and os.path.exists(out_path) else 0
+            if on_disk > meta["size"]:
+                on_disk = 0
+            if on_disk != part["size"]:
+                if part["dec"] is not None or not on_disk:
+                    # 압축된 청크는 디스크 크기로 서버 쪽 위치와 해제기 상태를 되살릴 수 없음
+                    part = new_part(meta)
+                else:
+                    part = new_part(meta, on_disk, _hash_prefix(out_path, on_disk))
+        elif attempt and not RESUME:
+            part = new_part(meta)       # 이미지 모드에서 이어받지 않으면 청크 위치에 처음부터 다시 씀
+        try:
+            if part["size"] < meta["size"] or (image_fd is None and not os.path.exists(out_path)):
+                _fetch(url, open_out, meta, part, stats, http, rng)
+        except (ConnectionError, requests.RequestException) as e:
+            if not _retryable(e):
+                raise
+            err = e
+            continue
 
-def main():
-    manifest = get_manifest(SERVER_URL)
-    total_bytes, attempts, errors = 0, 0, 0
+        # 3단계: 데이터 무결성 검증 (누적 해시)
+        if part["size"] == meta["size"] and part["sha"].hexdigest() == meta["sha256"]:
+            # codec별 원본 / 전송된(저장된) 크기 → 압축으로 줄어든 전송량
+            chunk_codec.count_put(stats, chunk_codec.codec_id(meta.get("codec", "none")), part["size"], part["stored"])
+            return part["size"]
+        err = ValueError(f"Hash mismatch for {filename}")
+        part = new_part(meta)
+        if image_fd is None:
+            os.remove(out_path)
+    raise err
+
+
+def _download_one(meta, session):
+    """작업 스레드: 청크 하나를 받고 (크기 또는 예외, 청크별 통계, 지연 시간) 반환"""
+    stats = new_download_stats()
+    t = time.perf_counter()
+    try:
+        res = download_file(meta, stats, session)
+    except Exception as e:
+        res = e
+    return res, stats, time.perf_counter() - t
+
+
+def run_level(manifest, concurrency):
+    """
+    동시 요청 수 상한 concurrency로 매니페스트 전체를 받음
+    반환: 수준별 결과 (받은 바이트, 오류 수, 시간, 청크별 지연, 합친 다운로드 통계)
+    """
+    stats = new_download_stats()
+    total_bytes, errors, latencies = 0, 0, []
 
     t0 = time.time()
-    for meta in manifest:
-        attempts += 1
-        try:
-            size = download_file(meta)
-            total_bytes += size
-            print(f"[+] {meta['filename']} OK ({size/1024/1024:.2f} MB)")
-        except Exception as e:
-            errors += 1
-            print(f"[!] Error {meta['filename']}: {e}")
-            path = os.path.join(OUT_DIR, meta["filename"])
-            if os.path.exists(path):
-                os.remove(path)
+    with new_session(concurrency) as session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futs = {pool.submit(_download_one, meta, session): meta for meta in manifest}
+        for fut in as_completed(futs):
+            meta = futs[fut]
+            res, st, lat = fut.result()
+            for k in stats:
+                stats[k] += st[k]
+            if isinstance(res, Exception):
+                errors += 1
+                print(f"[!] Error {meta['filename']}: {res}")
+                path = os.path.join(OUT_DIR, meta["filename"])
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            total_bytes += res
+            latencies.append(lat)
+            print(f"[+] {meta['filename']} OK ({res/1024/1024:.2f} MB)")
     t1 = time.time()
 
-    log_metrics(len(manifest), total_bytes, t0, t1, attempts, errors)
+    return {"concurrency": concurrency, "total_bytes": total_bytes, "errors": errors,
+            "start_time": t0, "end_time": t1, "latencies": latencies, "stats": stats}
+
+
+def main():
+    manifest = get_manifest(SERVER_URL)
+    levels = []
+    for c in CONCURRENCY:
+        print(f"[*] Downloading {len(manifest)} chunks (concurrency={c})")
+        levels.append(run_level(manifest, c))
+
+    # 전체 항목은 마지막 수준 기준, 수준별 처리량/지연은 concurrency_levels에 기록
+    last = levels[-1]
+    log_metrics(len(manifest), last["total_bytes"], last["start_time"], last["end_time"],
+                last["stats"]["attempts"], last["errors"], last["stats"], levels)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
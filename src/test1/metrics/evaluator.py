@@ -1,7 +1,34 @@
 import os, json, statistics
+from utils import chunk_codec
+
+# 정렬된 값에서 nearest-rank 백분위수
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = max(int(-(-q * len(sorted_values) // 100)) - 1, 0)
+    return sorted_values[min(k, len(sorted_values) - 1)]
+
+
+# 동시성 수준별 처리량 / 청크 지연 요약
+def summarize_level(level):
+    elapsed = level["end_time"] - level["start_time"]
+    lat = sorted(level["latencies"])
+    return {
+        "concurrency": level["concurrency"],
+        "total_bytes": level["total_bytes"],
+        "errors_total": level["errors"],
+        "elapsed_time": round(elapsed, 4),
+        "throughput_MBps": round((level["total_bytes"] / 1024 / 1024) / (elapsed + 1e-9), 2),
+        "chunks_per_s": round(len(lat) / (elapsed + 1e-9), 2),
+        "latency_p50_ms": round(percentile(lat, 50) * 1000, 2),
+        "latency_p95_ms": round(percentile(lat, 95) * 1000, 2),
+        "latency_p99_ms": round(percentile(lat, 99) * 1000, 2),
+        "latency_mean_ms": round(statistics.fmean(lat) * 1000, 2) if lat else 0.0
+    }
+
 
 # 전체 메트릭 저장
-def log_metrics(chunk_count, total_bytes, start_time, end_time, attempts, errors):
+def log_metrics(chunk_count, total_bytes, start_time, end_time, attempts, errors, download_stats=None, levels=None):
     metrics = {
         "chunk_count": chunk_count,
         "total_bytes": total_bytes,
@@ -11,19 +38,39 @@ def log_metrics(chunk_count, total_bytes, start_time, end_time, attempts, errors
         "errors_total": errors,
         "chunking_speed": round(chunk_count / (end_time - start_time + 1e-9), 2)
     }
+    if download_stats is not None:
+        # 이어받기로 절약한 전송량: 처음부터 다시 받았다면 resumed_bytes_saved만큼 더 전송
+        sent, saved = download_stats["bytes_transferred"], download_stats["resumed_bytes_saved"]
+        metrics.update({
+            "retries_total": download_stats["retries"],
+            "resumes_total": download_stats["resumes"],
+            "bytes_transferred": sent,
+            "resumed_bytes_saved": saved,
+            "full_redownload_bytes": sent + saved,
+            "resume_saving_ratio": round(saved / (sent + saved), 4) if sent + saved else 0.0
+        })
+        codecs = chunk_codec.summarize(download_stats)
+        if codecs:
+            metrics["codecs"] = codecs      # 받으면서 해제한 양과 해제 MB/s
+    if levels:
+        metrics["concurrency_levels"] = [summarize_level(lv) for lv in levels]
     with open("metrics/result.json", "w") as f:
         json.dump(metrics, f, indent=2)
     print(json.dumps(metrics, indent=2))
 
 
 # 청킹 결과 저장
-def log_chunk_metrics(count, total_bytes, start_time, end_time):
+def log_chunk_metrics(count, total_bytes, start_time, end_time, codecs=None):
     metrics = {
         "chunk_count": count,
         "total_bytes": total_bytes,
         "chunking_time": round(end_time - start_time, 4),
         "chunking_speed_MBps": round((total_bytes / 1024 / 1024) / (end_time - start_time), 2)
     }
+    if codecs:
+        # codec별 청크 수, 압축 전/후 크기, 압축률(stored/raw), 해제 MB/s (chunk_codec.summarize)
+        metrics["stored_bytes"] = sum(c["stored_bytes"] for c in codecs.values())
+        metrics["codecs"] = codecs
     os.makedirs("metrics", exist_ok=True)
     with open("metrics/chunking_result.json", "w") as f:
         json.dump(metrics, f, indent=2)
@@ -42,3 +89,79 @@ def log_restore_metrics(count, total_bytes, start_time, end_time):
     with open("metrics/restore_result.json", "w") as f:
         json.dump(metrics, f, indent=2)
     print(json.dumps(metrics, indent=2))
+
+
+# 델타 OTA 결과 저장 (캐시에 없는 청크만 받은 양 vs 이미지 크기)
+def log_delta_metrics(chunk_count, unique_chunks, missing_chunks, image_size, bytes_transferred, start_time, end_time, codecs=None):
+    metrics = {
+        "chunk_count": chunk_count,
+        "unique_chunks": unique_chunks,
+        "cached_chunks": unique_chunks - missing_chunks,
+        "missing_chunks": missing_chunks,
+        "image_size": image_size,
+        "bytes_transferred": bytes_transferred,
+        "transfer_ratio": round(bytes_transferred / image_size, 4) if image_size else 0.0,
+        "bytes_saved": image_size - bytes_transferred,
+        "update_time": round(end_time - start_time, 4)
+    }
+    if codecs:
+        metrics["codecs"] = codecs      # 받으면서 해제한 양과 해제 MB/s
+    os.makedirs("metrics", exist_ok=True)
+    with open("metrics/delta_result.json", "w") as f:
+        json.dump(metrics, f, indent=2)
+    print(json.dumps(metrics, indent=2))
+
+# 이미지에 바로 받은 결과 저장 (청크 파일 / 복원 단계 없이)
+def log_image_metrics(chunk_count, verified_chunks, failed_chunks, image_size, start_time, end_time, download_stats):
+    elapsed = end_time - start_time
+    metrics = {
+        "chunk_count": chunk_count,
+        "verified_chunks": verified_chunks,
+        "failed_chunks": failed_chunks,
+        "image_size": image_size,
+        "complete": failed_chunks == 0 and verified_chunks == chunk_count,
+        "elapsed_time": round(elapsed, 4),
+        "throughput_MBps": round((image_size / 1024 / 1024) / (elapsed + 1e-9), 2),
+        "attempts_total": download_stats["attempts"],
+        "retries_total": download_stats["retries"],
+        "resumes_total": download_stats["resumes"],
+        "bytes_transferred": download_stats["bytes_transferred"]
+    }
+    codecs = chunk_codec.summarize(download_stats)
+    if codecs:
+        metrics["codecs"] = codecs
+    os.makedirs("metrics", exist_ok=True)
+    with open("metrics/image_result.json", "w") as f:
+        json.dump(metrics, f, indent=2)
+    print(json.dumps(metrics, indent=2))
+
+# 배치 크기별 다운로드 비교 저장
+def log_batch_metrics(results):
+    base = results[0]["end_time"] - results[0]["start_time"]
+    rows = []
+    for r in results:
+        elapsed = r["end_time"] - r["start_time"]
+        rows.append({
+            "mode": r["mode"],
+            "batch_size": r["batch_size"],
+            "requests": r["requests"],
+            "chunks": r["chunks"],
+            "failed": r["failed"],
+            "total_bytes": r["total_bytes"],
+            "elapsed_time": round(elapsed, 4),
+            "throughput_MBps": round((r["total_bytes"] / 1024 / 1024) / (elapsed + 1e-9), 2),
+            "chunks_per_s": round(r["chunks"] / (elapsed + 1e-9), 2),
+            "speedup_vs_single": round(base / (elapsed + 1e-9), 2)
+        })
+    os.makedirs("metrics", exist_ok=True)
+    with open("metrics/batch_result.json", "w") as f:
+        json.dump(rows, f, indent=2)
+    print(json.dumps(rows, indent=2))
+
+
+# 서버별 부하 테스트 결과 (scripts/load_test.py)
+def log_load_metrics(results):
+    os.makedirs("metrics", exist_ok=True)
+    with open("metrics/load_result.json", "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
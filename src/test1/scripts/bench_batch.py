@@ -0,0 +1,60 @@
+import os, time, hashlib
+from client.manifest import get_manifest
+from client.batch import fetch_batch
+from client.run_bench import new_session
+from metrics.evaluator import log_batch_metrics
+
+SERVER_URL = "http://127.0.0.1:8000"
+OUT_DIR = "data/received_batch"
+BATCH_SIZES = [int(x) for x in os.environ.get("BATCH_SIZES", "8,32,128").split(",")]
+
+os.makedirs(OUT_DIR, exist_ok=True)
+
+
+# 파일마다 GET 한 번 (keep-alive 세션 재사용)
+def run_single(session, manifest):
+    total, failed = 0, []
+    for meta in manifest:
+        r = session.get(f"{SERVER_URL}/firmware/file/{meta['filename']}", timeout=10)
+        if r.status_code != 200 or hashlib.sha256(r.content).hexdigest() != meta["sha256"]:
+            failed.append(meta["filename"])
+            continue
+        with open(os.path.join(OUT_DIR, meta["filename"]), "wb") as f:
+            f.write(r.content)
+        total += len(r.content)
+    return total, failed, len(manifest)
+
+
+# batch_size개씩 묶어 /firmware/batch 요청
+def run_batched(session, manifest, batch_size):
+    total, failed, requests_made = 0, [], 0
+    for i in range(0, len(manifest), batch_size):
+        got, bad = fetch_batch(session, SERVER_URL, manifest[i:i + batch_size], OUT_DIR)
+        total += got
+        failed += bad
+        requests_made += 1
+    return total, failed, requests_made
+
+
+def main():
+    manifest = get_manifest(SERVER_URL)
+    print(f"[*] Fetching {len(manifest)} chunks: single vs batch {BATCH_SIZES}")
+    results = []
+    with new_session(1) as session:
+        for batch_size in [1] + BATCH_SIZES:
+            t0 = time.perf_counter()
+            if batch_size == 1:
+                total, failed, n_req = run_single(session, manifest)
+            else:
+                total, failed, n_req = run_batched(session, manifest, batch_size)
+            t1 = time.perf_counter()
+            mode = "single" if batch_size == 1 else f"batch-{batch_size}"
+            print(f"[+] {mode}: {t1 - t0:.3f} s, {n_req} requests, {len(failed)} failed")
+            results.append({"mode": mode, "batch_size": batch_size, "requests": n_req,
+                            "chunks": len(manifest) - len(failed), "total_bytes": total,
+                            "failed": len(failed), "start_time": t0, "end_time": t1})
+    log_batch_metrics(results)
+
+
+if __name__ == "__main__":
+    main()
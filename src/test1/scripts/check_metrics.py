@@ -0,0 +1,101 @@
+import os, re, sys, requests
+from client.manifest import get_manifest
+
+# 정해진 요청(list 3회 / 청크 / 404 / manifest)을 보낸 뒤 /metrics 증가량이 요청과 맞는지 확인
+#   떠 있는 서버에: python3 -m scripts.check_metrics (SERVER_URL)
+#   같은 검사를 tests/test_metrics.py가 Flask test client와 fast_server에 대해 실행한다
+
+SERVER_URL = os.environ.get("SERVER_URL", "http://127.0.0.1:8000")
+FILES = int(os.environ.get("CHECK_FILES", 20))      # 받아 볼 청크 수
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})?\s+(\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+FILE_ROUTE = "/firmware/file"
+MISSING_NAME = "no-such-chunk"
+
+
+# Prometheus text 형식 → {(이름, ((레이블, 값), ...)): 값}
+def parse(text):
+    out = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        m = SAMPLE.match(line)
+        if m is None:
+            raise ValueError(f"unparsable metrics line: {line!r}")
+        labels = tuple(sorted(LABEL.findall(m.group(2) or "")))
+        out[(m.group(1), labels)] = float(m.group(3))
+    return out
+
+
+def delta(before, after, name, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    return after.get(key, 0.0) - before.get(key, 0.0)
+
+
+def run(get, manifest):
+    """
+    get(path) → (status, 본문 bytes) 로 요청을 보내고 검사 결과 {이름: 통과 여부}와 요약 반환
+    manifest: 받아 볼 청크의 매니페스트 항목 목록
+    """
+    def scrape():
+        status, body = get("/metrics")
+        if status != 200:
+            raise IOError(f"/metrics: HTTP {status}")
+        return parse(body.decode())
+
+    before = scrape()
+    sent, statuses = 0, []
+    for _ in range(3):
+        statuses.append(get("/firmware/list")[0])
+    for meta in manifest:
+        status, body = get(f"{FILE_ROUTE}/{meta['filename']}")
+        statuses.append(status)
+        sent += len(body)
+    missing_status, missing_body = get(f"{FILE_ROUTE}/{MISSING_NAME}")
+    statuses.append(get("/firmware/manifest")[0])
+    after = scrape()
+
+    n = len(manifest)
+    count = delta(before, after, "ota_http_request_duration_seconds_count", route=FILE_ROUTE)
+    buckets = sorted((float(dict(labels)["le"]), after[(name, labels)] - before.get((name, labels), 0.0))
+                     for name, labels in after
+                     if name == "ota_http_request_duration_seconds_bucket" and dict(labels).get("route") == FILE_ROUTE)
+    checks = {
+        "all requests 200": all(s == 200 for s in statuses),
+        "list requests == 3": delta(before, after, "ota_http_requests_total",
+                                    route="/firmware/list", method="GET", status="200") == 3,
+        f"file 200s == {n}": delta(before, after, "ota_http_requests_total",
+                                   route=FILE_ROUTE, method="GET", status="200") == n,
+        "file 404s == 1": missing_status == 404 and delta(before, after, "ota_http_requests_total",
+                                                          route=FILE_ROUTE, method="GET", status="404") == 1,
+        "manifest requests == 1": delta(before, after, "ota_http_requests_total",
+                                        route="/firmware/manifest", method="GET", status="200") == 1,
+        "file latency count == 200s + 404": count == n + 1,
+        "file buckets cumulative, +Inf == count": bool(buckets) and buckets[-1] == (float("inf"), count)
+                                                  and all(a[1] <= b[1] for a, b in zip(buckets, buckets[1:])),
+        "file bytes == chunk bytes + 404 body": delta(before, after, "ota_http_response_bytes_total",
+                                                      route=FILE_ROUTE) == sent + len(missing_body),
+        "nothing in flight": all(v == 0 for (name, _), v in after.items() if name == "ota_http_requests_in_flight"),
+    }
+    lat = delta(before, after, "ota_http_request_duration_seconds_sum", route=FILE_ROUTE)
+    summary = f"{n} chunks, {sent/1024/1024:.2f} MB, mean service time {lat / (n + 1) * 1000:.2f} ms"
+    return checks, summary
+
+
+def main():
+    manifest = get_manifest(SERVER_URL)[:FILES]
+    with requests.Session() as s:
+        def get(path):
+            r = s.get(f"{SERVER_URL}{path}", timeout=10)
+            return r.status_code, r.content
+        checks, summary = run(get, manifest)
+    for name, ok in checks.items():
+        print(f"[{'+' if ok else '!'}] {name}")
+    print(f"[*] {summary}")
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 import os, time, json, hashlib
 from chunkers.ae_cdc import ae_cdc
+from chunkers.ae_cdc_np import iter_ae_cdc
 from metrics.evaluator import log_chunk_metrics
+from utils import manifest_bin, chunk_codec
 
 INPUT_FILE = "data/rootfs.tar"              # 청킹할 원본 파일 경로
 CHUNK_DIR = "data/chunks"                   # 청크 저장 폴더
-MANIFEST_PATH = "data/manifest_ae.json"     # 매니페스트 출력 경로
+MANIFEST_PATH = "data/manifest_ae.json"     # 매니페스트 출력 경로 (JSON export)
+MANIFEST_BIN_PATH = "data/manifest_ae.bin"  # 바이너리 매니페스트 (서버/클라이언트가 우선 사용)
+ENGINE = os.environ.get("AE_CDC_ENGINE", "numpy")   # 청킹 엔진: "numpy" 또는 "deque"
+CHUNK_CODEC = os.environ.get("CHUNK_CODEC", "none") # 청크 압축: "none", "zlib", "lzma"
+CHUNK_LEVEL = int(os.environ["CHUNK_LEVEL"]) if os.environ.get("CHUNK_LEVEL") else None  # 압축 레벨 (기본 6)
 
 os.makedirs(CHUNK_DIR, exist_ok=True)
 
@@ -12,39 +18,71 @@ os.makedirs(CHUNK_DIR, exist_ok=True)
 def sha256_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
-def main():
-    print("[*] Loading input file...")
-    with open(INPUT_FILE, "rb") as f:
-        data = f.read()
+# 청크를 생성되는 순서대로 하나씩 반환
+def iter_chunk_data(engine: str):
+    if engine == "numpy":
+        # 스트리밍: 경계 탐색과 청크 읽기 모두 max_chunk + 창 크기 이내의 메모리만 사용
+        with open(INPUT_FILE, "rb") as f, open(INPUT_FILE, "rb") as r:
+            for off, ln in iter_ae_cdc(f):
+                r.seek(off)
+                yield r.read(ln)
+    else:
+        # deque 엔진은 전체 파일을 메모리에 올려 청킹
+        with open(INPUT_FILE, "rb") as f:
+            data = f.read()
+        yield from ae_cdc(data, engine=engine)
 
-    print(f"[*] Starting AE-CDC chunking ({len(data)/1024/1024:.2f} MB)")
-    t0 = time.time()
-    chunks = ae_cdc(data)   # AE-CDC 청킹 수행
-    t1 = time.time()
+# 저장한 청크를 한 번씩 해제해 원본 해시와 비교 (codec별 해제 속도 측정 겸용)
+def verify_stored(manifest, stats):
+    for m in manifest:
+        codec = chunk_codec.codec_id(m.get("codec", "none"))
+        if codec == chunk_codec.RAW:
+            continue
+        with open(os.path.join(CHUNK_DIR, m["filename"]), "rb") as f:
+            data = chunk_codec.timed_decompress(stats, codec, f.read())
+        if sha256_bytes(data) != m["sha256"]:
+            raise ValueError(f"{m['filename']}: decoded chunk does not match its sha256")
 
-    print(f"[+] Chunking completed in {t1 - t0:.4f} s")
-    print(f"[+] Total chunks: {len(chunks)}")
+def main(engine: str = ENGINE, codec_name: str = CHUNK_CODEC):
+    codec = chunk_codec.codec_id(codec_name)
+    size = os.path.getsize(INPUT_FILE)
+    print(f"[*] Starting AE-CDC chunking ({size/1024/1024:.2f} MB, engine={engine}, codec={codec_name})")
+    t0 = time.time()
 
-    # 청크 저장 + SHA256 해시 생성
-    manifest = []
-    for i, chunk in enumerate(chunks):
+    # 청크 생성 즉시 (압축해서) 저장 + SHA256 해시 생성 (해시와 size는 압축 전 원본 기준)
+    manifest, stats = [], chunk_codec.new_stats()
+    for i, chunk in enumerate(iter_chunk_data(engine)):
         fname = f"part-{i:05d}"
         path = os.path.join(CHUNK_DIR, fname)
+        used, payload = chunk_codec.compress(chunk, codec, CHUNK_LEVEL)
+        chunk_codec.count_put(stats, used, len(chunk), len(payload))
         with open(path, "wb") as f:
-            f.write(chunk)
+            f.write(payload)
 
-        manifest.append({
+        meta = {
             "filename": fname,
             "size": len(chunk),
-            "sha256": sha256_bytes(chunk) 
-        })
+            "sha256": sha256_bytes(chunk)
+        }
+        if used != chunk_codec.RAW:
+            meta["codec"] = chunk_codec.NAMES[used]
+        manifest.append(meta)
+    t1 = time.time()
+
+    print(f"[+] Chunking completed in {t1 - t0:.4f} s")
+    print(f"[+] Total chunks: {len(manifest)}")
 
-    # 매니페스트 저장
+    # 매니페스트 저장: 바이너리(고정폭 레코드) + JSON export
+    manifest_bin.write(MANIFEST_BIN_PATH, [(m["sha256"], m["size"]) for m in manifest],
+                       names=[m["filename"] for m in manifest],
+                       codecs=[chunk_codec.codec_id(m.get("codec", "none")) for m in manifest] if codec else None)
     with open(MANIFEST_PATH, "w") as f:
         json.dump(manifest, f, indent=2)
 
-    # 청킹 메트릭 로깅
-    log_chunk_metrics(len(chunks), len(data), t0, t1)
+    # 청킹 메트릭 로깅 (압축했으면 codec별 압축률 / 해제 속도 포함)
+    if codec:
+        verify_stored(manifest, stats)
+    log_chunk_metrics(len(manifest), size, t0, t1, chunk_codec.summarize(stats) if codec else None)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,161 @@
+import http.client, os, random, subprocess, sys, threading, time
+from urllib.parse import urlsplit
+from client.manifest import get_manifest
+from metrics.evaluator import log_load_metrics, percentile
+
+# 로컬 부하 생성기: 여러 기기가 동시에 청크를 받는 상황을 흉내 내 서버별 처리량 / 지연을 비교
+#   기기 하나 = 스레드 하나 + keep-alive 연결 하나 (http.client, 부하 생성 쪽 오버헤드를 줄이려고 requests 대신 사용)
+#   기기마다 manifest.bin을 한 번 받고, LOAD_DURATION초 동안 무작위 청크(가끔 /firmware/list)를 계속 요청
+#   SERVER_URL을 주면 떠 있는 서버 하나만, 아니면 LOAD_SERVERS의 서버를 차례로 띄워 같은 부하로 비교
+
+SERVER_URL = os.environ.get("SERVER_URL")
+SERVERS = {"flask": "server.server", "fast": "server.fast_server"}
+LOAD_SERVERS = os.environ.get("LOAD_SERVERS", "flask,fast").split(",")
+LOAD_PORT = int(os.environ.get("LOAD_PORT", 8050))              # 비교용으로 띄우는 서버 포트
+DEVICES = int(os.environ.get("LOAD_DEVICES", 32))               # 동시 기기(연결) 수
+DURATION = float(os.environ.get("LOAD_DURATION", 10))           # 서버마다 부하를 거는 시간 (s)
+LIST_RATIO = float(os.environ.get("LOAD_LIST_RATIO", 0.05))     # 요청 중 /firmware/list 비율
+SEED = int(os.environ.get("LOAD_SEED", 7))
+READ_SIZE = 64 * 1024
+
+
+class Device(threading.Thread):
+    def __init__(self, url, manifest, deadline, idx):
+        super().__init__(daemon=True)
+        u = urlsplit(url)
+        self.host, self.port = u.hostname, u.port or 80
+        self.manifest, self.deadline = manifest, deadline
+        self.rng = random.Random(SEED * 1000 + idx)
+        self.latency = {"/firmware/file": [], "/firmware/list": [], "/firmware/manifest.bin": []}
+        self.bytes = self.errors = self.connects = 0
+
+    def _connect(self):
+        self.connects += 1
+        return http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def _get(self, conn, path, route):
+        t = time.perf_counter()
+        conn.request("GET", path)
+        r = conn.getresponse()
+        n = 0
+        while True:
+            b = r.read(READ_SIZE)
+            if not b:
+                break
+            n += len(b)
+        if r.status != 200:
+            raise IOError(f"{path}: HTTP {r.status}")
+        if r.getheader("Content-Length") not in (None, str(n)):
+            raise IOError(f"{path}: short body {n}")
+        self.latency[route].append(time.perf_counter() - t)
+        self.bytes += n
+
+    def run(self):
+        conn = self._connect()
+        first = True
+        while time.perf_counter() < self.deadline:
+            if first:
+                path, route = "/firmware/manifest.bin", "/firmware/manifest.bin"
+            elif self.rng.random() < LIST_RATIO:
+                path, route = "/firmware/list", "/firmware/list"
+            else:
+                path, route = f"/firmware/file/{self.rng.choice(self.manifest)['filename']}", "/firmware/file"
+            try:
+                self._get(conn, path, route)
+                first = False
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                conn.close()
+                conn = self._connect()
+        conn.close()
+
+
+def run_load(url, manifest):
+    deadline = time.perf_counter() + DURATION
+    devices = [Device(url, manifest, deadline, i) for i in range(DEVICES)]
+    t0 = time.perf_counter()
+    for d in devices:
+        d.start()
+    for d in devices:
+        d.join()
+    elapsed = time.perf_counter() - t0
+
+    routes = {}
+    for route in devices[0].latency:
+        lat = sorted(x for d in devices for x in d.latency[route])
+        if lat:
+            routes[route] = {"requests": len(lat), "p50_ms": round(percentile(lat, 50) * 1000, 2),
+                             "p95_ms": round(percentile(lat, 95) * 1000, 2),
+                             "p99_ms": round(percentile(lat, 99) * 1000, 2)}
+    total = sum(r["requests"] for r in routes.values())
+    nbytes = sum(d.bytes for d in devices)
+    return {
+        "devices": DEVICES,
+        "elapsed_time": round(elapsed, 3),
+        "requests": total,
+        "requests_per_s": round(total / elapsed, 1),
+        "throughput_MBps": round(nbytes / 1024 / 1024 / elapsed, 2),
+        "total_bytes": nbytes,
+        "errors": sum(d.errors for d in devices),
+        "connections": sum(d.connects for d in devices),
+        "routes": routes,
+    }
+
+
+def start_server(module):
+    env = dict(os.environ, SERVER_HOST="127.0.0.1", SERVER_PORT=str(LOAD_PORT))
+    proc = subprocess.Popen([sys.executable, "-m", module], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", LOAD_PORT, timeout=1)
+            conn.request("GET", "/firmware/list")
+            conn.getresponse().read()
+            conn.close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{module} exited with {proc.returncode}")
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError(f"{module} did not start on port {LOAD_PORT}")
+
+
+def report(name, r):
+    f = r["routes"].get("/firmware/file", {})
+    print(f"[+] {name:6s} {r['requests_per_s']:8.1f} req/s, {r['throughput_MBps']:7.2f} MB/s, "
+          f"file p50 {f.get('p50_ms', 0):.2f} ms / p95 {f.get('p95_ms', 0):.2f} ms / p99 {f.get('p99_ms', 0):.2f} ms, "
+          f"errors {r['errors']}")
+
+
+def main():
+    if SERVER_URL:
+        targets = [("server", SERVER_URL, None)]
+    else:
+        unknown = [s for s in LOAD_SERVERS if s not in SERVERS]
+        if unknown:
+            sys.exit(f"unknown server(s): {', '.join(unknown)} (choose from {', '.join(SERVERS)})")
+        targets = [(s, f"http://127.0.0.1:{LOAD_PORT}", SERVERS[s]) for s in LOAD_SERVERS]
+
+    print(f"[*] {DEVICES} devices x {DURATION:g} s per server, list ratio {LIST_RATIO}")
+    results = {}
+    for name, url, module in targets:
+        proc = start_server(module) if module else None
+        try:
+            manifest = get_manifest(url)
+            results[name] = run_load(url, manifest)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+        report(name, results[name])
+
+    if "flask" in results and "fast" in results:
+        a, b = results["flask"], results["fast"]
+        print(f"[*] fast vs flask: {b['requests_per_s'] / a['requests_per_s']:.2f}x req/s, "
+              f"file p99 {a['routes']['/firmware/file']['p99_ms']:.2f} → {b['routes']['/firmware/file']['p99_ms']:.2f} ms")
+    log_load_metrics(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+import email.utils, io, json, os, selectors, socket, stat, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+from server import server as ota
+
+# 다수 기기 동시 배포용 서버 (python3 -m server.fast_server, Flask 개발 서버 대신)
+#   - 고정 크기 스레드 풀(SERVER_THREADS)이 연결이 아니라 요청 단위로 처리, HTTP/1.1 keep-alive
+#     응답을 보낸 연결은 selector 스레드에 맡겨 두고(park) 다음 요청이 도착하면 다시 풀에 넘긴다
+#     → 스레드 수보다 많은 기기가 연결을 열어 두어도 기다리지 않음, KEEPALIVE_TIMEOUT초 동안 조용한 연결은 닫음
+#   - /firmware/file : 헤더만 만들고 본문은 socket.sendfile(내부적으로 os.sendfile)로 파일 → 소켓 커널 복사
+#                      Range / If-Range / ETag / If-None-Match 처리는 Flask 서버(send_from_directory)와 같은 규칙
+#   - /firmware/list : 미리 만들어 둔 목록 JSON (server.chunk_listing)
+#   - 그 밖의 경로(/firmware/manifest*, /firmware/batch, /metrics)는 같은 Flask 앱을 WSGI로 호출
+#   /metrics 집계는 두 경로 모두 같은 레지스트리에 기록
+
+SERVER_THREADS = int(os.environ.get("SERVER_THREADS", 32))          # 0이면 연결마다 스레드 (ThreadingHTTPServer)
+KEEPALIVE_TIMEOUT = float(os.environ.get("KEEPALIVE_TIMEOUT", 5))   # 유휴 연결을 닫기까지 기다리는 시간 (s)
+MAX_BODY = 1024 * 1024      # WSGI로 넘기는 요청 본문 최대 크기 (배치 요청 JSON)
+FILE_PREFIX = "/firmware/file/"
+
+
+def parse_range(value, size):
+    """
+    "bytes=a-b" / "bytes=a-" / "bytes=-n" 하나만 처리: (시작, 끝(미포함))
+    그 밖의 형식, 여러 구간, 파일 밖의 범위는 None → 416 (Werkzeug send_file과 같음)
+    """
+    unit, _, spec = value.partition("=")
+    first, sep, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or "," in spec or not sep:
+        return None
+    try:
+        if not first:
+            n = int(last)
+            return (size - n, size) if 0 < n <= size else None
+        start, end = int(first), (int(last) + 1 if last else size)
+    except ValueError:
+        return None
+    if start >= size or end <= start:
+        return None
+    return start, min(end, size)
+
+
+def _etag_matches(header, etag):
+    """If-None-Match: 약한 비교 (W/ 태그도 일치)"""
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or f'"{etag}"' in tags or f'W/"{etag}"' in tags
+
+
+def _if_range_matches(value, etag, last_modified):
+    """If-Range: 강한 비교만 (RFC 9110 13.1.5). 약한 ETag(W/)나 다른 값이면 Range를 무시하고 전체(200)"""
+    value = value.strip()
+    return value == f'"{etag}"' or value == last_modified
+
+
+class OTAHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    disable_nagle_algorithm = True
+    parked = False              # 응답 후 연결을 닫지 않고 server에 맡겨 둔 상태
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---------- 연결 처리 (풀 모드: 요청 하나마다 스레드를 돌려줌) ----------
+    def handle(self):
+        if isinstance(self.server, PoolHTTPServer):
+            self.resume()
+        else:
+            super().handle()
+
+    def resume(self):
+        """요청을 처리하고, 연결이 유지되면 parked = True (다음 요청은 server가 기다렸다가 다시 resume)"""
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._buffered():
+            self.handle_one_request()               # 이미 받아 둔 다음 요청 (파이프라이닝)
+        self.parked = not self.close_connection    # 연결 유지: 호출한 쪽(server)이 handler를 다 빠져나온 뒤 park
+
+    def _buffered(self):
+        """rfile 버퍼에 다음 요청이 이미 있는지 (소켓을 non-blocking으로 잠깐 바꿔 기다리지 않고 확인)"""
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def finish(self):
+        if not self.parked:
+            super().finish()
+
+    # ---------- 메트릭 (Flask 서버의 before/after_request와 같은 값) ----------
+    def _begin(self, route):
+        self._route, self._t0, self._sent = route, time.perf_counter(), 0
+        if ota.METRICS:
+            ota.IN_FLIGHT.inc(route)
+
+    def _end(self, status):
+        if not ota.METRICS:
+            return
+        route = self._route
+        ota.IN_FLIGHT.dec(route)
+        ota.LATENCY.observe(time.perf_counter() - self._t0, route)
+        ota.REQUESTS.inc(route, self.command, str(status))
+        if self._sent:
+            ota.BYTES_SENT.inc(route, amount=self._sent)
+
+    # ---------- 라우팅 ----------
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path.startswith(FILE_PREFIX) and self.command in ("GET", "HEAD"):
+            self._timed("/firmware/file", self._send_chunk, unquote(path[len(FILE_PREFIX):]))
+        elif path == "/firmware/list" and self.command in ("GET", "HEAD"):
+            self._timed("/firmware/list", self._send_body, 200, ota.chunk_listing(), "application/json")
+        else:
+            self._wsgi()
+
+    do_HEAD = do_POST = do_GET
+
+    def _timed(self, route, fn, *args):
+        self._begin(route)
+        self._status = 500
+        try:
+            fn(*args)
+        except (ConnectionError, TimeoutError):
+            self.close_connection = True            # 기기가 받는 중에 끊음
+        finally:
+            self._end(self._status)
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def _send_body(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+            self._sent = len(body)
+        return status
+
+    def _not_found(self, name):
+        return self._send_body(404, json.dumps({"error": f"{name} not found"}).encode(), "application/json")
+
+    # ---------- /firmware/file (sendfile) ----------
+    def _send_chunk(self, name):
+        if name in ("", ".", "..") or "/" in name or "\0" in name:
+            return self._not_found(name)
+        try:
+            f = open(os.path.join(ota.CHUNK_DIR, name), "rb")
+        except OSError:
+            return self._not_found(name)
+        with f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                return self._not_found(name)
+            size = st.st_size
+            etag = ota.chunk_etag(name) or f"{st.st_mtime_ns:x}-{size:x}"
+            last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+            common = [("ETag", f'"{etag}"'), ("Last-Modified", last_modified),
+                      ("Cache-Control", "no-cache"), ("Accept-Ranges", "bytes")]
+
+            inm = self.headers.get("If-None-Match")
+            if inm and _etag_matches(inm, etag):
+                self.send_response(304)
+                for k, v in common:
+                    self.send_header(k, v)
+                self.end_headers()
+                return 304
+
+            start, end, status = 0, size, 200
+            rng, if_range = self.headers.get("Range"), self.headers.get("If-Range")
+            # If-Range가 ETag(또는 날짜)와 다르면 Range를 무시하고 전체(200)
+            if rng and (if_range is None or _if_range_matches(if_range, etag, last_modified)):
+                r = parse_range(rng, size)
+                if r is None:
+                    return self._send_body(416, b"", "application/octet-stream",
+                                           [("Content-Range", f"bytes */{size}")] + common)
+                (start, end), status = r, 206
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Disposition", f"attachment; filename={name}")
+            self.send_header("Content-Length", str(end - start))
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+            for k, v in common:
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command != "HEAD" and end > start:
+                self._sent = self.connection.sendfile(f, start, end - start)
+                if self._sent != end - start:
+                    self.close_connection = True    # 보내는 중에 파일이 줄었음: 길이를 맞출 수 없으므로 연결 종료
+        return status
+
+    # ---------- 나머지 경로: Flask 앱 (WSGI) ----------
+    def _wsgi(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.close_connection = True
+            self._send_body(413, b'{"error": "request body too large"}\n', "application/json")
+            return
+        body = self.rfile.read(length) if length else b""
+        environ = {
+            "REQUEST_METHOD": self.command, "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(url.path, "latin-1"), "QUERY_STRING": url.query,
+            "CONTENT_TYPE": self.headers.get("Content-Type", ""), "CONTENT_LENGTH": str(len(body)),
+            "SERVER_NAME": self.server.server_name, "SERVER_PORT": str(self.server.server_port),
+            "SERVER_PROTOCOL": self.request_version, "REMOTE_ADDR": self.client_address[0],
+            "wsgi.version": (1, 0), "wsgi.url_scheme": "http", "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr, "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+        }
+        for k, v in self.headers.items():
+            key = "HTTP_" + k.upper().replace("-", "_")
+            if key not in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                environ[key] = f"{environ[key]},{v}" if key in environ else v
+
+        started = []
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+            return lambda data: None
+
+        result = ota.app(environ, start_response)
+        try:
+            status, headers = started
+            code = int(status.split(None, 1)[0])
+            self.send_response(code, status.split(None, 1)[1] if " " in status else None)
+            has_length = any(k.lower() == "content-length" for k, _ in headers)
+            # 길이를 모르는 스트리밍 응답(/firmware/batch)은 chunked로 보내야 keep-alive를 유지할 수 있다
+            chunked = (not has_length and self.command != "HEAD" and code not in (204, 304)
+                       and self.request_version == "HTTP/1.1")
+            for k, v in headers:
+                self.send_header(k, v)
+            if chunked:
+                self.send_header("Transfer-Encoding", "chunked")
+            elif not has_length:
+                self.send_header("Connection", "close")
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+            for part in result:
+                if not part:
+                    continue
+                if chunked:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+                else:
+                    self.wfile.write(part)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except (ConnectionError, TimeoutError):
+            self.close_connection = True
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()                             # Flask의 call_on_close → 메트릭 기록
+
+
+class PoolHTTPServer(HTTPServer):
+    """
+    고정 크기 스레드 풀 + keep-alive 연결 대기용 selector 스레드
+      풀 스레드는 요청 하나를 처리한 뒤 연결을 park()로 넘기고 바로 다음 작업으로 간다
+      selector 스레드는 park된 연결에 다음 요청이 오면 풀에 다시 넘기고, 오래 조용한 연결은 닫는다
+    """
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+    def __init__(self, addr, handler, threads):
+        super().__init__(addr, handler)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ota")
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._parking, self._park_lock, self._stopping = [], threading.Lock(), False
+        self._reactor = threading.Thread(target=self._watch, name="ota-keepalive", daemon=True)
+        self._reactor.start()
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._work, request, client_address)
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def _work(self, request, client_address):
+        h = None
+        try:
+            h = self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            if h is not None and h.parked:
+                self.park(h)
+            else:
+                self.shutdown_request(request)
+
+    def _resume(self, h):
+        h.parked = False
+        try:
+            h.resume()
+        except Exception:
+            h.parked = False
+            self.handle_error(h.request, h.client_address)
+        if h.parked:
+            self.park(h)
+        else:
+            self._close(h)
+
+    def _close(self, h):
+        h.parked = False
+        try:
+            h.finish()
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(h.request)
+
+    def park(self, h):
+        with self._park_lock:
+            self._parking.append(h)
+        self._wake_w.send(b"\0")
+
+    def _watch(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        idle = {}                                   # park된 handler → 닫을 시각
+        while not self._stopping:
+            for key, _ in sel.select(timeout=1.0):
+                if key.fileobj is self._wake_r:
+                    try:
+                        self._wake_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    with self._park_lock:
+                        new, self._parking = self._parking, []
+                    for h in new:
+                        sel.register(h.connection, selectors.EVENT_READ, h)
+                        idle[h] = time.monotonic() + KEEPALIVE_TIMEOUT
+                else:
+                    h = key.data
+                    sel.unregister(key.fileobj)
+                    idle.pop(h, None)
+                    self.pool.submit(self._resume, h)
+            now = time.monotonic()
+            for h in [h for h, t in idle.items() if t < now]:
+                sel.unregister(h.connection)
+                del idle[h]
+                self._close(h)
+        for h in idle:
+            self._close(h)
+        sel.close()
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self._stopping = True
+        self._wake_w.send(b"\0")
+        self._reactor.join(timeout=2)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self._wake_r.close(); self._wake_w.close()
+
+
+class _ThreadPerConnection(ThreadingHTTPServer):
+    allow_reuse_address = True
+    request_queue_size = 1024
+    handle_error = PoolHTTPServer.handle_error
+
+
+def make_server(host=ota.SERVER_HOST, port=ota.SERVER_PORT, threads=SERVER_THREADS):
+    if threads > 0:
+        return PoolHTTPServer((host, port), OTAHandler, threads)
+    return _ThreadPerConnection((host, port), OTAHandler)
+
+
+def main():
+    ota.chunk_listing()         # 목록 / 매니페스트는 시작할 때 미리 만들어 둠
+    ota.load_manifest()
+    httpd = make_server()
+    print(f"[+] Serving chunks from: {ota.CHUNK_DIR}")
+    print(f"[+] Listening on http://{ota.SERVER_HOST}:{ota.SERVER_PORT} "
+          f"(threads: {SERVER_THREADS or 'per connection'}, keep-alive {KEEPALIVE_TIMEOUT:g} s, sendfile)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import threading
+from bisect import bisect_left
+
+# Prometheus text 형식(0.0.4) 메트릭 (외부 의존성 없이 서버 안에서 직접 집계)
+#   레이블 조합마다 값 하나, 갱신은 lock 한 번 + dict 조회라서 요청마다 켜 둬도 부담이 적다
+#   히스토그램 버킷은 고정 (누적 카운트는 노출할 때만 계산)
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    parts = []
+    for n, v in zip(names, values):
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{n}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _num(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)       # value <= bucket 인 첫 버킷 (없으면 +Inf 칸)
+        with self._lock:
+            v = self._values.get(labels)
+            if v is None:
+                v = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            v[0][i] += 1
+            v[1] += value
+            v[2] += 1
+
+    def expose(self):
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        for k, (counts, total, count) in items:
+            acc = 0
+            for b, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                lines.append(f"{self.name}_bucket{_labels(names, k + (_num(b),))} {acc}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, k)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self):
+        lines = []
+        for m in self.metrics:
+            lines += m.expose()
+        return "\n".join(lines) + "\n"
@@ -1,5 +1,9 @@
-from flask import Flask, jsonify, send_from_directory
-import json, os
+from flask import Flask, Response, g, jsonify, request, send_from_directory
+from werkzeug.security import safe_join
+from utils.framing import pack_header, MISSING
+from utils import manifest_bin, chunk_codec
+from server import prom
+import json, os, time, hashlib
 
 app = Flask(__name__)
 
@@ -7,25 +11,224 @@ app = Flask(__name__)
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # server/ 상위 폴더
 CHUNK_DIR = os.path.join(BASE_DIR, "data", "chunks")
 MANIFEST_PATH = os.path.join(BASE_DIR, "data", "manifest_ae.json")
+MANIFEST_BIN_PATH = os.path.join(BASE_DIR, "data", "manifest_ae.bin")
+MAX_BATCH = 1024            # 배치 요청 하나에 담을 수 있는 청크 수
+BATCH_READ = 64 * 1024      # 배치 응답에서 파일을 읽어 보내는 단위
+METRICS = os.environ.get("SERVER_METRICS", "1") != "0"   # /metrics (Prometheus) 집계 여부
+SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.environ.get("SERVER_PORT", 8000))
+
+# ---------- 요청 메트릭 (/metrics) ----------
+REGISTRY = prom.Registry()
+REQUESTS = REGISTRY.add(prom.Counter("ota_http_requests_total", "HTTP requests by route, method and status",
+                                     ("route", "method", "status")))
+LATENCY = REGISTRY.add(prom.Histogram("ota_http_request_duration_seconds",
+                                      "Time from request start until the response body is fully sent", ("route",)))
+IN_FLIGHT = REGISTRY.add(prom.Gauge("ota_http_requests_in_flight", "Requests currently being served", ("route",)))
+BYTES_SENT = REGISTRY.add(prom.Counter("ota_http_response_bytes_total", "Response body bytes sent", ("route",)))
+
+def _route_label():
+    """URL 규칙에서 변수 부분을 뺀 경로 (/firmware/file/<filename> → /firmware/file), 규칙이 없으면 unmatched"""
+    rule = request.url_rule
+    return rule.rule.split("/<")[0] if rule is not None else "unmatched"
+
+class _OnClose:
+    """
+    본문 iterable을 감싸 close() 때 콜백 호출
+    direct_passthrough 응답(send_from_directory)은 Werkzeug가 call_on_close 콜백을 부르지 않으므로 필요
+    """
+    def __init__(self, body, callback):
+        self.body, self.callback = body, callback
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def close(self):
+        try:
+            close = getattr(self.body, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self.callback()
+
+def _counting(body, route):
+    """길이를 미리 알 수 없는 스트리밍 응답은 보내는 조각마다 바이트 수를 더함"""
+    for part in body:
+        BYTES_SENT.inc(route, amount=len(part))
+        yield part
+
+# 파싱한 매니페스트 캐시 (바이너리 매니페스트 우선), 파일이 바뀌면 (mtime/size) 다시 읽음
+_manifest_cache = None
+
+def load_manifest():
+    """
+    캐시된 매니페스트: entries(목록), by_name / by_digest (파일명 ↔ sha256),
+    chunk_etags (파일명 → 청크 ETag), json / bin (응답 본문), etag (원본 파일 내용의 sha256)
+    매니페스트가 없으면 None
+    """
+    global _manifest_cache
+    path = MANIFEST_BIN_PATH if os.path.exists(MANIFEST_BIN_PATH) else MANIFEST_PATH
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    cache = _manifest_cache
+    if cache is None or cache["key"] != key:
+        with open(path, "rb") as f:
+            raw = f.read()
+        if raw.startswith(manifest_bin.MAGIC):
+            entries, bin_body = manifest_bin.Manifest(raw).to_json(), raw
+        else:
+            entries = json.loads(raw)
+            codecs = [chunk_codec.codec_id(m.get("codec", "none")) for m in entries]
+            bin_body = manifest_bin.encode([(m["sha256"], m["size"]) for m in entries],
+                                           names=[m["filename"] for m in entries],
+                                           codecs=codecs if any(codecs) else None)
+        cache = _manifest_cache = {
+            "key": key,
+            "entries": entries,
+            "by_name": {m["filename"]: m["sha256"] for m in entries},
+            "by_digest": {m["sha256"]: m["filename"] for m in entries},
+            "chunk_etags": {m["filename"]: chunk_codec.etag(m["sha256"], m.get("codec")) for m in entries},
+            "json": json.dumps(entries).encode(),
+            "bin": bin_body,
+            "etag": hashlib.sha256(raw).hexdigest(),
+        }
+    return cache
+
+# /firmware/list 응답 본문: 시작할 때 만들어 두고, 청크 디렉터리의 mtime이 바뀌었을 때만 다시 listdir
+_listing = None
+
+def chunk_listing():
+    global _listing
+    mtime = os.stat(CHUNK_DIR).st_mtime_ns
+    cache = _listing
+    if cache is None or cache[0] != mtime:
+        cache = _listing = (mtime, json.dumps(sorted(os.listdir(CHUNK_DIR))).encode())
+    return cache[1]
+
+@app.before_request
+def _metrics_start():
+    if not METRICS or request.path == "/metrics":
+        return
+    g.metrics_route = route = _route_label()
+    g.metrics_t0 = time.perf_counter()
+    IN_FLIGHT.inc(route)
+
+@app.after_request
+def _metrics_finish(response):
+    route = g.pop("metrics_route", None)
+    if route is None:
+        return response
+    t0, method, status = g.metrics_t0, request.method, str(response.status_code)
+    size = response.content_length
+    if size is None and not response.direct_passthrough and not isinstance(response.response, (list, tuple)):
+        response.response = _counting(response.response, route)
+
+    # 응답 본문을 다 보낸 뒤(WSGI close) 지연 / 진행 중 요청 수 / 바이트를 기록 (한 번만)
+    finished = []
+    def done():
+        if finished:
+            return
+        finished.append(True)
+        IN_FLIGHT.dec(route)
+        LATENCY.observe(time.perf_counter() - t0, route)
+        REQUESTS.inc(route, method, status)
+        if size and method != "HEAD":
+            BYTES_SENT.inc(route, amount=size)
+    response.call_on_close(done)
+    if response.direct_passthrough:
+        response.response = _OnClose(response.response, done)
+    return response
+
+def _manifest_maps():
+    m = load_manifest()
+    return (m["by_name"], m["by_digest"]) if m else ({}, {})
+
+def _manifest_response(kind, mimetype):
+    m = load_manifest()
+    if m is None:
+        return jsonify({"error": "manifest not found"}), 404
+    resp = Response(m[kind], mimetype=mimetype)
+    resp.set_etag(m["etag"])
+    return resp.make_conditional(request)     # If-None-Match가 맞으면 304
+
+def chunk_etag(filename):
+    """
+    청크 파일의 ETag = 매니페스트의 sha256 (내용 기반 strong validator), 압축된 청크는 "<sha256>.<codec>"
+    클라이언트는 매니페스트만 보고 If-Range를 보낼 수 있고, 재청킹이나 codec 변경으로
+    저장된 바이트가 바뀌면 전체를 다시 받는다
+    매니페스트에 없으면 None (Werkzeug 기본 ETag 사용)
+    """
+    m = load_manifest()
+    return m["chunk_etags"].get(filename) if m else None
 
 @app.route("/firmware/list")
 def list_files():
-    files = sorted(os.listdir(CHUNK_DIR))
-    return jsonify(files)
+    return Response(chunk_listing(), mimetype="application/json")
 
 @app.route("/firmware/file/<filename>")
 def get_file(filename):
     file_path = os.path.join(CHUNK_DIR, filename)
     if not os.path.exists(file_path):
         return jsonify({"error": f"{filename} not found"}), 404
-    return send_from_directory(CHUNK_DIR, filename, as_attachment=True)
+    # conditional=True: Range → 206 (범위 밖이면 416), If-Range의 ETag가 다르면 전체(200)
+    return send_from_directory(CHUNK_DIR, filename, as_attachment=True,
+                               conditional=True, etag=chunk_etag(filename) or True)
+
+@app.route("/firmware/batch", methods=["POST"])
+def get_batch():
+    """
+    {"names": [...]} 또는 {"digests": [...]} (매니페스트 sha256)로 요청한 청크를
+    한 응답에 순서대로 이어 보냄 (utils.framing 형식, 요청한 키가 프레임 이름)
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        body = {}
+    keys = body.get("digests", body.get("names", []))
+    if not isinstance(keys, list) or len(keys) > MAX_BATCH or not all(isinstance(k, str) for k in keys):
+        return jsonify({"error": f"expected a list of at most {MAX_BATCH} strings"}), 400
+    if "digests" in body:
+        by_digest = _manifest_maps()[1]
+        files = [by_digest.get(k) for k in keys]
+    else:
+        files = keys
+    paths = [safe_join(CHUNK_DIR, f) if f else None for f in files]
+
+    def generate():
+        for key, path in zip(keys, paths):
+            if path is None or not os.path.isfile(path):
+                yield pack_header(key, 0, MISSING)
+                continue
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                yield pack_header(key, size)
+                left = size
+                while left > 0:
+                    b = f.read(min(BATCH_READ, left))
+                    if not b:
+                        raise IOError(f"{path} shrank while streaming")
+                    yield b
+                    left -= len(b)
+
+    return Response(generate(), mimetype="application/octet-stream")
 
 @app.route("/firmware/manifest")
 def get_manifest():
-    with open(MANIFEST_PATH, "r") as f:
-        data = json.load(f)
-    return jsonify(data)
+    return _manifest_response("json", "application/json")
+
+@app.route("/firmware/manifest.bin")
+def get_manifest_bin():
+    return _manifest_response("bin", "application/octet-stream")
+
+@app.route("/metrics")
+def get_metrics():
+    if not METRICS:
+        return jsonify({"error": "metrics disabled"}), 404
+    return Response(REGISTRY.expose(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     print(f"[+] Serving chunks from: {CHUNK_DIR}")
-    app.run(host="0.0.0.0", port=8000)
\ No newline at end of file
+    chunk_listing()
+    app.run(host=SERVER_HOST, port=SERVER_PORT)
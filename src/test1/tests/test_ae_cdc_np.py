@@ -0,0 +1,76 @@
+import io, random
+import pytest
+from chunkers.ae_cdc import ae_cdc
+from chunkers.ae_cdc_np import iter_ae_cdc
+
+# NumPy 엔진 / 스트리밍 버전이 기존 deque 버전과 같은 컷 지점을 내는지 확인
+# 창 / 청크 크기를 작게 잡아 입력마다 컷이 많이 나오게 한다 (normal cut, strong cut, 꼬리 청크 모두 포함)
+
+PARAMS = [
+    # left_win, right_win, min_chunk, max_chunk
+    (4, 8, 16, 64),
+    (16, 32, 64, 256),
+    (32, 8, 100, 300),
+    (8, 64, 32, 96),
+    (1, 1, 1, 4),
+]
+
+def _random(n, seed):
+    return random.Random(seed).randbytes(n)
+
+def _periodic(n, seed):
+    rng = random.Random(seed)
+    period = bytes(rng.randrange(256) for _ in range(rng.randrange(3, 40)))
+    return (period * (n // len(period) + 1))[:n]
+
+def _constant(n, seed):
+    return bytes([seed % 256]) * n
+
+def _ramp(n, seed):
+    return bytes((i + seed) % 256 for i in range(n))
+
+INPUTS = [
+    ("random", _random, 20000, 1),
+    ("random", _random, 20000, 2),
+    ("random-small", _random, 37, 3),
+    ("periodic", _periodic, 15000, 4),
+    ("periodic", _periodic, 15000, 5),
+    ("constant", _constant, 5000, 6),
+    ("ramp", _ramp, 5000, 7),
+    ("empty", _random, 0, 8),
+]
+
+def _case_id(case):
+    kind, _, n, seed = case
+    return f"{kind}-{n}-{seed}"
+
+def _slices(data, records):
+    return [data[off:off + ln] for off, ln in records]
+
+@pytest.mark.parametrize("params", PARAMS, ids=lambda p: "w{}-{}_c{}-{}".format(*p))
+@pytest.mark.parametrize("case", INPUTS, ids=_case_id)
+def test_numpy_engine_matches_deque(case, params):
+    _, make, n, seed = case
+    data = make(n, seed)
+    expected = ae_cdc(data, *params, engine="deque")
+    assert ae_cdc(data, *params, engine="numpy") == expected
+
+@pytest.mark.parametrize("params", PARAMS, ids=lambda p: "w{}-{}_c{}-{}".format(*p))
+@pytest.mark.parametrize("case", INPUTS, ids=_case_id)
+def test_iter_matches_deque(case, params):
+    _, make, n, seed = case
+    data = make(n, seed)
+    expected = ae_cdc(data, *params, engine="deque")
+    assert _slices(data, iter_ae_cdc(data, *params)) == expected
+    # file object 입력: read_size를 작게 해 버퍼를 여러 번 다시 채우게 함
+    for read_size in (7, 64, 1000):
+        records = list(iter_ae_cdc(io.BytesIO(data), *params, read_size=read_size))
+        assert _slices(data, records) == expected
+
+def test_many_cuts():
+    data = _random(20000, 1)
+    assert len(ae_cdc(data, 4, 8, 16, 64, engine="deque")) > 200
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        ae_cdc(b"abc", engine="simd")
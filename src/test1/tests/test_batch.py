@@ -0,0 +1,98 @@
+import hashlib, os, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from client.batch import fetch_batch
+from utils.framing import pack_header, MISSING
+
+# /firmware/batch 응답을 직접 만들어 주는 로컬 서버로 fetch_batch의 오류 처리 확인
+#   형식이 깨지거나 중간에 끊긴 응답도 예외 없이 (받은 바이트, 실패 목록)으로 끝나고 .part 파일이 남지 않아야 한다
+
+A, B = b"a" * 5000, b"bb" * 3000
+
+
+def _meta(name, data):
+    return {"filename": name, "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+ENTRIES = [_meta("a.bin", A), _meta("b.bin", B)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status, body, length = self.server.reply
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        if length is not None:
+            self.send_header("Content-Length", str(length))
+        self.end_headers()
+        self.wfile.write(body)
+        self.close_connection = True
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _fetch(server, tmp_path, status, body, length=None):
+    server.reply = (status, body, length)
+    with requests.Session() as s:
+        total, failed = fetch_batch(s, f"http://127.0.0.1:{server.server_address[1]}", ENTRIES, str(tmp_path))
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".part")]
+    return total, failed
+
+
+def test_complete(server, tmp_path):
+    body = pack_header("a.bin", len(A)) + A + pack_header("b.bin", len(B)) + B
+    assert _fetch(server, tmp_path, 200, body) == (len(A) + len(B), [])
+    assert (tmp_path / "a.bin").read_bytes() == A
+    assert (tmp_path / "b.bin").read_bytes() == B
+
+
+def test_missing_frame(server, tmp_path):
+    body = pack_header("a.bin", 0, MISSING) + pack_header("b.bin", len(B)) + B
+    assert _fetch(server, tmp_path, 200, body) == (len(B), ["a.bin"])
+
+
+@pytest.mark.parametrize("declared", [False, True], ids=["close-delimited", "content-length"])
+def test_truncated_frame(server, tmp_path, declared):
+    body = pack_header("a.bin", len(A)) + A + pack_header("b.bin", len(B)) + B[:100]
+    total, failed = _fetch(server, tmp_path, 200, body, len(body) + 1000 if declared else None)
+    assert total == len(A) and failed == ["b.bin"]
+    assert sorted(os.listdir(tmp_path)) == ["a.bin"]
+
+
+def test_truncated_header(server, tmp_path):
+    body = pack_header("a.bin", len(A)) + A + pack_header("b.bin", len(B))[:5]
+    assert _fetch(server, tmp_path, 200, body) == (len(A), ["b.bin"])
+
+
+def test_unexpected_name(server, tmp_path):
+    body = pack_header("other.bin", len(A)) + A + pack_header("b.bin", len(B)) + B
+    assert _fetch(server, tmp_path, 200, body) == (0, ["a.bin", "b.bin"])
+    assert os.listdir(tmp_path) == []
+
+
+def test_repeated_name(server, tmp_path):
+    body = pack_header("a.bin", len(A)) + A + pack_header("a.bin", len(A)) + A + pack_header("b.bin", len(B)) + B
+    assert _fetch(server, tmp_path, 200, body) == (len(A), ["b.bin"])
+
+
+def test_corrupt_frame(server, tmp_path):
+    body = pack_header("a.bin", len(A)) + b"x" * len(A) + pack_header("b.bin", len(B)) + B
+    assert _fetch(server, tmp_path, 200, body) == (len(A) + len(B), ["a.bin"])
+    assert sorted(os.listdir(tmp_path)) == ["b.bin"]
+
+
+def test_http_error(server, tmp_path):
+    assert _fetch(server, tmp_path, 500, b"oops") == (0, ["a.bin", "b.bin"])
@@ -0,0 +1,58 @@
+import hashlib, json, random, threading
+import pytest
+import requests
+from server import server as ota
+from server import fast_server
+
+# fast_server의 조건부 요청: If-Range는 강한 비교만 (W/ ETag면 Range를 무시하고 전체 200),
+# If-None-Match는 약한 비교 (W/ ETag도 304)
+
+BODY = random.Random(4).randbytes(50000)
+NAME = "chunk_0000.bin"
+SHA = hashlib.sha256(BODY).hexdigest()
+
+
+@pytest.fixture(scope="module")
+def url(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("ota")
+    chunk_dir = tmp_path / "chunks"
+    chunk_dir.mkdir()
+    (chunk_dir / NAME).write_bytes(BODY)
+    (tmp_path / "manifest_ae.json").write_text(json.dumps([{"filename": NAME, "size": len(BODY), "sha256": SHA}]))
+    with pytest.MonkeyPatch.context() as mp:    # 서버 하나를 모듈의 테스트가 함께 씀
+        mp.setattr(ota, "CHUNK_DIR", str(chunk_dir))
+        mp.setattr(ota, "MANIFEST_PATH", str(tmp_path / "manifest_ae.json"))
+        mp.setattr(ota, "MANIFEST_BIN_PATH", str(tmp_path / "manifest_ae.bin"))
+        mp.setattr(ota, "_manifest_cache", None)
+        mp.setattr(ota, "_listing", None)
+        httpd = fast_server.make_server("127.0.0.1", 0, 2)
+        t = threading.Thread(target=httpd.serve_forever, daemon=True)
+        t.start()
+        yield f"http://127.0.0.1:{httpd.server_address[1]}/firmware/file/{NAME}"
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _get(url, **headers):
+    r = requests.get(url, headers=headers, timeout=10)
+    return r.status_code, r.content
+
+
+def test_if_range_strong_etag(url):
+    assert _get(url, Range="bytes=100-", **{"If-Range": f'"{SHA}"'}) == (206, BODY[100:])
+
+
+@pytest.mark.parametrize("if_range", [f'W/"{SHA}"', '"other"', "*", f'"other", "{SHA}"'],
+                         ids=["weak", "other", "star", "list"])
+def test_if_range_mismatch_sends_full_body(url, if_range):
+    assert _get(url, Range="bytes=100-", **{"If-Range": if_range}) == (200, BODY)
+
+
+def test_if_range_last_modified(url):
+    last_modified = requests.head(url, timeout=10).headers["Last-Modified"]
+    assert _get(url, Range="bytes=0-9", **{"If-Range": last_modified}) == (206, BODY[:10])
+
+
+@pytest.mark.parametrize("inm", [f'"{SHA}"', f'W/"{SHA}"', f'"other", W/"{SHA}"', "*"])
+def test_if_none_match_weak(url, inm):
+    assert _get(url, **{"If-None-Match": inm})[0] == 304
@@ -0,0 +1,66 @@
+import hashlib, json, random, threading
+import pytest
+import requests
+from server import server as ota
+from server import fast_server
+from scripts import check_metrics
+
+# 정해진 요청을 보낸 뒤 /metrics 증가량(요청 수, 히스토그램 버킷, 진행 중 요청, 보낸 바이트)이 맞는지
+# 임시 CHUNK_DIR / 매니페스트로 Flask 앱(test client)과 fast_server(임시 포트)에 대해 확인
+
+CHUNKS = 12
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    chunk_dir = tmp_path / "chunks"
+    chunk_dir.mkdir()
+    rng = random.Random(3)
+    manifest = []
+    for i in range(CHUNKS):
+        body = rng.randbytes(rng.randrange(1, 200000))
+        name = f"chunk_{i:04d}.bin"
+        (chunk_dir / name).write_bytes(body)
+        manifest.append({"filename": name, "size": len(body), "sha256": hashlib.sha256(body).hexdigest()})
+    (tmp_path / "manifest_ae.json").write_text(json.dumps(manifest))
+    monkeypatch.setattr(ota, "CHUNK_DIR", str(chunk_dir))
+    monkeypatch.setattr(ota, "MANIFEST_PATH", str(tmp_path / "manifest_ae.json"))
+    monkeypatch.setattr(ota, "MANIFEST_BIN_PATH", str(tmp_path / "manifest_ae.bin"))
+    monkeypatch.setattr(ota, "METRICS", True)
+    monkeypatch.setattr(ota, "_manifest_cache", None)
+    monkeypatch.setattr(ota, "_listing", None)
+    return manifest
+
+
+def _assert_checks(checks):
+    failed = [name for name, ok in checks.items() if not ok]
+    assert not failed
+
+
+def test_flask_app(data):
+    client = ota.app.test_client()
+
+    def get(path):
+        r = client.get(path, buffered=True)    # 본문을 끝까지 읽고 close → 메트릭 기록
+        return r.status_code, r.data
+
+    checks, _ = check_metrics.run(get, data)
+    _assert_checks(checks)
+
+
+@pytest.mark.parametrize("threads", [4, 0], ids=["pool", "per-connection"])
+def test_fast_server(data, threads):
+    httpd = fast_server.make_server("127.0.0.1", 0, threads)
+    t = threading.Thread(target=httpd.serve_forever, daemon=True)
+    t.start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        with requests.Session() as s:
+            def get(path):
+                r = s.get(f"{url}{path}", timeout=10)
+                return r.status_code, r.content
+            checks, _ = check_metrics.run(get, data)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    _assert_checks(checks)
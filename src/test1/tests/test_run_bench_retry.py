@@ -0,0 +1,87 @@
+import hashlib, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+
+# download_file 재시도 정책: 연결 오류 / 5xx는 MAX_ATTEMPTS까지 다시 시도, 4xx는 한 번만 보내고 바로 실패
+#   응답 상태를 차례로 돌려주는 로컬 서버로 요청 횟수를 센다
+
+BODY = b"chunk body " * 500
+META = {"filename": "c.bin", "size": len(BODY), "sha256": hashlib.sha256(BODY).hexdigest()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        srv = self.server
+        srv.requests += 1
+        status = srv.statuses.pop(0) if srv.statuses else 200
+        body = BODY if status == 200 else b"error"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def bench(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)                 # import 시 OUT_DIR(data/received)를 만듦
+    from client import run_bench
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.requests, srv.statuses = 0, []
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    monkeypatch.setattr(run_bench, "SERVER_URL", f"http://127.0.0.1:{srv.server_address[1]}")
+    monkeypatch.setattr(run_bench, "OUT_DIR", str(tmp_path))
+    monkeypatch.setattr(run_bench, "FAIL_PROB", 0)
+    monkeypatch.setattr(run_bench, "RETRY_BACKOFF", 0)
+    yield run_bench, srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.mark.parametrize("status", [400, 403, 404])
+def test_4xx_fails_without_retry(bench, status):
+    run_bench, srv = bench
+    srv.statuses = [status] * run_bench.MAX_ATTEMPTS
+    stats = run_bench.new_download_stats()
+    with pytest.raises(requests.HTTPError):
+        run_bench.download_file(META, stats)
+    assert srv.requests == 1
+    assert stats["attempts"] == 1 and stats["retries"] == 0
+
+
+@pytest.mark.parametrize("status", [500, 503])
+def test_5xx_is_retried(bench, status):
+    run_bench, srv = bench
+    srv.statuses = [status, status]
+    stats = run_bench.new_download_stats()
+    assert run_bench.download_file(META, stats) == len(BODY)
+    assert srv.requests == 3 and stats["retries"] == 2
+
+
+def test_5xx_gives_up_after_max_attempts(bench):
+    run_bench, srv = bench
+    srv.statuses = [502] * run_bench.MAX_ATTEMPTS
+    with pytest.raises(requests.HTTPError):
+        run_bench.download_file(META)
+    assert srv.requests == run_bench.MAX_ATTEMPTS
+
+
+def test_connection_error_is_retried(bench, monkeypatch):
+    run_bench, srv = bench
+    good = run_bench.SERVER_URL
+    calls = []
+
+    def fetch(url, *args):
+        calls.append(url)
+        if len(calls) == 1:
+            raise requests.ConnectionError("refused")
+        return real_fetch(url, *args)
+
+    real_fetch = run_bench._fetch
+    monkeypatch.setattr(run_bench, "_fetch", fetch)
+    assert run_bench.download_file(META) == len(BODY)
+    assert len(calls) == 2 and calls[1].startswith(good) and srv.requests == 1
@@ -0,0 +1,36 @@
+import struct
+
+# 배치 응답 프레임: [헤더 | 이름 | 데이터] 를 청크마다 이어 붙인 스트림
+#   헤더 = 상태(1B) | 이름 길이(2B) | 데이터 길이(8B), big-endian
+#   상태가 MISSING이면 데이터 없이 이름만 온다
+FRAME = struct.Struct(">BHQ")
+OK = 0
+MISSING = 1
+
+
+def pack_header(name: str, size: int, status: int = OK) -> bytes:
+    raw = name.encode("utf-8")
+    return FRAME.pack(status, len(raw), size) + raw
+
+
+def read_exact(f, n: int) -> bytes:
+    """f에서 정확히 n바이트를 읽음 (스트림이 먼저 끝나면 EOFError)"""
+    parts, got = [], 0
+    while got < n:
+        b = f.read(n - got)
+        if not b:
+            raise EOFError(f"stream ended after {got} of {n} bytes")
+        parts.append(b)
+        got += len(b)
+    return b"".join(parts)
+
+
+def read_header(f):
+    """다음 프레임 헤더 (status, name, size), 스트림 끝이면 None"""
+    first = f.read(FRAME.size)
+    if not first:
+        return None
+    if len(first) < FRAME.size:
+        first += read_exact(f, FRAME.size - len(first))
+    status, name_len, size = FRAME.unpack(first)
+    return status, read_exact(f, name_len).decode("utf-8"), size
@@ -1,5 +1,9 @@
+import os, mmap, hashlib
+import numpy as np
+from bisect import bisect_right
 from collections import deque
-from typing import Iterable, NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, NamedTuple, Sequence
 
 class Chunk(NamedTuple):
     offset: int
@@ -11,15 +15,23 @@ GEAR = [
     0x27d4eb2f,0x165667b1,0x9e3779b9,0x94d049bb,0x3c6ef372,0xbb67ae85,0xa54ff53a,0x510e527f,
 ] * 16  # 길이 256 맞춤
 
+# 바이트 값마다 서로 다른 256-entry gear 테이블 (SHA-256 앞 4바이트, 결정적)
+GEAR_256 = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], 'little') for i in range(256)]
+
+# 32비트 gear 해시는 1비트씩 밀리므로 마지막 32바이트만 값에 남는다.
+HASH_SPAN = 32
+
 def iter_chunks(buf: memoryview,
                 min_size: int, avg_size: int, max_size: int,
                 win_left: int = 256,       # ← FastCDC와 비슷한 평균을 위해 256 권장
-                mode: str = "max"          # "max" 또는 "min"
+                mode: str = "max",         # "max" 또는 "min"
+                gear: Sequence[int] = GEAR
                 ) -> Iterable[Chunk]:
     """
     AE-CDC (Asymmetric-Extremum) chunking:
       - strong cut: size >= MAX
       - normal cut: size >= AVG AND current hash is the left-window extremum
+    오프셋 대신 청크 데이터가 필요하면 chunk_views(buf, iter_chunks(...))로 복사 없는 view를 받는다
     """
     n = len(buf)
     if n == 0:
@@ -47,7 +59,7 @@ def iter_chunks(buf: memoryview,
 
     while i < n:
         b = buf[i]
-        h = ((h << 1) & 0xFFFFFFFF) ^ GEAR[b]
+        h = ((h << 1) & 0xFFFFFFFF) ^ gear[b]
         dq_push(i, h, greater)
         clen = i - off + 1
 
@@ -74,4 +86,205 @@ def iter_chunks(buf: memoryview,
 
     # 잔여
     if off < n:
-        yield Chunk(off, n - off)
\ No newline at end of file
+        yield Chunk(off, n - off)
+
+def chunk_views(buf, chunks: Iterable[Chunk]) -> Iterable[memoryview]:
+    """
+    Chunk(offset, length)를 buf의 memoryview 조각으로 변환 (복사 없음)
+      - iter_chunks / iter_chunks_fast / iter_chunks_parallel 결과 모두에 사용 가능
+      - view는 buf(mmap 등)를 참조하므로 buf를 닫기 전에 모두 놓아야 한다
+      - bytes가 필요하면 bytes(view)로 해당 청크만 복사
+    """
+    mv = memoryview(buf)
+    for c in chunks:
+        if c.length > 0:
+            yield mv[c.offset:c.offset + c.length]
+
+# ------------------------- 고속 모드 (NumPy) -------------------------
+FAST_BLOCK_MIN = 4 * 1024       # 첫 후보 구간 크기 (극값은 보통 AVG 직후 win_left 이내에 나옴)
+FAST_BLOCK_MAX = 1024 * 1024    # 후보 구간 최대 크기
+
+def _gear_hashes(x: np.ndarray, lo: int, hi: int, off: int, table: np.ndarray) -> np.ndarray:
+    """
+    [lo, hi) 위치의 gear 해시를 한 번에 계산
+    h_i = XOR_{k=0..31} table[x[i-k]] << k  (청크 시작 off 이전 바이트는 제외)
+    """
+    base = max(off, lo - HASH_SPAN + 1)
+    g = table[x[base:hi]]
+    m = hi - lo
+    h = np.zeros(m, dtype=np.uint32)
+    for k in range(HASH_SPAN):
+        s = lo - k - base
+        if s >= 0:
+            h ^= g[s:s + m] << np.uint32(k)
+        elif m + s > 0:
+            h[-s:] ^= g[:m + s] << np.uint32(k)
+    return h
+
+def _window_reduce(x: np.ndarray, w: int, ufunc) -> np.ndarray:
+    """x[k:k+w]의 최대/최소 (k = 0 .. len(x)-w), 블록 단위 prefix/suffix 누적으로 계산"""
+    m = len(x) - w + 1
+    nb = -(-len(x) // w)
+    padded = np.empty(nb * w, dtype=x.dtype)
+    padded[:len(x)] = x
+    padded[len(x):] = x[-1]
+    blocks = padded.reshape(nb, w)
+    pre = ufunc.accumulate(blocks, axis=1).ravel()
+    suf = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return ufunc(suf[:m], pre[w - 1:w - 1 + m])
+
+def iter_chunks_fast(buf,
+                     min_size: int, avg_size: int, max_size: int,
+                     win_left: int = 256,
+                     mode: str = "max",
+                     gear: Sequence[int] = GEAR
+                     ) -> Iterable[Chunk]:
+    """
+    iter_chunks()와 동일한 Chunk를 NumPy로 계산
+      - normal cut은 AVG 이상에서만 가능하므로 [off+AVG-1, off+MAX-2] 구간만 블록 단위로 판정
+      - 블록의 gear 해시는 테이블 조회 + shift/xor 32회로 한 번에 계산
+      - 좌측창 극값은 블록 단위 prefix/suffix max(min)로 계산
+    """
+    x = np.frombuffer(buf, dtype=np.uint8)
+    n = len(x)
+    table = np.asarray(gear, dtype=np.uint32)
+    greater = (mode == "max")
+    ufunc = np.maximum if greater else np.minimum
+    fill = np.uint32(0) if greater else np.uint32(0xFFFFFFFF)   # 창 밖 값 (극값에 영향 없음)
+    AVG, MAX = avg_size, max_size
+
+    off = 0
+    while off < n:
+        cut = None
+        a = off + max(AVG, 1) - 1
+        stop = min(off + MAX - 1, n)             # normal cut 후보: clen in [AVG, MAX-1]
+        block = FAST_BLOCK_MIN
+        while a < stop:
+            e = min(a + block, stop)
+            hb = max(off, a - win_left + 1)
+            h = _gear_hashes(x, hb, e, off, table)
+            pad = win_left - 1 - (a - hb)
+            if pad:
+                h = np.concatenate((np.full(pad, fill, dtype=np.uint32), h))
+            v = h[win_left - 1:]
+            ext = _window_reduce(h, win_left, ufunc)
+            hit = np.flatnonzero(v >= ext if greater else v <= ext)
+            if len(hit):
+                cut = a + int(hit[0])
+                break
+            a = e
+            block = min(block * 2, FAST_BLOCK_MAX)
+
+        if cut is not None:
+            yield Chunk(off, cut - off + 1)
+            off = cut + 1
+        elif off + MAX <= n:                     # strong cut
+            yield Chunk(off, MAX)
+            off += MAX
+        else:                                    # 잔여
+            yield Chunk(off, n - off)
+            off = n
+
+# ------------------------- 병렬 모드 -------------------------
+# 청크 시작점에서 win_left + HASH_SPAN - 1 바이트 이상 떨어진 위치의 극값 여부는
+# 시작점과 무관하므로, 파일을 구간으로 나눠 독립적으로 계산할 수 있다.
+
+def _first_extremum(buf, off: int, lo: int, hi: int, win_left: int, greater: bool, gear: Sequence[int] = GEAR):
+    """off에서 시작한 청크 기준으로 [lo, hi)에서 좌측창 극값인 첫 위치 (없으면 None)"""
+    dq = deque()
+    h = 0
+    for i in range(off, hi):
+        h = ((h << 1) & 0xFFFFFFFF) ^ gear[buf[i]]
+        if greater:
+            while dq and dq[-1][1] <= h: dq.pop()
+        else:
+            while dq and dq[-1][1] >= h: dq.pop()
+        dq.append((i, h))
+        if i >= lo:
+            left = max(off, i - win_left + 1)
+            while dq[0][0] < left: dq.popleft()
+            if dq[0][0] == i:
+                return i
+    return None
+
+def _scan_segment(args):
+    """
+    [seg_start, seg_end)의 좌측창 극값 위치를 연속 구간 (starts, ends)로 반환
+    해시와 창은 이음매 앞쪽 바이트부터 다시 계산하므로 구간 경계에서도 정확하다
+    """
+    path, seg_start, seg_end, win_left, mode, gear = args
+    greater = (mode == "max")
+    starts, ends = [], []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        dq = deque()
+        h = 0
+        run = -1
+        for i in range(max(0, seg_start - win_left - HASH_SPAN + 1), seg_end):
+            h = ((h << 1) & 0xFFFFFFFF) ^ gear[mm[i]]
+            if greater:
+                while dq and dq[-1][1] <= h: dq.pop()
+            else:
+                while dq and dq[-1][1] >= h: dq.pop()
+            dq.append((i, h))
+            if i < seg_start:
+                continue
+            left = i - win_left + 1
+            while dq[0][0] < left: dq.popleft()
+            if dq[0][0] == i:
+                if run < 0: run = i
+            elif run >= 0:
+                starts.append(run); ends.append(i); run = -1
+        if run >= 0:
+            starts.append(run); ends.append(seg_end)
+    return starts, ends
+
+def iter_chunks_parallel(path: str,
+                         min_size: int, avg_size: int, max_size: int,
+                         win_left: int = 256,
+                         mode: str = "max",
+                         workers: int = 0,
+                         gear: Sequence[int] = GEAR
+                         ) -> List[Chunk]:
+    """
+    iter_chunks()와 동일한 결과를 프로세스 풀로 계산
+      - 각 워커: 파일 구간에서 좌측창 극값 위치(청크 시작점과 무관)를 계산
+      - 메인: 순차적으로 청크를 이어 붙이며, 시작점 부근(win_left + 31 바이트 이내)의
+              위치만 청크 시작점 기준으로 다시 스캔해 보정
+    """
+    n = os.path.getsize(path)
+    if n == 0:
+        return []
+    workers = workers or os.cpu_count() or 1
+    seg = -(-n // workers)
+    gear = tuple(gear)
+    jobs = [(path, p, min(p + seg, n), win_left, mode, gear) for p in range(0, n, seg)]
+    with ProcessPoolExecutor(max_workers=len(jobs)) as ex:
+        parts = list(ex.map(_scan_segment, jobs))
+    starts = [s for p in parts for s in p[0]]
+    ends = [e for p in parts for e in p[1]]
+
+    greater = (mode == "max")
+    AVG, MAX = avg_size, max_size
+    chunks = []
+    off = 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while off < n:
+            # normal cut 후보: clen in [AVG, MAX-1]
+            lo = off + AVG - 1
+            hi = min(off + MAX - 1, n)
+            exact_hi = min(max(lo, off + win_left + HASH_SPAN - 1), hi)
+            cut = _first_extremum(mm, off, lo, exact_hi, win_left, greater, gear) if lo < exact_hi else None
+            if cut is None and exact_hi < hi:
+                k = bisect_right(ends, exact_hi)
+                if k < len(starts) and starts[k] < hi:
+                    cut = max(starts[k], exact_hi)
+            if cut is not None:
+                chunks.append(Chunk(off, cut - off + 1))
+                off = cut + 1
+            elif off + MAX <= n:        # strong cut
+                chunks.append(Chunk(off, MAX))
+                off += MAX
+            else:                       # 잔여
+                chunks.append(Chunk(off, n - off))
+                off = n
+    return chunks
@@ -0,0 +1,128 @@
+# 청크 단위 압축 (표준 라이브러리 zlib / lzma)
+#   codec id: 0 = 그대로(raw), 1 = zlib, 2 = lzma
+#   먼저 앞부분 샘플을 zlib level 1로 압축해 보고(trial) 줄지 않으면 압축하지 않는다
+#   압축 결과도 충분히 작지 않으면 raw로 저장 → 이미 압축된 데이터(gzip 레이어 등)는 비용 없이 통과
+# src/test1/utils/chunk_codec.py(OTA 서버용)와 codec id / 압축 규칙이 같은 복사본: 트리마다 따로 실행되므로 둘 다 고친다
+#   이쪽 codec id는 pack index 길이 필드의 상위 바이트에 저장된다 (chunk_store)
+
+import time, zlib, lzma
+
+RAW, ZLIB, LZMA = 0, 1, 2
+NAMES = {RAW: 'none', ZLIB: 'zlib', LZMA: 'lzma'}
+IDS = {v: k for k, v in NAMES.items()}
+MIN_SIZE = 256              # 이보다 작은 청크는 압축하지 않음
+SAMPLE = 4 * 1024           # trial 압축 샘플 크기 (청크 앞부분)
+SAMPLE_RATIO = 0.9          # 샘플이 이 비율보다 덜 줄면 압축하지 않음
+MAX_RATIO = 0.97            # 압축 결과가 이 비율 이상이면 raw로 저장
+
+def codec_id(name: str) -> int:
+    if name not in IDS:
+        raise ValueError(f"unknown chunk codec: {name} (none/zlib/lzma)")
+    return IDS[name]
+
+def compress(data, codec: int, level=None):
+    """(실제 사용한 codec, 저장할 데이터). raw면 data를 그대로(복사 없이) 돌려준다"""
+    n = len(data)
+    if codec == RAW or n < MIN_SIZE:
+        return RAW, data
+    sample = data[:SAMPLE]
+    if len(zlib.compress(sample, 1)) >= len(sample) * SAMPLE_RATIO:
+        return RAW, data
+    if codec == ZLIB:
+        out = zlib.compress(data, 6 if level is None else level)
+    elif codec == LZMA:
+        out = lzma.compress(data, preset=6 if level is None else level)
+    else:
+        raise ValueError(f"unknown chunk codec id: {codec}")
+    if len(out) >= n * MAX_RATIO:
+        return RAW, data
+    return codec, out
+
+def decompress(codec: int, data) -> bytes:
+    if codec == RAW: return data
+    if codec == ZLIB: return zlib.decompress(data)
+    if codec == LZMA: return lzma.decompress(data)
+    raise ValueError(f"unknown chunk codec id: {codec}")
+
+class Decoder:
+    """
+    스트리밍 해제: feed()에 받은 순서대로 넣고, 끝나면 finish()로 나머지와 완결 여부 확인
+    깨진 데이터나 덜 받은 데이터는 ValueError
+    """
+    def __init__(self, codec: int):
+        self.codec = codec
+        if codec == ZLIB: self.d = zlib.decompressobj()
+        elif codec == LZMA: self.d = lzma.LZMADecompressor()
+        elif codec == RAW: self.d = None
+        else: raise ValueError(f"unknown chunk codec id: {codec}")
+
+    def feed(self, data) -> bytes:
+        if self.d is None: return bytes(data)
+        try:
+            return self.d.decompress(data)
+        except (zlib.error, lzma.LZMAError, EOFError) as e:
+            raise ValueError(f"corrupt {NAMES[self.codec]} chunk: {e}") from e
+
+    def finish(self) -> bytes:
+        if self.codec == ZLIB:
+            try:
+                out = self.d.flush()
+            except zlib.error as e:
+                raise ValueError(f"corrupt zlib chunk: {e}") from e
+            if not self.d.eof: raise ValueError("truncated zlib chunk")
+            return out
+        if self.codec == LZMA and not self.d.eof:
+            raise ValueError("truncated lzma chunk")
+        return b''
+
+# ---------- 통계 (codec별 압축률 / 해제 속도) ----------
+STAT_KEYS = ('chunks', 'raw_bytes', 'stored_bytes', 'decode_bytes', 'decode_time')
+
+def new_stats():
+    return {f'codec_{name}_{k}': 0 for name in NAMES.values() for k in STAT_KEYS}
+
+def count_put(stats, codec: int, raw_len: int, stored_len: int):
+    p = f'codec_{NAMES[codec]}_'
+    stats[p + 'chunks'] += 1; stats[p + 'raw_bytes'] += raw_len; stats[p + 'stored_bytes'] += stored_len
+
+def timed_decompress(stats, codec: int, data) -> bytes:
+    t = time.perf_counter()
+    out = decompress(codec, data)
+    p = f'codec_{NAMES[codec]}_'
+    stats[p + 'decode_time'] += time.perf_counter() - t; stats[p + 'decode_bytes'] += len(out)
+    return out
+
+def timed_feed(stats, dec: Decoder, data) -> bytes:
+    """스트리밍 해제 + 통계 (받는 중에 조금씩 해제하는 클라이언트용)"""
+    t = time.perf_counter()
+    out = dec.feed(data)
+    p = f'codec_{NAMES[dec.codec]}_'
+    stats[p + 'decode_time'] += time.perf_counter() - t; stats[p + 'decode_bytes'] += len(out)
+    return out
+
+def summarize(stats):
+    """{codec 이름: {chunks, raw_bytes, stored_bytes, ratio, decode_bytes, decode_MBps}} (쓰인 codec만)"""
+    out = {}
+    for name in NAMES.values():
+        p = f'codec_{name}_'
+        raw, stored, db, t = (stats[p + k] for k in ('raw_bytes', 'stored_bytes', 'decode_bytes', 'decode_time'))
+        if not stats[p + 'chunks'] and not db: continue
+        out[name] = {
+            'chunks': stats[p + 'chunks'], 'raw_bytes': raw, 'stored_bytes': stored,
+            'ratio': round(stored / raw, 4) if raw else 0.0,
+            'decode_bytes': db, 'decode_MBps': round(db / 1024 / 1024 / t, 2) if t > 0 else 0.0,
+        }
+    return out
+
+def format_stats(stats):
+    """codec마다 한 줄: 청크 수와 압축률 (저장한 경우), 해제 MB/s (해제한 경우)"""
+    lines = []
+    for name, s in summarize(stats).items():
+        parts = []
+        if s['chunks']:
+            parts.append(f"청크 {s['chunks']:,}, {s['raw_bytes']/1024/1024:.2f} MB → {s['stored_bytes']/1024/1024:.2f} MB"
+                         f" ({s['ratio'] * 100:.1f}%)")
+        if s['decode_bytes']:
+            parts.append(f"해제 {s['decode_bytes']/1024/1024:.2f} MB, {s['decode_MBps']:.1f} MB/s")
+        lines.append(f"{name}: " + ", ".join(parts))
+    return lines
@@ -0,0 +1,469 @@
+# append-only pack 기반 청크 저장소
+#   <root>/packs/pack-XXXXXXXX.pack : 청크 데이터를 이어 붙인 파일
+#   <root>/index                    : digest 순으로 정렬된 고정폭 레코드 (mmap 후 이분 탐색)
+#   <root>/fingerprints             : 존재 여부 판정용 메모리 index (fingerprint_index.py) 스냅샷
+
+import os, io, sys, mmap, struct, re, heapq, errno, threading, contextlib
+from bisect import bisect_right
+from fingerprint_index import FingerprintIndex
+import manifest_bin
+import chunk_codec
+
+INDEX_MAGIC = b'AECIDX1\0'
+RECORD = struct.Struct('<32sIQQ')   # digest(32B) | pack id u32 | offset u64 | codec(상위 8비트) + 저장 길이 u64
+CODEC_SHIFT = 56                    # codec이 raw(0)이면 기존 index와 같은 바이트
+LEN_MASK = (1 << CODEC_SHIFT) - 1
+PACK_SIZE = 256 * 1024 * 1024       # pack 하나의 최대 크기
+WRITE_BATCH = 4 * 1024 * 1024       # 이 크기만큼 모아서 한 번에 append
+IOV_MAX = os.sysconf('SC_IOV_MAX') if hasattr(os, 'sysconf') else 1024  # writev 한 번에 넘길 버퍼 수
+HEX_NAME = re.compile(r'^[0-9a-f]{64}$')
+COPY_BLOCK = 1024 * 1024            # 커널 복사를 쓸 수 없을 때 pread/pwrite 단위
+READ_AHEAD = 256 * 1024             # ChunkedFile이 한 번에 미리 읽는 최소 크기
+_NO_KERNEL_COPY = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM, errno.EBADF)
+_use_copy_file_range = hasattr(os, 'copy_file_range')
+_use_sendfile = hasattr(os, 'sendfile')
+
+class PackStore:
+    """
+    digest → (pack, offset, length) 저장소
+      - put(): 청크(bytes 또는 mmap의 memoryview)를 복사 없이 모았다가 writev로 pack 끝에 append
+               memoryview를 넘겼다면 원본 버퍼를 닫기 전에 drain()을 호출해야 한다
+      - flush(): 새 항목을 기존 index와 병합해 원자적으로 다시 쓴다 (임시 파일 + rename)
+      - "이미 있는가?"는 메모리의 FingerprintIndex로 판정하고, 위치는 index에서 찾는다
+      - codec을 주면 청크마다 압축해 보고 줄어드는 경우에만 압축해 저장 (chunk_codec), 읽을 때 자동 해제
+      - remove(): 참조가 없어진 청크를 index에서 빼고, compact(): 죽은 바이트가 많은 pack을 다시 써서 공간 회수 (refcount.py)
+    여러 프로세스가 동시에 쓸 때는 프로세스마다 PackStore를 열어 각자의 pack에 쓰고,
+    take_entries()로 넘긴 항목을 메인 프로세스의 add_entries()로 모아 index를 한 번만 쓴다
+    """
+    def __init__(self, root: str, bloom: bool = True, codec: int = chunk_codec.RAW, level=None):
+        self.root = root
+        self.bloom = bloom
+        self.codec, self.level = codec, level
+        self.codec_stats = chunk_codec.new_stats()
+        self.stats_lock = threading.Lock()
+        self.pack_dir = os.path.join(root, 'packs')
+        self.index_path = os.path.join(root, 'index')
+        self.fp_path = os.path.join(root, 'fingerprints')
+        os.makedirs(self.pack_dir, exist_ok=True)
+        self.new = {}                   # digest → (pack, offset, length), index에 아직 없는 항목
+        self.taken = {}                 # take_entries()로 넘겨준 항목 (위치 조회용)
+        self.readers = {}               # pack id → 읽기용 file object
+        self.readers_lock = threading.Lock()  # 재조립 스레드들이 reader를 함께 씀
+        self.cur, self.cur_id, self.cur_size = None, -1, 0
+        self.buf, self.buf_size = [], 0
+        self.idx_mm, self.count = None, 0
+        self._load_index()
+        self.fp = self._load_fingerprints(bloom)
+
+    # ---------- index ----------
+    def _load_index(self):
+        if self.idx_mm is not None:
+            self.idx_mm.close()
+        self.idx_mm, self.count = None, 0
+        if os.path.exists(self.index_path) and os.path.getsize(self.index_path) > len(INDEX_MAGIC):
+            with open(self.index_path, 'rb') as f:
+                self.idx_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.idx_mm[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+                raise ValueError(f"not a chunk index: {self.index_path}")
+            self.count = (len(self.idx_mm) - len(INDEX_MAGIC)) // RECORD.size
+
+    def _find(self, d: bytes):
+        mm, lo, hi = self.idx_mm, 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            p = len(INDEX_MAGIC) + mid * RECORD.size
+            k = mm[p:p + 32]
+            if k < d: lo = mid + 1
+            elif k > d: hi = mid
+            else:
+                pack_id, off, ln = RECORD.unpack_from(mm, p)[1:]
+                return pack_id, off, ln & LEN_MASK, ln >> CODEC_SHIFT
+        return None
+
+    def _records(self):
+        mm = self.idx_mm
+        for i in range(self.count):
+            p = len(INDEX_MAGIC) + i * RECORD.size
+            yield mm[p:p + RECORD.size]
+
+    def _load_fingerprints(self, bloom: bool, rebuild: bool = False):
+        # 스냅샷 항목 수가 index와 다르면 (중단된 실행 등) index에서 다시 만든다
+        fp = None if rebuild else FingerprintIndex.load(self.fp_path, bloom)
+        if fp is not None and len(fp) == self.count:
+            return fp
+        fp = FingerprintIndex.for_items(self.count, bloom)
+        for rec in self._records():
+            fp.add(bytes(rec[:32]))
+        return fp
+
+    def locate(self, h: str):
+        """(pack id, offset, 저장 길이, codec) 또는 None"""
+        d = bytes.fromhex(h)
+        loc = self.new.get(d) or self.taken.get(d)
+        if loc is None and self.count:
+            loc = self._find(d)
+        return loc
+
+    def has(self, h: str) -> bool:
+        return self.locate(h) is not None
+
+    # ---------- 쓰기 ----------
+    def pack_path(self, pack_id: int) -> str:
+        return os.path.join(self.pack_dir, f'pack-{pack_id:08d}.pack')
+
+    def _open_pack(self):
+        self._flush_buf()
+        if self.cur is not None: self.cur.close()
+        # 다른 프로세스와 id가 겹치지 않도록 O_EXCL로 새 pack 생성
+        ids = [int(n[5:13]) for n in os.listdir(self.pack_dir) if n.startswith('pack-')]
+        pack_id = max(ids, default=-1) + 1
+        while True:
+            try:
+                fd = os.open(self.pack_path(pack_id), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                break
+            except FileExistsError:
+                pack_id += 1
+        self.cur, self.cur_id, self.cur_size = os.fdopen(fd, 'wb', buffering=0), pack_id, 0
+
+    def _flush_buf(self):
+        # 모인 청크들을 vectored write로 기록 (부분 쓰기면 남은 부분부터 다시)
+        if not self.buf: return
+        bufs, fd, i = self.buf, self.cur.fileno(), 0
+        while i < len(bufs):
+            n = os.writev(fd, bufs[i:i + IOV_MAX])
+            while i < len(bufs) and n >= len(bufs[i]):
+                n -= len(bufs[i]); i += 1
+            if n: bufs[i] = memoryview(bufs[i])[n:]
+        self.buf, self.buf_size = [], 0
+
+    def drain(self):
+        """버퍼에 잡아 둔 청크를 pack에 써서 원본 버퍼(mmap 등)에 대한 참조를 놓는다"""
+        if self.cur is not None: self._flush_buf()
+
+    def put(self, h: str, data) -> bool:
+        """없으면 추가하고 True, 이미 있으면 False"""
+        d = bytes.fromhex(h)
+        if self.fp.contains(d):
+            return False
+        self.fp.add(d)
+        raw_len = len(data)
+        codec, data = chunk_codec.compress(data, self.codec, self.level)
+        chunk_codec.count_put(self.codec_stats, codec, raw_len, len(data))
+        if self.cur is None or (self.cur_size and self.cur_size + len(data) > PACK_SIZE):
+            self._open_pack()
+        self.new[d] = (self.cur_id, self.cur_size, len(data), codec)
+        self.buf.append(data)
+        self.cur_size += len(data); self.buf_size += len(data)
+        if self.buf_size >= WRITE_BATCH:
+            self._flush_buf()
+        return True
+
+    def take_entries(self):
+        """pack 버퍼를 내려쓰고, 아직 넘기지 않은 새 항목 목록 반환"""
+        self.drain()
+        entries = [(d,) + loc for d, loc in self.new.items()]
+        self.taken.update(self.new)
+        self.new = {}
+        return entries
+
+    def add_entries(self, entries):
+        """다른 프로세스가 쓴 항목을 병합. 새로 추가된 (청크 수, 바이트) 반환"""
+        count = size = 0
+        for d, pack_id, off, ln, codec in entries:
+            if not self.fp.add(d):
+                continue  # 동시에 쓴 중복 청크: 먼저 병합된 쪽만 참조
+            self.new[d] = (pack_id, off, ln, codec)
+            count += 1; size += ln
+        return count, size
+
+    def close(self):
+        """pack 데이터만 내려쓰고 닫음 (index는 쓰지 않음)"""
+        if self.cur is not None:
+            self._flush_buf()
+            self.cur.close()
+            self.cur, self.cur_id, self.cur_size = None, -1, 0
+        for r in self.readers.values(): r.close()
+        self.readers = {}
+
+    def flush(self):
+        """pack을 닫고 새 항목을 index에 병합해 원자적으로 교체 (fingerprint 스냅샷도 함께)"""
+        self.close()
+        if not self.new:
+            if self.fp.dirty: self.fp.save(self.fp_path)
+            return
+        fresh = sorted(RECORD.pack(d, p, off, ln | codec << CODEC_SHIFT) for d, (p, off, ln, codec) in self.new.items())
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'wb') as w:
+            w.write(INDEX_MAGIC)
+            w.writelines(heapq.merge(self._records(), fresh))
+        os.replace(tmp, self.index_path)
+        self.new = {}
+        self._load_index()
+        self.fp.save(self.fp_path)
+
+    # ---------- 삭제 / 공간 회수 ----------
+    def _rewrite_index(self, records):
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'wb') as w:
+            w.write(INDEX_MAGIC)
+            w.writelines(records)
+        os.replace(tmp, self.index_path)
+        self._load_index()
+
+    def remove(self, digests):
+        """
+        digest(32B) 집합을 index와 fingerprint에서 뺀다. (뺀 청크 수, 저장 바이트)
+        pack 안의 데이터는 그대로 남으며 compact()가 회수한다
+        """
+        self.flush()
+        dead = set(digests)
+        if not dead or not self.count:
+            return 0, 0
+        count = size = 0
+        keep = []
+        for rec in self._records():
+            if rec[:32] in dead:
+                count += 1; size += RECORD.unpack(rec)[3] & LEN_MASK
+            else:
+                keep.append(rec)
+        if count:
+            self._rewrite_index(keep)
+            self.fp = self._load_fingerprints(self.bloom, rebuild=True)  # open-addressing 테이블은 삭제가 없으므로 다시 만든다
+            self.fp.save(self.fp_path)
+        return count, size
+
+    def pack_usage(self):
+        """pack id → [index가 참조하는 저장 바이트, 파일 크기]"""
+        usage = {}
+        for n in os.listdir(self.pack_dir):
+            if n.startswith('pack-') and n.endswith('.pack'):
+                usage[int(n[5:13])] = [0, os.path.getsize(os.path.join(self.pack_dir, n))]
+        for rec in self._records():
+            _, pack_id, _, ln = RECORD.unpack(rec)
+            if pack_id in usage: usage[pack_id][0] += ln & LEN_MASK
+        return usage
+
+    def compact(self, pack_ids) -> int:
+        """
+        pack_ids에 남은 청크를 새 pack으로 옮기고 (저장된 바이트 그대로, 재압축 없음) 기존 pack 삭제
+        새 index를 원자적으로 쓴 다음에 지우므로 중간에 끊겨도 청크를 잃지 않는다. 회수한 바이트 반환
+        """
+        self.flush()
+        ids = set(pack_ids)
+        if not ids:
+            return 0
+        before = sum(os.path.getsize(self.pack_path(p)) for p in ids if os.path.exists(self.pack_path(p)))
+        records, moved = [], 0
+        for rec in self._records():
+            d, pack_id, off, ln = RECORD.unpack(rec)
+            if pack_id in ids:
+                n = ln & LEN_MASK
+                data = os.pread(self._reader_fd(pack_id), n, off)
+                if len(data) != n:
+                    raise EOFError(f"pack truncated: pack {pack_id} offset {off}")
+                if self.cur is None or (self.cur_size and self.cur_size + n > PACK_SIZE):
+                    self._open_pack()
+                rec = RECORD.pack(d, self.cur_id, self.cur_size, ln)
+                self.buf.append(data)
+                self.cur_size += n; self.buf_size += n; moved += n
+                if self.buf_size >= WRITE_BATCH:
+                    self._flush_buf()
+            records.append(rec)
+        if self.cur is not None:
+            self._flush_buf()
+            os.fsync(self.cur.fileno())
+        self.close()
+        self._rewrite_index(records)
+        for p in ids:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.pack_path(p))
+        return before - moved
+
+    # ---------- 읽기 ----------
+    def _read_loc(self, loc) -> bytes:
+        pack_id, off, ln, codec = loc
+        data = os.pread(self._reader_fd(pack_id), ln, off)
+        if len(data) != ln:
+            raise EOFError(f"pack truncated: pack {pack_id} offset {off}")
+        if codec == chunk_codec.RAW:
+            return data
+        stats = chunk_codec.new_stats()
+        out = chunk_codec.timed_decompress(stats, codec, data)
+        with self.stats_lock:
+            for k, v in stats.items():
+                if v: self.codec_stats[k] += v
+        return out
+
+    def read(self, h: str) -> bytes:
+        loc = self.locate(h)
+        if loc is None:
+            raise KeyError(h)
+        return self._read_loc(loc)
+
+    def take_codec_stats(self):
+        """codec별 저장/해제 통계를 돌려주고 0으로 초기화"""
+        with self.stats_lock:
+            s, self.codec_stats = self.codec_stats, chunk_codec.new_stats()
+        return s
+
+    def copy_to(self, h: str, fd: int, dst_off: int) -> int:
+        """청크를 fd의 dst_off 위치로 커널 안에서 복사하고 (압축된 청크는 해제해 pwrite) 길이 반환"""
+        loc = self.locate(h)
+        if loc is None:
+            raise KeyError(h)
+        pack_id, off, ln, codec = loc
+        if codec != chunk_codec.RAW:
+            data = self._read_loc(loc)
+            mv, pos = memoryview(data), 0
+            while pos < len(mv):
+                pos += os.pwrite(fd, mv[pos:], dst_off + pos)
+            return len(data)
+        splice(self._reader_fd(pack_id), off, fd, dst_off, ln)
+        return ln
+
+    def _reader_fd(self, pack_id: int) -> int:
+        if pack_id == self.cur_id:
+            self._flush_buf()
+        r = self.readers.get(pack_id)
+        if r is None:
+            with self.readers_lock:
+                r = self.readers.get(pack_id)
+                if r is None:
+                    r = self.readers[pack_id] = open(self.pack_path(pack_id), 'rb')
+        return r.fileno()
+
+    def open_manifest(self, manifest_path: str, read_ahead: int = READ_AHEAD) -> 'ChunkedFile':
+        """청크 digest 목록(매니페스트)을 재조립하지 않고 읽기 전용 파일로 연다"""
+        hashes, sizes = manifest_bin.load_entries(manifest_path)
+        return ChunkedFile(self, hashes, read_ahead, sizes)
+
+# ------------------------- 매니페스트 기반 가상 파일 -------------------------
+class ChunkedFile(io.RawIOBase):
+    """
+    매니페스트의 청크 목록을 이어 붙인 것처럼 보이는 읽기 전용, seek 가능한 파일
+      - 청크 시작 오프셋의 누적 합(prefix sum) + bisect로 위치 → 청크 변환
+      - pack 안에서 연속으로 놓인 청크들은 pread 한 번으로 read_ahead 이상씩 미리 읽는다
+      - 압축된 청크는 하나씩 읽어 해제 (원래 크기는 매니페스트의 sizes, 없으면 해제해서 구함)
+    tarfile.open(fileobj=...) 등 일반 파일 객체 자리에 그대로 쓸 수 있다
+    """
+    def __init__(self, store: PackStore, hashes, read_ahead: int = READ_AHEAD, sizes=None):
+        super().__init__()
+        self.store, self.read_ahead = store, read_ahead
+        self.locs, self.starts = [], []
+        pos = 0
+        for i, h in enumerate(hashes):
+            loc = store.locate(h)
+            if loc is None:
+                raise KeyError(h)
+            self.locs.append(loc); self.starts.append(pos)
+            if loc[3] == chunk_codec.RAW: pos += loc[2]
+            elif sizes is not None: pos += sizes[i]
+            else: pos += len(store._read_loc(loc))
+        self.size, self.pos = pos, 0
+        self.buf, self.buf_start = b'', 0
+
+    def readable(self): return True
+    def seekable(self): return True
+    def tell(self): return self.pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET: pos = offset
+        elif whence == io.SEEK_CUR: pos = self.pos + offset
+        elif whence == io.SEEK_END: pos = self.size + offset
+        else: raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self.pos = pos
+        return pos
+
+    def _fill(self, pos: int):
+        # pos가 속한 청크부터, 같은 pack에서 이어지는 청크들을 read_ahead 이상 모아 한 번에 읽음
+        k = bisect_right(self.starts, pos) - 1
+        self.buf_start = self.starts[k]
+        parts, got = [], 0
+        while k < len(self.locs) and got < self.read_ahead:
+            pack_id, off, ln, codec = self.locs[k]
+            if codec != chunk_codec.RAW:
+                data = self.store._read_loc(self.locs[k])
+                parts.append(data); got += len(data); k += 1
+                continue
+            j = k + 1
+            while (j < len(self.locs) and got + ln < self.read_ahead and self.locs[j][3] == chunk_codec.RAW
+                   and self.locs[j][0] == pack_id and self.locs[j][1] == off + ln):
+                ln += self.locs[j][2]; j += 1
+            data = os.pread(self.store._reader_fd(pack_id), ln, off)
+            if len(data) != ln:
+                raise EOFError(f"pack truncated: pack {pack_id} offset {off}")
+            parts.append(data); got += ln; k = j
+        self.buf = parts[0] if len(parts) == 1 else b''.join(parts)
+
+    def readinto(self, b) -> int:
+        mv = memoryview(b).cast('B')
+        n = 0
+        while n < len(mv) and self.pos < self.size:
+            i = self.pos - self.buf_start
+            if not 0 <= i < len(self.buf):
+                self._fill(self.pos)
+                i = self.pos - self.buf_start
+            k = min(len(mv) - n, len(self.buf) - i)
+            mv[n:n + k] = self.buf[i:i + k]
+            n += k; self.pos += k
+        return n
+
+# ------------------------- 파일 간 복사 -------------------------
+def splice(src: int, src_off: int, dst: int, dst_off: int, n: int):
+    """
+    src[src_off:src_off+n] → dst[dst_off:] 복사
+      copy_file_range(같은 파일시스템이면 reflink/커널 복사) → sendfile → pread/pwrite 순으로 시도
+    """
+    global _use_copy_file_range, _use_sendfile
+    while n > 0:
+        if _use_copy_file_range:
+            try:
+                k = os.copy_file_range(src, dst, n, src_off, dst_off)
+            except OSError as e:
+                if e.errno not in _NO_KERNEL_COPY: raise
+                _use_copy_file_range = False
+                continue
+        elif _use_sendfile:
+            try:
+                os.lseek(dst, dst_off, os.SEEK_SET)
+                k = os.sendfile(dst, src, src_off, n)
+            except OSError as e:
+                if e.errno not in _NO_KERNEL_COPY: raise
+                _use_sendfile = False
+                continue
+        else:
+            k = os.pwrite(dst, os.pread(src, min(n, COPY_BLOCK), src_off), dst_off)
+        if k == 0:
+            raise EOFError(f"pack truncated: {n} bytes missing at offset {src_off}")
+        src_off += k; dst_off += k; n -= k
+
+def preallocate(fd: int, size: int):
+    """출력 파일 크기를 미리 확보 (posix_fallocate, 지원하지 않으면 ftruncate)"""
+    if size <= 0:
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, size)
+
+# ------------------------- 마이그레이션 -------------------------
+def migrate_flat_dir(root: str) -> int:
+    """<root>/<64 hex> 형태의 기존 청크 파일을 pack으로 옮기고 원본 삭제. 옮긴 청크 수 반환"""
+    names = [n for n in os.listdir(root) if HEX_NAME.match(n) and os.path.isfile(os.path.join(root, n))]
+    if not names:
+        return 0
+    store = PackStore(root)
+    for n in names:
+        with open(os.path.join(root, n), 'rb') as r:
+            store.put(n, r.read())
+    store.flush()
+    for n in names:
+        os.remove(os.path.join(root, n))
+    return len(names)
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] != 'migrate':
+        print(f"사용법: {sys.argv[0]} migrate <chunks_dir>", file=sys.stderr); sys.exit(2)
+    print(f"migrated {migrate_flat_dir(sys.argv[2])} chunks")
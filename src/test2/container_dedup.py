@@ -2,8 +2,17 @@
 # OCI → AE-CDC chunk → Reassemble → Merge Layers(whiteout) → Import(podman)
 # 최소 로그: 단계 배너만 출력, 마지막 run에만 명령 줄 출력
 
-import os, sys, json, shutil, tarfile, mmap, subprocess, re, hashlib
+import os, sys, json, shutil, tarfile, mmap, subprocess, contextlib, hashlib, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import ae_cdc  
+import chunk_store
+import split_pipeline
+import layer_plan
+from layer_plan import clean_path
+import manifest_bin
+import chunk_codec
+import manifest_cache
+import refcount
 
 # --- 경로/설정 ---
 HERE = os.path.dirname(__file__)
@@ -13,11 +22,38 @@ MANIFESTS_DIR     = os.path.join(HERE, 'manifests')
 REASSEMBLED_DIR   = os.path.join(HERE, 'reassembled_oci')
 MERGED_ROOTFS_DIR = os.path.join(REASSEMBLED_DIR, '_merged_rootfs')
 IMAGE_NAME = os.environ.get("IMAGE_NAME", "ubuntu-aecdc:latest")
+PODMAN_IMPORT = [
+    'podman','import',
+    '--change','ENV PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin',
+    '--change','CMD ["/bin/sh","-lc","echo OK"]',
+    '-', IMAGE_NAME
+]
 
 AVG = 64 * 1024
 MIN = AVG // 2
 MAX = AVG * 2
 WIN = 256  # AE-CDC 좌측 창
+AECDC_ENGINE = os.environ.get("AECDC_ENGINE", "numpy")  # "numpy"(블록 단위 gear 해시) 또는 "python"(바이트 단위)
+SPLIT_WORKERS = int(os.environ.get("SPLIT_WORKERS", os.cpu_count() or 1))  # 단일 blob 병렬 청킹 프로세스 수 (python 엔진)
+PARALLEL_SPLIT_MIN = 16 * 1024 * 1024  # 이 크기 이상인 blob만 병렬 청킹 (python 엔진)
+SPLIT_JOBS = int(os.environ.get("SPLIT_JOBS", os.cpu_count() or 1))  # 작은 blob을 동시에 분할할 프로세스 수
+FP_BLOOM = os.environ.get("FP_BLOOM", "1") != "0"  # fingerprint index 앞단 Bloom filter 사용 여부
+SPLIT_PIPELINE = os.environ.get("SPLIT_PIPELINE", "1" if (os.cpu_count() or 1) > 1 else "0") != "0"  # 경계 탐색 → 해시 → 저장 단계를 겹쳐 실행 (멀티코어 기본)
+HASH_THREADS = int(os.environ.get("HASH_THREADS", 2))  # 파이프라인 해시 스레드 수
+PIPELINE_DEPTH = 64  # 단계 사이 queue 크기 (청크 수)
+JOIN_WORKERS = int(os.environ.get("JOIN_WORKERS", os.cpu_count() or 1))  # 매니페스트를 동시에 재조립할 스레드 수
+JOIN_ENGINE = os.environ.get("JOIN_ENGINE", "splice")  # "splice"(copy_file_range/sendfile) 또는 "copy"(read + write)
+VIRTUAL_BLOBS = os.environ.get("VIRTUAL_BLOBS", "1") != "0"  # 레이어를 재조립하지 않고 청크 저장소에서 바로 읽기
+MERGE_MODE = os.environ.get("MERGE_MODE", "plan")  # "plan"(최종적으로 남는 멤버만 추출) 또는 "sequential"(레이어 순서대로 모두 추출)
+IMPORT_MODE = os.environ.get("IMPORT_MODE", "stream")  # "stream"(레이어 tar → squash 스트림) 또는 "rootfs"(병합한 rootfs를 tar)
+SQUASH_THREADS = int(os.environ.get("SQUASH_THREADS", 4))  # 레이어 해제 스레드 수
+CHUNK_CODEC = os.environ.get("CHUNK_CODEC", "none")  # 청크 압축: "none", "zlib", "lzma" (줄지 않는 청크는 raw로 저장)
+CHUNK_LEVEL = int(os.environ["CHUNK_LEVEL"]) if os.environ.get("CHUNK_LEVEL") else None  # 압축 레벨 (기본: zlib 6, lzma 6)
+MANIFEST_CACHE = os.environ.get("MANIFEST_CACHE", "1") != "0"  # 바뀌지 않은 blob은 이전 분할 결과(매니페스트)를 재사용
+MANIFEST_CACHE_DIR = os.path.join(CHUNKS_DIR, manifest_cache.DIR_NAME)
+MANIFEST_CACHE_MAX_MB = int(os.environ.get("MANIFEST_CACHE_MAX_MB", 256))  # 캐시 크기 상한, 넘으면 오래 쓰지 않은 항목부터 삭제 (0이면 없음)
+MANIFEST_CACHE_MAX_DAYS = float(os.environ.get("MANIFEST_CACHE_MAX_DAYS", 30))  # 이 기간 동안 히트가 없던 항목 삭제 (0이면 없음)
+CHUNK_GC = os.environ.get("CHUNK_GC", "1") != "0"  # 분할 후 참조가 끊긴 청크를 pack에서 회수 (참조 카운트는 항상 갱신)
 
 # ------------------------- 유틸 -------------------------
 def ensure_dirs():
@@ -25,77 +61,159 @@ def ensure_dirs():
         if os.path.exists(d): shutil.rmtree(d)
     for d in [CHUNKS_DIR, MANIFESTS_DIR, REASSEMBLED_DIR, MERGED_ROOTFS_DIR]:
         os.makedirs(d, exist_ok=True)
-
-def clean_path(name: str) -> str:
-    name = name.replace('\\','/')
-    name = re.sub(r'^\./','', name).lstrip('/')
-    parts = [p for p in name.split('/') if p not in ('', '.', '..')]
-    return '/'.join(parts)
+    chunk_store.migrate_flat_dir(CHUNKS_DIR)  # 청크별 파일 → pack 저장소
 
 def sha256_hex(b: bytes) -> str:
     h = hashlib.sha256(); h.update(b); return h.hexdigest()
 
-def write_chunk_if_absent(h: str, data: bytes):
-    p = os.path.join(CHUNKS_DIR, h)
-    if not os.path.exists(p):
-        with open(p, 'wb') as w: w.write(data)
+def write_chunk_if_absent(store, h: str, data: bytes):
+    return store.put(h, data)
+
+_mcache = None
+
+def get_manifest_cache():
+    """프로세스마다 하나 (MANIFEST_CACHE=0이면 None)"""
+    global _mcache
+    if MANIFEST_CACHE and _mcache is None:
+        _mcache = manifest_cache.ManifestCache(MANIFEST_CACHE_DIR, manifest_cache.chunker_params('aecdc-gear', MIN, AVG, MAX, WIN, 'max'))
+    return _mcache
 
 # ------------------------- 1) AE-CDC 분할 -------------------------
-def chunk_file_aecdc(path: str, base_dir: str):
+def chunk_file_aecdc(path: str, base_dir: str, store, workers: int = SPLIT_WORKERS):
     rel = os.path.relpath(path, base_dir)
     mf_path = os.path.join(MANIFESTS_DIR, rel)
     os.makedirs(os.path.dirname(mf_path), exist_ok=True)
 
-    hashes = []
+    # 같은 blob(digest) / 같은 파일(stat)을 같은 파라미터로 분할한 적이 있으면 mmap / 청킹 / 해시 생략
+    cache = get_manifest_cache()
+    if cache is not None and cache.lookup(path, mf_path, store) is not None:
+        return
+    t0 = time.perf_counter()
+
+    hashes, sizes = [], []
     size = os.path.getsize(path)
+    # 청크는 mmap의 memoryview로만 다루고 (복사 없음), pack에 쓰기 전까지 view를 잡아 둔다
     with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-        if size < MIN:
-            data = mm[:]
-            h = sha256_hex(data); hashes.append(h)
-            write_chunk_if_absent(h, data)
-        else:
-            for c in ae_cdc.iter_chunks(memoryview(mm), MIN, AVG, MAX, win_left=WIN, mode="max"):
-                off, ln = c.offset, c.length
-                if ln <= 0: continue
-                data = mm[off:off+ln]
-                h = sha256_hex(data); hashes.append(h)
-                write_chunk_if_absent(h, data)
-
-    with open(mf_path, 'w') as mf:
-        json.dump(hashes, mf, indent=0)
+        try:
+            if size < MIN:
+                data = memoryview(mm)
+                h = sha256_hex(data); hashes.append(h); sizes.append(len(data))
+                write_chunk_if_absent(store, h, data)
+            else:
+                if AECDC_ENGINE == "numpy":
+                    chunks = ae_cdc.iter_chunks_fast(memoryview(mm), MIN, AVG, MAX, win_left=WIN, mode="max")
+                elif workers > 1 and size >= PARALLEL_SPLIT_MIN:
+                    chunks = ae_cdc.iter_chunks_parallel(path, MIN, AVG, MAX, win_left=WIN, mode="max", workers=workers)
+                else:
+                    chunks = ae_cdc.iter_chunks(memoryview(mm), MIN, AVG, MAX, win_left=WIN, mode="max")
+                views = ae_cdc.chunk_views(mm, chunks)
+                if SPLIT_PIPELINE:
+                    def write(h, data):
+                        write_chunk_if_absent(store, h, data)
+                        sizes.append(len(data))
+                    hashes = split_pipeline.run(views, write, HASH_THREADS, PIPELINE_DEPTH)
+                else:
+                    for data in views:
+                        h = sha256_hex(data); hashes.append(h); sizes.append(len(data))
+                        write_chunk_if_absent(store, h, data)
+        finally:
+            store.drain()                           # mmap을 닫기 전에 버퍼의 view를 pack에 기록
+            data = views = chunks = None
+
+    # 고정폭 바이너리 매니페스트 (digest 32B | size | offset), JSON은 manifest_bin.py export로 변환
+    manifest_bin.write(mf_path, zip(hashes, sizes))
+    if cache is not None: cache.put(path, mf_path, time.perf_counter() - t0)
+
+_worker_store = None
+
+def _split_one(path: str):
+    # 워커 프로세스마다 자기 pack에 쓰고 새 index 항목을 반환 → split_all에서 병합
+    global _worker_store
+    if _worker_store is None: _worker_store = chunk_store.PackStore(CHUNKS_DIR, bloom=FP_BLOOM, codec=chunk_codec.codec_id(CHUNK_CODEC), level=CHUNK_LEVEL)
+    chunk_file_aecdc(path, SOURCE_OCI_DIR, _worker_store, workers=1)
+    return _worker_store.take_entries()
 
 def split_all():
     print('--- [1/6] AE-CDC 분할 ---')
-    for root, _, files in os.walk(SOURCE_OCI_DIR):
-        for n in files:
-            chunk_file_aecdc(os.path.join(root, n), SOURCE_OCI_DIR)
+    store = chunk_store.PackStore(CHUNKS_DIR, bloom=FP_BLOOM, codec=chunk_codec.codec_id(CHUNK_CODEC), level=CHUNK_LEVEL)
+    paths = [os.path.join(root, n) for root, _, files in os.walk(SOURCE_OCI_DIR) for n in files]
+    # python 엔진의 큰 blob은 blob 내부 병렬, 나머지는 blob 단위로 동시에 분할
+    small = []
+    for p in paths:
+        if AECDC_ENGINE != "numpy" and os.path.getsize(p) >= PARALLEL_SPLIT_MIN: chunk_file_aecdc(p, SOURCE_OCI_DIR, store)
+        else: small.append(p)
+    if SPLIT_JOBS > 1 and len(small) > 1:
+        store.flush()  # 워커가 지금까지의 index를 보도록
+        with ProcessPoolExecutor(max_workers=SPLIT_JOBS) as ex:
+            for entries in ex.map(_split_one, small): store.add_entries(entries)
+    else:
+        for p in small: chunk_file_aecdc(p, SOURCE_OCI_DIR, store, workers=1)
+    store.flush()
+    update_refs(store)
+    prune_manifest_cache()
+
+def update_refs(store):
+    """이번 매니페스트들을 IMAGE_NAME의 청크 참조로 등록 (이전 등록과의 차이만 반영)하고 참조 0인 청크 회수"""
+    refs = refcount.RefIndex(CHUNKS_DIR)
+    added, dropped = refs.set_image(IMAGE_NAME, refcount.image_entries(MANIFESTS_DIR))
+    if refs.fresh: refs.rebuild(store)  # refcount 이전에 쌓인 청크도 GC 대상으로
+    gc = refs.gc(store) if CHUNK_GC else None
+    return refs, added, dropped, gc
+
+def prune_manifest_cache():
+    """청크 GC 뒤에 매니페스트 캐시 크기 / 기간 상한 적용 (바뀐 파일의 stat 키 항목은 다시 쓰이지 않음). (삭제 수, 바이트) 또는 None"""
+    cache = get_manifest_cache()
+    if cache is None: return None
+    return cache.prune(MANIFEST_CACHE_MAX_MB * 1024 * 1024, MANIFEST_CACHE_MAX_DAYS * 86400)
 
 # ------------------------- 2) 재조립 -------------------------
-def reassemble_file(manifest_path: str, base_dir: str):
+def reassemble_file(store, manifest_path: str, base_dir: str) -> int:
     rel = os.path.relpath(manifest_path, base_dir)
     outp = os.path.join(REASSEMBLED_DIR, rel)
     os.makedirs(os.path.dirname(outp), exist_ok=True)
-    with open(manifest_path, 'r') as mf:
-        hashes = json.load(mf)
+    hashes, sizes = manifest_bin.load_entries(manifest_path)
     with open(outp, 'wb') as w:
+        if JOIN_ENGINE == "copy":
+            total = 0
+            for h in hashes:
+                data = store.read(h); total += len(data)
+                w.write(data)
+            return total
+        # 청크 길이 합으로 출력 크기를 먼저 확보한 뒤, pack → 출력 위치로 커널 복사 (압축된 청크는 해제 후 pwrite)
+        locs = [store.locate(h) for h in hashes]
+        for h, loc in zip(hashes, locs):
+            if loc is None: raise KeyError(h)
+        total = sum(sizes) if sizes is not None else sum(loc[2] for loc in locs)
+        fd = w.fileno()
+        chunk_store.preallocate(fd, total)
+        pos = 0
         for h in hashes:
-            with open(os.path.join(CHUNKS_DIR, h), 'rb') as r:
-                shutil.copyfileobj(r, w)
+            pos += store.copy_to(h, fd, pos)
+    return total
 
 def join_all():
     print('--- [2/6] 파일 재조립 ---')
-    for root, _, files in os.walk(MANIFESTS_DIR):
-        for n in files:
-            reassemble_file(os.path.join(root, n), MANIFESTS_DIR)
+    store = chunk_store.PackStore(CHUNKS_DIR)
+    manifests = [os.path.join(root, n) for root, _, files in os.walk(MANIFESTS_DIR) for n in files]
+    # 매니페스트끼리는 서로 독립이므로 스레드 풀에서 동시에 재조립
+    with ThreadPoolExecutor(max_workers=max(JOIN_WORKERS, 1)) as ex:
+        list(ex.map(lambda p: reassemble_file(store, p, MANIFESTS_DIR), manifests))
+    store.close()
 
 # ------------------------- 3) 매니페스트 로드(첫 항목 고정) -------------------------
-def get_layers_first_manifest():
+def open_oci(store, rel: str):
+    """OCI 레이아웃 안의 파일 열기: store가 있으면 매니페스트 기반 가상 파일, 없으면 재조립된 파일"""
+    if store is not None:
+        return store.open_manifest(os.path.join(MANIFESTS_DIR, rel))
+    return open(os.path.join(REASSEMBLED_DIR, rel), 'rb')
+
+def get_layers_first_manifest(store=None):
     print('--- [3/6] 매니페스트 로드(첫 항목) ---')
-    idx = os.path.join(REASSEMBLED_DIR, 'index.json')
-    mans = json.load(open(idx))['manifests']
+    with open_oci(store, 'index.json') as f:
+        mans = json.load(f)['manifests']
     man_dig = mans[0]['digest'].split(':')[1]
-    man_path = os.path.join(REASSEMBLED_DIR, 'blobs', 'sha256', man_dig)
-    manifest = json.load(open(man_path))
+    with open_oci(store, os.path.join('blobs', 'sha256', man_dig)) as f:
+        manifest = json.load(f)
     return [l['digest'].split(':')[1] for l in manifest['layers']]
 
 # ------------------------- 4) 레이어 병합(화이트아웃) -------------------------
@@ -118,8 +236,8 @@ def extract_member(tar: tarfile.TarFile, m: tarfile.TarInfo, dest_root: str):
     if not name: return
     tar.extract(m, path=dest_root)  # 신뢰 입력 가정
 
-def apply_layer(layer_tar_path: str, dest_root: str):
-    with tarfile.open(layer_tar_path, 'r:*') as t:
+def apply_layer(layer_tar_path: str, dest_root: str, fileobj=None):
+    with tarfile.open(layer_tar_path, 'r:*', fileobj=fileobj) as t:
         mem = t.getmembers()
         for m in mem:
             if os.path.basename(m.name) == '.wh..wh..opq':
@@ -132,32 +250,70 @@ def apply_layer(layer_tar_path: str, dest_root: str):
             if base == '.wh..wh..opq': continue
             extract_member(t, m, dest_root)
 
-def merge_layers(layers):
+def open_layer_tars(st: contextlib.ExitStack, layers, store):
+    tars = []
+    for dg in layers:
+        rel = os.path.join('blobs', 'sha256', dg)
+        f = st.enter_context(open_oci(store, rel))
+        tars.append(st.enter_context(tarfile.open(os.path.join(REASSEMBLED_DIR, rel), 'r:*', fileobj=f)))
+    return tars
+
+def merge_planned(layers, store, dest_root: str):
+    """
+    모든 레이어의 멤버 목록으로 병합 계획을 세우고 남는 멤버만 추출
+    반환: 계획 통계 / 계획할 수 없는 레이어 조합이면 None (호출 측에서 순차 병합)
+    """
+    with contextlib.ExitStack() as st:
+        tars = open_layer_tars(st, layers, store)
+        res = layer_plan.plan(layer_plan.read_members(tars, SQUASH_THREADS))
+        if res is None: return None
+        keep, dirs, stats = res
+        for d in dirs: os.makedirs(os.path.join(dest_root, d), exist_ok=True)
+        for t, members in zip(tars, keep):
+            for m in members: extract_member(t, m, dest_root)
+        return stats
+
+def merge_layers(layers, store=None):
     print('--- [4/6] 레이어 병합 ---')
     if os.path.exists(MERGED_ROOTFS_DIR): shutil.rmtree(MERGED_ROOTFS_DIR)
     os.makedirs(MERGED_ROOTFS_DIR, exist_ok=True)
+    if MERGE_MODE == "plan" and merge_planned(layers, store, MERGED_ROOTFS_DIR) is not None:
+        return
     for dg in layers:
-        lp = os.path.join(REASSEMBLED_DIR, 'blobs', 'sha256', dg)
-        apply_layer(lp, MERGED_ROOTFS_DIR)
+        rel = os.path.join('blobs', 'sha256', dg)
+        with open_oci(store, rel) as f:
+            apply_layer(os.path.join(REASSEMBLED_DIR, rel), MERGED_ROOTFS_DIR, fileobj=f)
 
 # ------------------------- 5) Import -------------------------
 def import_image():
     print('--- [5/6] tar 스트림 → podman import ---')
     tar_p = subprocess.Popen(['tar','-C', MERGED_ROOTFS_DIR, '-cf','-','.'], stdout=subprocess.PIPE)
     try:
-        subprocess.run(
-            [
-                'podman','import',
-                '--change','ENV PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin',
-                '--change','CMD ["/bin/sh","-lc","echo OK"]',
-                '-', IMAGE_NAME
-            ],
-            check=True, stdin=tar_p.stdout
-        )
+        subprocess.run(PODMAN_IMPORT, check=True, stdin=tar_p.stdout)
     finally:
         if tar_p.stdout: tar_p.stdout.close()
         tar_p.wait()
 
+def import_squashed(layers, store=None) -> bool:
+    """
+    병합된 rootfs를 디스크에 만들지 않고, 레이어 tar에서 squash tar 스트림을 바로 podman import에 넘김
+    계획할 수 없는 레이어 조합이면 False (호출 측에서 병합 후 import)
+    """
+    print('--- [4-5/6] squash tar 스트림 → podman import ---')
+    with contextlib.ExitStack() as st:
+        tars = open_layer_tars(st, layers, store)
+        res = layer_plan.plan(layer_plan.read_members(tars, SQUASH_THREADS))
+        if res is None: return False
+        keep, dirs, _ = res
+        p = subprocess.Popen(PODMAN_IMPORT, stdin=subprocess.PIPE)
+        try:
+            layer_plan.write_squashed(tars, keep, dirs, p.stdin, SQUASH_THREADS)
+        finally:
+            p.stdin.close()
+            rc = p.wait()
+        if rc: raise subprocess.CalledProcessError(rc, PODMAN_IMPORT)
+    return True
+
 # ------------------------- 6) 스모크 테스트 -------------------------
 def run_container():
     print('--- [6/6] 컨테이너 실행 ---')
@@ -171,10 +327,17 @@ def main():
     print('=== AE-CDC 기반 OCI 재조립 파이프라인 시작 ===')
     ensure_dirs()
     split_all()
-    join_all()
-    layers = get_layers_first_manifest()
-    merge_layers(layers)
-    import_image()
+    if VIRTUAL_BLOBS:
+        # blob을 디스크에 다시 쓰지 않고 레이어를 청크 저장소에서 바로 읽음
+        store = chunk_store.PackStore(CHUNKS_DIR)
+    else:
+        join_all()
+        store = None
+    layers = get_layers_first_manifest(store)
+    if not (IMPORT_MODE == "stream" and import_squashed(layers, store)):
+        merge_layers(layers, store)
+        import_image()
+    if store is not None: store.close()
     run_container()
     print('=== 완료 ===')
 
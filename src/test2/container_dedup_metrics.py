@@ -1,8 +1,17 @@
 #!/usr/bin/env python3
 # 단계 배너 + 성능 지표 출력 (AE-CDC)
 
-import os, sys, json, shutil, tarfile, mmap, subprocess, re, time, statistics, hashlib
+import os, sys, json, shutil, tarfile, mmap, subprocess, contextlib, time, statistics, hashlib, tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import ae_cdc  
+import chunk_store
+import split_pipeline
+import layer_plan
+from layer_plan import clean_path
+import manifest_bin
+import chunk_codec
+import manifest_cache
+import refcount
 
 # --- 경로/설정 ---
 HERE = os.path.dirname(__file__)
@@ -12,11 +21,39 @@ MANIFESTS_DIR     = os.path.join(HERE, 'manifests')
 REASSEMBLED_DIR   = os.path.join(HERE, 'reassembled_oci')
 MERGED_ROOTFS_DIR = os.path.join(REASSEMBLED_DIR, '_merged_rootfs')
 IMAGE_NAME = os.environ.get("IMAGE_NAME", "ubuntu-aecdc:latest")
+PODMAN_IMPORT = [
+    'podman','import',
+    '--change','ENV PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin',
+    '--change','CMD ["/bin/sh","-lc","echo OK"]',
+    '-', IMAGE_NAME
+]
 
 AVG = 64 * 1024
 MIN = AVG // 2
 MAX = AVG * 2
 WIN = 256
+AECDC_ENGINE = os.environ.get("AECDC_ENGINE", "numpy")  # "numpy"(블록 단위 gear 해시) 또는 "python"(바이트 단위)
+SPLIT_WORKERS = int(os.environ.get("SPLIT_WORKERS", os.cpu_count() or 1))  # 단일 blob 병렬 청킹 프로세스 수 (python 엔진)
+PARALLEL_SPLIT_MIN = 16 * 1024 * 1024  # 이 크기 이상인 blob만 병렬 청킹 (python 엔진)
+SPLIT_JOBS = int(os.environ.get("SPLIT_JOBS", os.cpu_count() or 1))  # 작은 blob을 동시에 분할할 프로세스 수
+FP_BLOOM = os.environ.get("FP_BLOOM", "1") != "0"  # fingerprint index 앞단 Bloom filter 사용 여부
+SPLIT_PIPELINE = os.environ.get("SPLIT_PIPELINE", "1" if (os.cpu_count() or 1) > 1 else "0") != "0"  # 경계 탐색 → 해시 → 저장 단계를 겹쳐 실행 (멀티코어 기본)
+HASH_THREADS = int(os.environ.get("HASH_THREADS", 2))  # 파이프라인 해시 스레드 수
+PIPELINE_DEPTH = 64  # 단계 사이 queue 크기 (청크 수)
+JOIN_WORKERS = int(os.environ.get("JOIN_WORKERS", os.cpu_count() or 1))  # 매니페스트를 동시에 재조립할 스레드 수
+JOIN_ENGINE = os.environ.get("JOIN_ENGINE", "splice")  # "splice"(copy_file_range/sendfile) 또는 "copy"(read + write)
+VIRTUAL_BLOBS = os.environ.get("VIRTUAL_BLOBS", "1") != "0"  # 레이어를 재조립하지 않고 청크 저장소에서 바로 읽기
+MERGE_MODE = os.environ.get("MERGE_MODE", "plan")  # "plan"(최종적으로 남는 멤버만 추출) 또는 "sequential"(레이어 순서대로 모두 추출)
+IMPORT_MODE = os.environ.get("IMPORT_MODE", "stream")  # "stream"(레이어 tar → squash 스트림) 또는 "rootfs"(병합한 rootfs를 tar)
+SQUASH_THREADS = int(os.environ.get("SQUASH_THREADS", 4))  # 레이어 해제 스레드 수
+CHUNK_CODEC = os.environ.get("CHUNK_CODEC", "none")  # 청크 압축: "none", "zlib", "lzma" (줄지 않는 청크는 raw로 저장)
+CHUNK_LEVEL = int(os.environ["CHUNK_LEVEL"]) if os.environ.get("CHUNK_LEVEL") else None  # 압축 레벨 (기본: zlib 6, lzma 6)
+MANIFEST_CACHE = os.environ.get("MANIFEST_CACHE", "1") != "0"  # 바뀌지 않은 blob은 이전 분할 결과(매니페스트)를 재사용
+MANIFEST_CACHE_DIR = os.path.join(CHUNKS_DIR, manifest_cache.DIR_NAME)
+MANIFEST_CACHE_MAX_MB = int(os.environ.get("MANIFEST_CACHE_MAX_MB", 256))  # 캐시 크기 상한, 넘으면 오래 쓰지 않은 항목부터 삭제 (0이면 없음)
+MANIFEST_CACHE_MAX_DAYS = float(os.environ.get("MANIFEST_CACHE_MAX_DAYS", 30))  # 이 기간 동안 히트가 없던 항목 삭제 (0이면 없음)
+CHUNK_GC = os.environ.get("CHUNK_GC", "1") != "0"  # 분할 후 참조가 끊긴 청크를 pack에서 회수 (참조 카운트는 항상 갱신)
+TRACE_ALLOC = os.environ.get("TRACE_ALLOC", "0") == "1"  # 분할 단계 Python 메모리 할당량(tracemalloc) 측정
 
 # ------------------------- 유틸 -------------------------
 def ensure_dirs():
@@ -24,26 +61,37 @@ def ensure_dirs():
         if os.path.exists(d): shutil.rmtree(d)
     for d in [CHUNKS_DIR, MANIFESTS_DIR, REASSEMBLED_DIR, MERGED_ROOTFS_DIR]:
         os.makedirs(d, exist_ok=True)
-
-def clean_path(name: str) -> str:
-    name = name.replace('\\','/')
-    name = re.sub(r'^\./','', name).lstrip('/')
-    parts = [p for p in name.split('/') if p not in ('', '.', '..')]
-    return '/'.join(parts)
+    moved = chunk_store.migrate_flat_dir(CHUNKS_DIR)  # 청크별 파일 → pack 저장소
+    if moved: print(f"  기존 청크 파일 {moved:,}개를 pack 저장소로 이전")
 
 def sha256_hex(b: bytes) -> str:
     h = hashlib.sha256(); h.update(b); return h.hexdigest()
 
-def write_chunk_if_absent(h: str, data: bytes, metrics):
-    p = os.path.join(CHUNKS_DIR, h)
-    created = False
-    if not os.path.exists(p):
-        with open(p, 'wb') as w: w.write(data)
+def write_chunk_if_absent(store, h: str, data: bytes, metrics):
+    created = store.put(h, data)
+    if created:
         metrics['created_chunks'] += 1
         metrics['created_bytes']  += len(data)
-        created = True
     return created
 
+def new_split_metrics():
+    return {
+        'total_chunks':0, 'created_chunks':0,
+        'total_bytes':0,  'created_bytes':0,
+        'split_input_bytes':0,
+        'fp_hits':0, 'fp_misses':0, 'fp_bloom_skips':0,
+        'mcache_hits':0, 'mcache_misses':0, 'mcache_hit_bytes':0, 'mcache_saved_time':0.0,
+        'chunk_sizes':[],
+        **split_pipeline.new_stage_stats(),
+        **chunk_codec.new_stats()
+    }
+
+def merge_metrics(dst, src):
+    for k, v in src.items():
+        if isinstance(v, list): dst[k].extend(v)
+        elif k.endswith('_max'): dst[k] = max(dst[k], v)
+        else: dst[k] += v
+
 def fmt_bytes(n):
     return f"{n/1024/1024:.2f} MB"
 
@@ -51,51 +99,125 @@ def fmt_thr(bytes_, secs):
     if secs <= 0: return "∞ MB/s"
     return f"{(bytes_/1024/1024)/secs:.2f} MB/s"
 
+_mcache = None
+
+def get_manifest_cache():
+    """프로세스마다 하나 (MANIFEST_CACHE=0이면 None)"""
+    global _mcache
+    if MANIFEST_CACHE and _mcache is None:
+        _mcache = manifest_cache.ManifestCache(MANIFEST_CACHE_DIR, manifest_cache.chunker_params('aecdc-gear', MIN, AVG, MAX, WIN, 'max'))
+    return _mcache
+
 # ------------------------- 1) AE-CDC 분할 -------------------------
-def chunk_file_aecdc(path: str, base_dir: str, metrics):
+def chunk_file_aecdc(path: str, base_dir: str, store, metrics, workers: int = SPLIT_WORKERS):
     rel = os.path.relpath(path, base_dir)
     mf_path = os.path.join(MANIFESTS_DIR, rel)
     os.makedirs(os.path.dirname(mf_path), exist_ok=True)
 
-    hashes = []
     size = os.path.getsize(path)
     metrics['split_input_bytes'] += size
+    t0 = time.perf_counter()
+
+    # 같은 blob(digest) / 같은 파일(stat)을 같은 파라미터로 분할한 적이 있으면 mmap / 청킹 / 해시 생략
+    cache = get_manifest_cache()
+    hit = cache.lookup(path, mf_path, store) if cache is not None else None
+    if hit is not None:
+        _, sizes, split_time = hit
+        metrics['mcache_hits'] += 1
+        metrics['mcache_hit_bytes'] += size
+        metrics['mcache_saved_time'] += max(split_time - (time.perf_counter() - t0), 0.0)
+        metrics['chunk_sizes'].extend(sizes)
+        metrics['total_chunks'] += len(sizes)
+        metrics['total_bytes']  += size
+        return
+    if cache is not None: metrics['mcache_misses'] += 1
 
+    hashes, sizes = [], []
+
+    # 청크는 mmap의 memoryview로만 다루고 (복사 없음), pack에 쓰기 전까지 view를 잡아 둔다
     with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-        if size < MIN:
-            data = mm[:]
-            h = sha256_hex(data); hashes.append(h)
-            write_chunk_if_absent(h, data, metrics)
-            metrics['chunk_sizes'].append(len(data))
-            metrics['total_chunks'] += 1
-            metrics['total_bytes']  += len(data)
-        else:
-            for c in ae_cdc.iter_chunks(memoryview(mm), MIN, AVG, MAX, win_left=WIN, mode="max"):
-                off, ln = c.offset, c.length
-                if ln <= 0: continue
-                data = mm[off:off+ln]
-                h = sha256_hex(data); hashes.append(h)
-                write_chunk_if_absent(h, data, metrics)
+        try:
+            if size < MIN:
+                data = memoryview(mm)
+                h = sha256_hex(data); hashes.append(h); sizes.append(len(data))
+                write_chunk_if_absent(store, h, data, metrics)
                 metrics['chunk_sizes'].append(len(data))
                 metrics['total_chunks'] += 1
                 metrics['total_bytes']  += len(data)
+            else:
+                if AECDC_ENGINE == "numpy":
+                    chunks = ae_cdc.iter_chunks_fast(memoryview(mm), MIN, AVG, MAX, win_left=WIN, mode="max")
+                elif workers > 1 and size >= PARALLEL_SPLIT_MIN:
+                    chunks = ae_cdc.iter_chunks_parallel(path, MIN, AVG, MAX, win_left=WIN, mode="max", workers=workers)
+                else:
+                    chunks = ae_cdc.iter_chunks(memoryview(mm), MIN, AVG, MAX, win_left=WIN, mode="max")
+                views = ae_cdc.chunk_views(mm, chunks)
+                if SPLIT_PIPELINE:
+                    def write(h, data):
+                        write_chunk_if_absent(store, h, data, metrics)
+                        sizes.append(len(data))
+                        metrics['chunk_sizes'].append(len(data))
+                        metrics['total_chunks'] += 1
+                        metrics['total_bytes']  += len(data)
+                    hashes = split_pipeline.run(views, write, HASH_THREADS, PIPELINE_DEPTH, metrics)
+                else:
+                    for data in views:
+                        h = sha256_hex(data); hashes.append(h); sizes.append(len(data))
+                        write_chunk_if_absent(store, h, data, metrics)
+                        metrics['chunk_sizes'].append(len(data))
+                        metrics['total_chunks'] += 1
+                        metrics['total_bytes']  += len(data)
+        finally:
+            store.drain()                           # mmap을 닫기 전에 버퍼의 view를 pack에 기록
+            data = views = chunks = None
+
+    # 고정폭 바이너리 매니페스트 (digest 32B | size | offset), JSON은 manifest_bin.py export로 변환
+    manifest_bin.write(mf_path, zip(hashes, sizes))
+    if cache is not None: cache.put(path, mf_path, time.perf_counter() - t0)
 
-    with open(mf_path, 'w') as mf:
-        json.dump(hashes, mf, indent=0)
+_worker_store = None
+
+def _split_one(path: str):
+    # 워커 프로세스마다 자기 pack에 쓰고, 메트릭과 새 index 항목을 반환 → split_all에서 병합
+    global _worker_store
+    if _worker_store is None: _worker_store = chunk_store.PackStore(CHUNKS_DIR, bloom=FP_BLOOM, codec=chunk_codec.codec_id(CHUNK_CODEC), level=CHUNK_LEVEL)
+    metrics = new_split_metrics()
+    chunk_file_aecdc(path, SOURCE_OCI_DIR, _worker_store, metrics, workers=1)
+    merge_metrics(metrics, _worker_store.fp.take_stats())
+    merge_metrics(metrics, _worker_store.take_codec_stats())
+    return metrics, _worker_store.take_entries()
 
 def split_all():
     print('--- [1/6] AE-CDC 분할 ---')
-    metrics = {
-        'total_chunks':0, 'created_chunks':0,
-        'total_bytes':0,  'created_bytes':0,
-        'split_input_bytes':0,
-        'chunk_sizes':[]
-    }
+    metrics = new_split_metrics()
+    store = chunk_store.PackStore(CHUNKS_DIR, bloom=FP_BLOOM, codec=chunk_codec.codec_id(CHUNK_CODEC), level=CHUNK_LEVEL)
+    paths = [os.path.join(root, n) for root, _, files in os.walk(SOURCE_OCI_DIR) for n in files]
+    if TRACE_ALLOC: tracemalloc.start()
     t0 = time.perf_counter()
-    for root, _, files in os.walk(SOURCE_OCI_DIR):
-        for n in files:
-            chunk_file_aecdc(os.path.join(root, n), SOURCE_OCI_DIR, metrics)
+    # python 엔진의 큰 blob은 blob 내부 병렬, 나머지는 blob 단위로 동시에 분할
+    small = []
+    for p in paths:
+        if AECDC_ENGINE != "numpy" and os.path.getsize(p) >= PARALLEL_SPLIT_MIN: chunk_file_aecdc(p, SOURCE_OCI_DIR, store, metrics)
+        else: small.append(p)
+    if SPLIT_JOBS > 1 and len(small) > 1:
+        store.flush()  # 워커가 지금까지의 index를 보도록
+        with ProcessPoolExecutor(max_workers=SPLIT_JOBS) as ex:
+            for m, entries in ex.map(_split_one, small):
+                # 워커끼리 겹친 청크는 한 번만 index에 반영되므로 신규 청크 수는 병합 결과 기준
+                m['created_chunks'], m['created_bytes'] = store.add_entries(entries)
+                merge_metrics(metrics, m)
+    else:
+        for p in small: chunk_file_aecdc(p, SOURCE_OCI_DIR, store, metrics, workers=1)
+    merge_metrics(metrics, store.fp.take_stats())
+    merge_metrics(metrics, store.take_codec_stats())
+    store.flush()
     t1 = time.perf_counter()
+    if TRACE_ALLOC:
+        alloc_cur, alloc_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    refs, added, dropped, gc = update_refs(store)
+    pruned = prune_manifest_cache()
+    t2 = time.perf_counter()
 
     count = metrics['total_chunks']
     avg_sz = (sum(metrics['chunk_sizes'])/count) if count else 0
@@ -105,50 +227,108 @@ def split_all():
     print(f"  평균 청크 크기: {avg_sz:.1f} B, P95: {p95} B, 최소:{min(metrics['chunk_sizes']) if count else 0} B, 최대:{max(metrics['chunk_sizes']) if count else 0} B")
     print(f"  입력 바이트: {fmt_bytes(metrics['split_input_bytes'])}")
     print(f"  생성 바이트(신규 청크): {fmt_bytes(metrics['created_bytes'])}")
+    lookups = metrics['fp_hits'] + metrics['fp_misses']
+    print(f"  fingerprint index: hit {metrics['fp_hits']:,} / miss {metrics['fp_misses']:,}"
+          f" (Bloom 즉시 판정 {metrics['fp_bloom_skips']:,}, 조회 {lookups:,}, 저장된 digest {len(store.fp):,})")
+    if MANIFEST_CACHE:
+        looked = metrics['mcache_hits'] + metrics['mcache_misses']
+        rate = metrics['mcache_hits'] / looked * 100 if looked else 0.0
+        print(f"  매니페스트 캐시: hit {metrics['mcache_hits']:,} / miss {metrics['mcache_misses']:,} ({rate:.1f}%),"
+              f" 재사용 {fmt_bytes(metrics['mcache_hit_bytes'])}, 절약한 분할 시간 약 {metrics['mcache_saved_time']:.3f} s"
+              f", 정리 {pruned[0]:,}개 ({fmt_bytes(pruned[1])})")
     dur = t1 - t0
     thr = fmt_thr(metrics['split_input_bytes'], dur)
-    print(f"  분할 시간: {dur:.3f} s, 처리량: {thr}")
+    print(f"  분할 시간: {dur:.3f} s, 처리량: {thr} (blob 동시 분할 {SPLIT_JOBS}, blob 내부 병렬 {SPLIT_WORKERS})")
+    if SPLIT_PIPELINE:
+        print(f"  파이프라인 단계 (해시 스레드 {HASH_THREADS}): {split_pipeline.format_stages(metrics)}")
+    if CHUNK_CODEC != "none":
+        for line in chunk_codec.format_stats(metrics): print(f"  청크 압축 {line}")
+    if TRACE_ALLOC:
+        print(f"  Python 할당(tracemalloc, 메인 프로세스): 최대 {fmt_bytes(alloc_peak)}, 종료 시 {fmt_bytes(alloc_cur)}")
+    print(f"  청크 참조({IMAGE_NAME}): 새 참조 {added:,}, 해제 {dropped:,} (참조 중인 청크 {len(refs.counts):,})")
+    if gc is not None:
+        print(f"  청크 GC: 삭제 {gc['removed_chunks']:,}개 ({fmt_bytes(gc['removed_bytes'])}), pack 재작성 {gc['compacted_packs']}개,"
+              f" 회수 {fmt_bytes(gc['reclaimed_bytes'])} ({t2 - t1:.3f} s)")
+    du = refs.du(store).get(IMAGE_NAME)
+    if du is not None:
+        print(f"  이미지 저장량: 고유 {fmt_bytes(du['unique'])}, 다른 이미지와 공유 {fmt_bytes(du['shared'])} (원본 {fmt_bytes(du['logical'])})")
     return metrics, dur
 
+def update_refs(store):
+    """이번 매니페스트들을 IMAGE_NAME의 청크 참조로 등록 (이전 등록과의 차이만 반영)하고 참조 0인 청크 회수"""
+    refs = refcount.RefIndex(CHUNKS_DIR)
+    added, dropped = refs.set_image(IMAGE_NAME, refcount.image_entries(MANIFESTS_DIR))
+    if refs.fresh: refs.rebuild(store)  # refcount 이전에 쌓인 청크도 GC 대상으로
+    gc = refs.gc(store) if CHUNK_GC else None
+    return refs, added, dropped, gc
+
+def prune_manifest_cache():
+    """청크 GC 뒤에 매니페스트 캐시 크기 / 기간 상한 적용 (바뀐 파일의 stat 키 항목은 다시 쓰이지 않음). (삭제 수, 바이트) 또는 None"""
+    cache = get_manifest_cache()
+    if cache is None: return None
+    return cache.prune(MANIFEST_CACHE_MAX_MB * 1024 * 1024, MANIFEST_CACHE_MAX_DAYS * 86400)
+
 # ------------------------- 2) 재조립 -------------------------
-def reassemble_file(manifest_path: str, base_dir: str, metrics):
+def reassemble_file(store, manifest_path: str, base_dir: str) -> int:
     rel = os.path.relpath(manifest_path, base_dir)
     outp = os.path.join(REASSEMBLED_DIR, rel)
     os.makedirs(os.path.dirname(outp), exist_ok=True)
-    with open(manifest_path, 'r') as mf:
-        hashes = json.load(mf)
-    total = 0
+    hashes, sizes = manifest_bin.load_entries(manifest_path)
     with open(outp, 'wb') as w:
+        if JOIN_ENGINE == "copy":
+            total = 0
+            for h in hashes:
+                data = store.read(h); total += len(data)
+                w.write(data)
+            return total
+        # 청크 길이 합으로 출력 크기를 먼저 확보한 뒤, pack → 출력 위치로 커널 복사 (압축된 청크는 해제 후 pwrite)
+        locs = [store.locate(h) for h in hashes]
+        for h, loc in zip(hashes, locs):
+            if loc is None: raise KeyError(h)
+        total = sum(sizes) if sizes is not None else sum(loc[2] for loc in locs)
+        fd = w.fileno()
+        chunk_store.preallocate(fd, total)
+        pos = 0
         for h in hashes:
-            p = os.path.join(CHUNKS_DIR, h)
-            sz = os.path.getsize(p); total += sz
-            with open(p, 'rb') as r:
-                shutil.copyfileobj(r, w)
-    metrics['reassembled_bytes'] += total
-    metrics['reassembled_files'] += 1
+            pos += store.copy_to(h, fd, pos)
+    return total
 
 def join_all():
     print('--- [2/6] 파일 재조립 ---')
     metrics = {'reassembled_bytes':0, 'reassembled_files':0}
+    store = chunk_store.PackStore(CHUNKS_DIR)
+    manifests = [os.path.join(root, n) for root, _, files in os.walk(MANIFESTS_DIR) for n in files]
     t0 = time.perf_counter()
-    for root, _, files in os.walk(MANIFESTS_DIR):
-        for n in files:
-            reassemble_file(os.path.join(root, n), MANIFESTS_DIR, metrics)
+    # 매니페스트끼리는 서로 독립이므로 스레드 풀에서 동시에 재조립 (복사는 커널에서 GIL 없이 진행)
+    with ThreadPoolExecutor(max_workers=max(JOIN_WORKERS, 1)) as ex:
+        for total in ex.map(lambda p: reassemble_file(store, p, MANIFESTS_DIR), manifests):
+            metrics['reassembled_bytes'] += total
+            metrics['reassembled_files'] += 1
     t1 = time.perf_counter()
+    codec_stats = store.take_codec_stats()
+    store.close()
     dur = t1 - t0
     print(f"  재조립 파일 수: {metrics['reassembled_files']:,}")
     print(f"  재조립 바이트: {fmt_bytes(metrics['reassembled_bytes'])}")
-    print(f"  재조립 시간: {dur:.3f} s, 처리량: {fmt_thr(metrics['reassembled_bytes'], dur)}")
+    print(f"  재조립 시간: {dur:.3f} s, 처리량: {fmt_thr(metrics['reassembled_bytes'], dur)} (엔진 {JOIN_ENGINE}, 스레드 {JOIN_WORKERS})")
+    if CHUNK_CODEC != "none":
+        for line in chunk_codec.format_stats(codec_stats): print(f"  청크 해제 {line}")
     return metrics, dur
 
 # ------------------------- 3) 매니페스트 로드(첫 항목) -------------------------
-def get_layers_first_manifest():
+def open_oci(store, rel: str):
+    """OCI 레이아웃 안의 파일 열기: store가 있으면 매니페스트 기반 가상 파일, 없으면 재조립된 파일"""
+    if store is not None:
+        return store.open_manifest(os.path.join(MANIFESTS_DIR, rel))
+    return open(os.path.join(REASSEMBLED_DIR, rel), 'rb')
+
+def get_layers_first_manifest(store=None):
     print('--- [3/6] 매니페스트 로드(첫 항목) ---')
-    idx = os.path.join(REASSEMBLED_DIR, 'index.json')
-    mans = json.load(open(idx))['manifests']
+    with open_oci(store, 'index.json') as f:
+        mans = json.load(f)['manifests']
     man_dig = mans[0]['digest'].split(':')[1]
-    man_path = os.path.join(REASSEMBLED_DIR, 'blobs', 'sha256', man_dig)
-    manifest = json.load(open(man_path))
+    with open_oci(store, os.path.join('blobs', 'sha256', man_dig)) as f:
+        manifest = json.load(f)
     layers = [l['digest'].split(':')[1] for l in manifest['layers']]
     print(f"  레이어 수: {len(layers)}")
     return layers
@@ -173,8 +353,8 @@ def extract_member(tar: tarfile.TarFile, m: tarfile.TarInfo, dest_root: str):
     if not name: return
     tar.extract(m, path=dest_root)
 
-def apply_layer(layer_tar_path: str, dest_root: str):
-    with tarfile.open(layer_tar_path, 'r:*') as t:
+def apply_layer(layer_tar_path: str, dest_root: str, fileobj=None):
+    with tarfile.open(layer_tar_path, 'r:*', fileobj=fileobj) as t:
         mem = t.getmembers()
         for m in mem:
             if os.path.basename(m.name) == '.wh..wh..opq':
@@ -187,19 +367,50 @@ def apply_layer(layer_tar_path: str, dest_root: str):
             if base == '.wh..wh..opq': continue
             extract_member(t, m, dest_root)
 
-def merge_layers(layers):
+def open_layer_tars(st: contextlib.ExitStack, layers, store):
+    tars = []
+    for dg in layers:
+        rel = os.path.join('blobs', 'sha256', dg)
+        f = st.enter_context(open_oci(store, rel))
+        tars.append(st.enter_context(tarfile.open(os.path.join(REASSEMBLED_DIR, rel), 'r:*', fileobj=f)))
+    return tars
+
+def merge_planned(layers, store, dest_root: str):
+    """
+    모든 레이어의 멤버 목록으로 병합 계획을 세우고 남는 멤버만 추출
+    반환: 계획 통계 / 계획할 수 없는 레이어 조합이면 None (호출 측에서 순차 병합)
+    """
+    with contextlib.ExitStack() as st:
+        tars = open_layer_tars(st, layers, store)
+        res = layer_plan.plan(layer_plan.read_members(tars, SQUASH_THREADS))
+        if res is None: return None
+        keep, dirs, stats = res
+        for d in dirs: os.makedirs(os.path.join(dest_root, d), exist_ok=True)
+        for t, members in zip(tars, keep):
+            for m in members: extract_member(t, m, dest_root)
+        return stats
+
+def merge_layers(layers, store=None):
     print('--- [4/6] 레이어 병합(화이트아웃 반영) ---')
     if os.path.exists(MERGED_ROOTFS_DIR): shutil.rmtree(MERGED_ROOTFS_DIR)
     os.makedirs(MERGED_ROOTFS_DIR, exist_ok=True)
     t0 = time.perf_counter()
-    applied = 0
-    for dg in layers:
-        lp = os.path.join(REASSEMBLED_DIR, 'blobs', 'sha256', dg)
-        apply_layer(lp, MERGED_ROOTFS_DIR)
-        applied += 1
+    stats = merge_planned(layers, store, MERGED_ROOTFS_DIR) if MERGE_MODE == "plan" else None
+    if stats is None:
+        for dg in layers:
+            rel = os.path.join('blobs', 'sha256', dg)
+            with open_oci(store, rel) as f:
+                apply_layer(os.path.join(REASSEMBLED_DIR, rel), MERGED_ROOTFS_DIR, fileobj=f)
     t1 = time.perf_counter()
     dur = t1 - t0
-    print(f"  적용 레이어: {applied}")
+    print(f"  적용 레이어: {len(layers)}")
+    if stats is not None:
+        skipped = stats['skipped_overwritten'] + stats['skipped_deleted']
+        print(f"  병합 계획: 멤버 {stats['members']:,}개 중 {stats['extracted']:,}개 추출, {skipped:,}개 건너뜀"
+              f" (덮어쓰기 {stats['skipped_overwritten']:,}, 삭제 {stats['skipped_deleted']:,}),"
+              f" 건너뛴 바이트 {fmt_bytes(stats['skipped_bytes'])} / 추출 {fmt_bytes(stats['extracted_bytes'])}")
+    elif MERGE_MODE == "plan":
+        print("  병합 계획: 링크를 거치거나 건너뛸 수 없는 경로가 있어 순차 병합으로 처리")
     print(f"  병합 시간: {dur:.3f} s")
     return dur
 
@@ -209,15 +420,7 @@ def import_image():
     t0 = time.perf_counter()
     tar_p = subprocess.Popen(['tar','-C', MERGED_ROOTFS_DIR, '-cf','-','.'], stdout=subprocess.PIPE)
     try:
-        subprocess.run(
-            [
-                'podman','import',
-                '--change','ENV PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin',
-                '--change','CMD ["/bin/sh","-lc","echo OK"]',
-                '-', IMAGE_NAME
-            ],
-            check=True, stdin=tar_p.stdout
-        )
+        subprocess.run(PODMAN_IMPORT, check=True, stdin=tar_p.stdout)
     finally:
         if tar_p.stdout: tar_p.stdout.close()
         tar_p.wait()
@@ -226,6 +429,36 @@ def import_image():
     print(f"  import 시간: {dur:.3f} s")
     return dur
 
+def import_squashed(layers, store=None):
+    """
+    병합된 rootfs를 디스크에 만들지 않고, 레이어 tar에서 squash tar 스트림을 바로 podman import에 넘김
+    반환: 소요 시간 / 계획할 수 없는 레이어 조합이면 None (호출 측에서 병합 후 import)
+    """
+    print('--- [4/6] 레이어 병합 --- (생략: 레이어 tar에서 바로 스트림 생성)')
+    print('--- [5/6] squash tar 스트림 → podman import ---')
+    t0 = time.perf_counter()
+    with contextlib.ExitStack() as st:
+        tars = open_layer_tars(st, layers, store)
+        res = layer_plan.plan(layer_plan.read_members(tars, SQUASH_THREADS))
+        if res is None:
+            print("  병합 계획: 링크를 거치거나 건너뛸 수 없는 경로가 있어 병합 후 import로 처리")
+            return None
+        keep, dirs, plan_stats = res
+        p = subprocess.Popen(PODMAN_IMPORT, stdin=subprocess.PIPE)
+        try:
+            stats = layer_plan.write_squashed(tars, keep, dirs, p.stdin, SQUASH_THREADS)
+        finally:
+            p.stdin.close()
+            rc = p.wait()
+        if rc: raise subprocess.CalledProcessError(rc, PODMAN_IMPORT)
+    t1 = time.perf_counter()
+    dur = t1 - t0
+    skipped = plan_stats['skipped_overwritten'] + plan_stats['skipped_deleted']
+    print(f"  스트림 멤버: {stats['stream_members']:,}, 데이터 {fmt_bytes(stats['stream_bytes'])}"
+          f" (건너뛴 멤버 {skipped:,}, {fmt_bytes(plan_stats['skipped_bytes'])})")
+    print(f"  import 시간: {dur:.3f} s, 처리량: {fmt_thr(stats['stream_bytes'], dur)} (해제 스레드 {SQUASH_THREADS})")
+    return dur
+
 # ------------------------- 6) 스모크 테스트 -------------------------
 def run_container():
     print('--- [6/6] 컨테이너 실행 ---')
@@ -239,17 +472,33 @@ def main():
     print('=== AE-CDC 기반 OCI 재조립 파이프라인 시작 ===')
     ensure_dirs()
     split_metrics, split_time = split_all()
-    join_metrics,  join_time  = join_all()
-    layers = get_layers_first_manifest()
-    merge_time = merge_layers(layers)
-    import_time = import_image()
+    if VIRTUAL_BLOBS:
+        # blob을 디스크에 다시 쓰지 않고 레이어를 청크 저장소에서 바로 읽음
+        print('--- [2/6] 파일 재조립 --- (생략: 청크 저장소에서 직접 읽기)')
+        join_metrics, join_time = None, 0.0
+        store = chunk_store.PackStore(CHUNKS_DIR)
+    else:
+        join_metrics,  join_time  = join_all()
+        store = None
+    layers = get_layers_first_manifest(store)
+    import_time = import_squashed(layers, store) if IMPORT_MODE == "stream" else None
+    if import_time is None:
+        merge_time = merge_layers(layers, store)
+        import_time = import_image()
+    else:
+        merge_time = 0.0
+    if store is not None:
+        if CHUNK_CODEC != "none":
+            for line in chunk_codec.format_stats(store.take_codec_stats()): print(f"  청크 해제 {line}")
+        store.close()
     run_container()
 
     print('=== 성능 요약 ===')
     total_input = split_metrics['split_input_bytes']
     print(f"  입력 파일 총 크기: {fmt_bytes(total_input)}")
     print(f"  분할: {split_time:.3f}s, 처리량 {fmt_thr(total_input, split_time)}")
-    print(f"  재조립: {join_time:.3f}s, 처리량 {fmt_thr(join_metrics['reassembled_bytes'], join_time)}")
+    if join_metrics is None: print("  재조립: 생략 (VIRTUAL_BLOBS)")
+    else: print(f"  재조립: {join_time:.3f}s, 처리량 {fmt_thr(join_metrics['reassembled_bytes'], join_time)}")
     print(f"  병합: {merge_time:.3f}s, import: {import_time:.3f}s")
     reused = max(split_metrics['total_chunks'] - split_metrics['created_chunks'], 0)
     reuse_ratio = (reused / split_metrics['total_chunks']*100.0) if split_metrics['total_chunks'] else 0.0
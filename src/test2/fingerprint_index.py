@@ -0,0 +1,143 @@
+# 청크 digest(32B) 존재 여부를 메모리에서 판정하는 fingerprint index
+#   - bytearray 하나에 32바이트 슬롯을 나열한 open-addressing 테이블 (선형 탐사)
+#   - 앞단에 선택적 Bloom filter: 새 청크는 대부분 테이블 탐사 없이 바로 "없음"
+#   - save()는 임시 파일에 쓴 뒤 os.replace로 원자적으로 교체
+
+import os, struct
+
+FP_MAGIC = b'AECFPX1\0'
+HEADER = struct.Struct('<8sQQB')    # magic | 슬롯 수 | 항목 수 | bloom 여부
+SLOT = 32
+EMPTY = bytes(SLOT)
+MIN_CAPACITY = 1 << 12
+MAX_LOAD = 0.7                      # 이 비율을 넘으면 2배로 확장
+BLOOM_BITS_PER_SLOT = 10
+BLOOM_K = 4
+
+class FingerprintIndex:
+    def __init__(self, capacity: int = MIN_CAPACITY, bloom: bool = True):
+        self._alloc(capacity, bloom)
+        self.dirty = False
+        self.hits = self.misses = self.bloom_skips = 0
+
+    @classmethod
+    def for_items(cls, n: int, bloom: bool = True):
+        return cls(int(n / MAX_LOAD) + 1, bloom)
+
+    # ---------- Bloom ----------
+    def _bloom_pos(self, d: bytes):
+        # sha256 digest는 이미 균일하므로 8..24 바이트를 4개의 u32로 잘라 위치로 사용
+        x, m = int.from_bytes(d[8:8 + 4*BLOOM_K], 'little'), self.bloom_bits
+        return [((x >> (32*j)) & 0xFFFFFFFF) % m for j in range(BLOOM_K)]
+
+    def _bloom_add(self, d: bytes):
+        b = self.bloom
+        for p in self._bloom_pos(d): b[p >> 3] |= 1 << (p & 7)
+
+    def _bloom_maybe(self, d: bytes) -> bool:
+        b = self.bloom
+        for p in self._bloom_pos(d):
+            if not (b[p >> 3] >> (p & 7)) & 1: return False
+        return True
+
+    # ---------- 테이블 ----------
+    def _alloc(self, capacity: int, bloom: bool):
+        """빈 테이블 / Bloom 할당 (dirty, hit/miss 카운터는 건드리지 않음)"""
+        cap = MIN_CAPACITY
+        while cap < capacity: cap <<= 1
+        self.cap, self.mask, self.count = cap, cap - 1, 0
+        self.table = bytearray(cap * SLOT)
+        self.bloom = bytearray(cap * BLOOM_BITS_PER_SLOT // 8) if bloom else None
+        self.bloom_bits = cap * BLOOM_BITS_PER_SLOT
+
+    def _probe(self, d: bytes):
+        """d가 있는 슬롯 위치(True) 또는 넣을 빈 슬롯 위치(False)"""
+        t, mask = self.table, self.mask
+        i = int.from_bytes(d[:8], 'little') & mask
+        while True:
+            p = i * SLOT
+            k = t[p:p + SLOT]
+            if k == d: return p, True
+            if k == EMPTY: return p, False
+            i = (i + 1) & mask
+
+    def _grow(self):
+        old, old_cap = self.table, self.cap
+        self._alloc(self.cap * 2, self.bloom is not None)
+        for i in range(old_cap):
+            k = bytes(old[i * SLOT:(i + 1) * SLOT])
+            if k != EMPTY: self._insert(k)
+
+    def _insert(self, d: bytes):
+        p, found = self._probe(d)
+        if found: return False
+        self.table[p:p + SLOT] = d
+        if self.bloom is not None: self._bloom_add(d)
+        self.count += 1
+        return True
+
+    def contains(self, d: bytes) -> bool:
+        """존재 여부 (hit / miss / bloom_skip 카운터 갱신)"""
+        if self.bloom is not None and not self._bloom_maybe(d):
+            self.misses += 1; self.bloom_skips += 1
+            return False
+        if self._probe(d)[1]:
+            self.hits += 1; return True
+        self.misses += 1
+        return False
+
+    def add(self, d: bytes) -> bool:
+        """없으면 추가하고 True (카운터는 바꾸지 않음)"""
+        if d == EMPTY: raise ValueError("all-zero digest is reserved")
+        if (self.count + 1) > self.cap * MAX_LOAD: self._grow()
+        added = self._insert(d)
+        if added: self.dirty = True
+        return added
+
+    def __len__(self):
+        return self.count
+
+    def take_stats(self):
+        """hit/miss 카운터를 돌려주고 0으로 초기화"""
+        s = {'fp_hits': self.hits, 'fp_misses': self.misses, 'fp_bloom_skips': self.bloom_skips}
+        self.hits = self.misses = self.bloom_skips = 0
+        return s
+
+    # ---------- 저장 ----------
+    def save(self, path: str):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as w:
+            w.write(HEADER.pack(FP_MAGIC, self.cap, self.count, self.bloom is not None))
+            w.write(self.table)
+            if self.bloom is not None: w.write(self.bloom)
+        os.replace(tmp, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str, bloom: bool = True):
+        """저장된 index를 읽음. 없거나 형식/크기가 맞지 않으면 None"""
+        try:
+            with open(path, 'rb') as f:
+                magic, cap, count, has_bloom = HEADER.unpack(f.read(HEADER.size))
+                if magic != FP_MAGIC or cap & (cap - 1): return None
+                table = bytearray(f.read(cap * SLOT))
+                raw_bloom = bytearray(f.read()) if has_bloom else None
+        except (OSError, struct.error):
+            return None
+        if len(table) != cap * SLOT: return None
+        idx = cls.__new__(cls)
+        idx.cap, idx.mask, idx.count, idx.table = cap, cap - 1, count, table
+        idx.bloom_bits = cap * BLOOM_BITS_PER_SLOT
+        idx.dirty = False
+        idx.hits = idx.misses = idx.bloom_skips = 0
+        if bloom and raw_bloom is not None and len(raw_bloom) == idx.bloom_bits // 8:
+            idx.bloom = raw_bloom
+        elif bloom:             # bloom 없이 저장된 경우 테이블에서 다시 만든다
+            idx.bloom = bytearray(idx.bloom_bits // 8)
+            for i in range(cap):
+                k = bytes(table[i * SLOT:(i + 1) * SLOT])
+                if k != EMPTY: idx._bloom_add(k)
+            idx.dirty = True
+        else:
+            idx.bloom = None
+        return idx
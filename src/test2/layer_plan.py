@@ -0,0 +1,187 @@
+# 레이어 병합 계획: 위 레이어부터 거꾸로 훑어 최종 rootfs에 남는 멤버만 고른다
+#   순차 병합(레이어마다 opq 적용 → 멤버 순서대로 whiteout/추출)의 연산 순서를 뒤집어 보면,
+#   어떤 경로의 최종 상태는 그 경로에 닿는 "마지막" 연산이 정한다.
+#     - 같은 경로를 나중에 다시 추출하면 → 앞의 멤버는 덮어쓰기로 건너뜀
+#     - 나중에 경로(또는 상위 경로)가 whiteout되거나 상위 디렉토리가 opaque 처리되면 → 삭제로 건너뜀
+#   살아남은 멤버는 원래 순서대로 추출하므로 하드링크/디렉토리 메타데이터 처리도 순차 병합과 같다.
+#   건너뛴 멤버가 추출될 때 암묵적으로 만들어졌을 상위 디렉토리 중 지워지지 않는 것, 남는 멤버의 상위 디렉토리 중
+#   멤버 항목이 없는 것은 따로 만든다 (squash 스트림이 병합한 rootfs의 tar와 같은 항목을 갖도록).
+
+import re, copy, queue, threading
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+WH_PREFIX = '.wh.'
+WH_OPQ = '.wh..wh..opq'
+STREAM_BLOCK = 1024 * 1024      # squash 스트림에서 레이어 데이터를 넘기는 단위
+STREAM_DEPTH = 16               # 레이어마다 미리 풀어 둘 블록 수
+
+def clean_path(name: str) -> str:
+    name = name.replace('\\','/')
+    name = re.sub(r'^\./','', name).lstrip('/')
+    parts = [p for p in name.split('/') if p not in ('', '.', '..')]
+    return '/'.join(parts)
+
+def _split(path: str):
+    i = path.rfind('/')
+    return (path[:i], path[i+1:]) if i >= 0 else ('', path)
+
+def _ancestors(path: str):
+    while path:
+        path = _split(path)[0]
+        yield path
+
+def _masked(path: str, deleted: set, opaque: set) -> bool:
+    """나중 연산으로 지워지는 경로인지: whiteout된 경로 자신/하위, opaque 디렉토리의 하위"""
+    if path in deleted: return True
+    return any(p in deleted or p in opaque for p in _ancestors(path))
+
+def _needs_sequential(layers: List[List[tarfile.TarInfo]]) -> bool:
+    """
+    경로가 심볼릭 링크를 거치는 경우 (링크 아래 멤버, 링크를 가리키는 whiteout/opq)는
+    실제 디스크 상태에 따라 결과가 달라지므로 계획하지 않는다
+    """
+    links = {clean_path(m.name) for ms in layers for m in ms if m.issym()}
+    if not links: return False
+    for ms in layers:
+        for m in ms:
+            path = clean_path(m.name)
+            d, base = _split(path)
+            if base == WH_OPQ: target = d
+            elif base.startswith(WH_PREFIX): target = d + '/' + base[len(WH_PREFIX):] if d else base[len(WH_PREFIX):]
+            else: target = None
+            if target is not None and target in links: return True
+            if any(p in links for p in _ancestors(path) if p): return True
+    return False
+
+def plan(layers: List[List[tarfile.TarInfo]]) -> Optional[Tuple[List[List[tarfile.TarInfo]], List[str], dict]]:
+    """
+    layers: 아래 → 위 순서의 레이어별 멤버 목록
+    반환: (레이어별로 추출할 멤버 목록 (원래 순서), 먼저 만들어 둘 디렉토리, 통계)
+          순차 병합이 필요하면 None (심볼릭 링크를 거치는 경로, 건너뛸 하드링크,
+          파일 위에 디렉토리를 추출하는 경우)
+    """
+    if _needs_sequential(layers):
+        return None
+    # 하드링크는 inode를 공유하므로 (덮어쓰기가 링크에도 보임) 링크/대상 경로를 건너뛰게 되면 계획하지 않는다
+    hard = {clean_path(x) for ms in layers for m in ms if m.islnk() for x in (m.name, m.linkname)}
+    stats = {'members': 0, 'extracted': 0, 'skipped_overwritten': 0, 'skipped_deleted': 0,
+             'skipped_bytes': 0, 'extracted_bytes': 0}
+    decided, deleted, opaque, implied = {}, set(), set(), set()   # decided: 경로 → 디렉토리 여부
+    keep = []
+    for ms in reversed(layers):
+        kept, layer_opaque = [], set()
+        for m in reversed(ms):
+            path = clean_path(m.name)
+            if not path: continue
+            stats['members'] += 1
+            d, base = _split(path)
+            if base == WH_OPQ:
+                layer_opaque.add(d); continue        # opq는 이 레이어 멤버보다 먼저 적용 → 아래 레이어에만 영향
+            if base.startswith(WH_PREFIX):
+                deleted.add(d + '/' + base[len(WH_PREFIX):] if d else base[len(WH_PREFIX):]); continue
+            size = m.size if m.isreg() else 0
+            if (path in decided or _masked(path, deleted, opaque)) and path in hard:
+                return None
+            if path in decided:
+                # tarfile은 기존 파일 위에 디렉토리를 추출하면 파일을 그대로 두므로 계획으로 재현하지 않는다
+                if decided[path] and not m.isdir(): return None
+                stats['skipped_overwritten'] += 1; stats['skipped_bytes'] += size; continue
+            if _masked(path, deleted, opaque):
+                stats['skipped_deleted'] += 1; stats['skipped_bytes'] += size
+                implied.update(a for a in _ancestors(path) if a and not _masked(a, deleted, opaque))
+                continue
+            decided[path] = m.isdir(); kept.append(m)
+            stats['extracted'] += 1; stats['extracted_bytes'] += size
+            implied.update(a for a in _ancestors(path) if a)   # 항목 없이 추출되는 멤버의 상위 디렉토리
+        opaque |= layer_opaque
+        kept.reverse()
+        keep.append(kept)
+    keep.reverse()
+    # 실제 멤버로 남는 경로는 그 멤버가 만들므로 제외 → 항목이 없는 상위 디렉토리만 따로 만든다
+    return keep, sorted(implied - decided.keys()), stats
+
+# ------------------------- squash 스트림 -------------------------
+def read_members(tars: List[tarfile.TarFile], threads: int = 4) -> List[List[tarfile.TarInfo]]:
+    """레이어별 멤버 목록을 스레드에서 동시에 읽음 (gzip 해제는 GIL 밖에서 진행)"""
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as ex:
+        return list(ex.map(lambda t: t.getmembers(), tars))
+
+class _Stop(Exception):
+    pass
+
+class _QueueReader:
+    """생산자 스레드가 넣은 블록을 tarfile.addfile()이 읽는 파일처럼 꺼내 줌"""
+    def __init__(self, q):
+        self.q, self.buf = q, b''
+
+    def read(self, n: int) -> bytes:
+        # tarfile은 요청한 크기만큼 정확히 받아야 하므로 블록 경계를 넘어 모은다
+        parts, got = [], 0
+        while got < n:
+            if not self.buf:
+                item = self.q.get()
+                if isinstance(item, BaseException): raise item
+                self.buf = item
+            k = min(n - got, len(self.buf))
+            parts.append(self.buf[:k]); self.buf = self.buf[k:]; got += k
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+def write_squashed(tars: List[tarfile.TarFile], keep: List[List[tarfile.TarInfo]], dirs: List[str], out,
+                   threads: int = 4) -> dict:
+    """
+    plan() 결과로 병합된 rootfs tar 스트림을 out(파이프/파일)에 씀 → 디스크에 rootfs를 만들지 않음
+      - 레이어마다 생산자 스레드가 남는 멤버의 데이터를 풀어 bounded queue에 넣고
+      - 호출 스레드는 레이어 순서대로 꺼내 tar로 씀 (위 레이어 해제가 아래 레이어 쓰기와 겹침)
+    멤버 이름은 `tar -C rootfs -cf - .`처럼 './'로 시작한다
+    """
+    stop = threading.Event()
+    qs = [queue.Queue(maxsize=STREAM_DEPTH) for _ in tars]
+
+    def put(q, item):
+        while not stop.is_set():
+            try: q.put(item, timeout=0.1); return
+            except queue.Full: pass
+        raise _Stop()
+
+    def produce(i):
+        t, q = tars[i], qs[i]
+        try:
+            for m in keep[i]:
+                if not m.isreg(): continue
+                f = t.extractfile(m)
+                left = m.size
+                while left > 0:
+                    b = f.read(min(STREAM_BLOCK, left))
+                    if not b: raise EOFError(f"unexpected end of data: {m.name}")
+                    put(q, b); left -= len(b)
+        except _Stop:
+            pass
+        except BaseException as e:
+            try: put(q, e)
+            except _Stop: pass
+
+    stats = {'stream_members': 0, 'stream_bytes': 0}
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as ex, \
+         tarfile.open(fileobj=out, mode='w|', format=tarfile.PAX_FORMAT) as w:
+        try:
+            futs = [ex.submit(produce, i) for i in range(len(tars))]
+            for d in dirs:
+                ti = tarfile.TarInfo('./' + d); ti.type = tarfile.DIRTYPE; ti.mode = 0o755
+                w.addfile(ti)
+            for i, members in enumerate(keep):
+                r = _QueueReader(qs[i])
+                for m in members:
+                    ti = copy.copy(m)
+                    ti.name = './' + clean_path(m.name)
+                    if m.islnk(): ti.linkname = './' + clean_path(m.linkname)
+                    if m.issym(): ti.mode = 0o777       # 디스크에 만든 심볼릭 링크는 항상 0777
+                    ti.pax_headers = {k: v for k, v in m.pax_headers.items() if k not in ('path', 'linkpath')}
+                    w.addfile(ti, r if m.isreg() else None)
+                    stats['stream_members'] += 1
+                    stats['stream_bytes'] += m.size if m.isreg() else 0
+            for f in futs: f.result()
+        finally:
+            stop.set()
+    return stats
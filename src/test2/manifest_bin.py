@@ -0,0 +1,137 @@
+# 바이너리 매니페스트 (버전 포함, 고정폭 레코드 → mmap으로 바로 읽음)
+#   헤더  : magic(8B) | version u16 | flags u16 | 예약 u32 | 항목 수 u64 | 전체 크기 u64 | 이름 테이블 위치 u64
+#   레코드: digest(32B) | size u64 | offset u64   (offset = 앞 청크 크기의 누적 합)
+#   (test1 복사본만 쓰는 codec 테이블(flags 2, version 2)은 여기서 만들지 않는다: 청크 codec은 pack index에 기록되고,
+#    이름 테이블 위치가 헤더에 있으므로 version 2 매니페스트도 codec 테이블을 건너뛰고 그대로 읽힌다)
+#   이름 테이블(선택, FLAG_NAMES): 항목마다 길이 u16 + UTF-8 이름
+# JSON은 export()로 언제든 다시 만들 수 있다
+# 같은 형식(magic / VERSION)을 src/test1/utils/manifest_bin.py도 구현한다: 두 트리는 각자 디렉토리에서 따로 실행되므로 모듈을 복사해 둠
+#   형식을 바꾸면 두 파일을 함께 고치고 VERSION을 올린다 (src/test2/tests/test_manifest_bin.py가 서로 읽고 쓰는지 확인)
+
+import os, sys, json, mmap, struct
+
+MAGIC = b'AECMANF\0'
+VERSION = 2            # 읽을 수 있는 최고 버전
+BASE_VERSION = 1       # 여기서 쓰는 버전 (codec 테이블 없음)
+HEADER = struct.Struct('<8sHHIQQQ')
+RECORD = struct.Struct('<32sQQ')
+NAME_LEN = struct.Struct('<H')
+FLAG_NAMES = 1
+
+def is_binary(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def encode(entries, names=None) -> bytes:
+    """entries: (digest(32B 또는 hex), size) 목록 → 매니페스트 바이트"""
+    recs, off = [], 0
+    for d, size in entries:
+        if isinstance(d, str): d = bytes.fromhex(d)
+        recs.append(RECORD.pack(d, size, off)); off += size
+    flags, tail = 0, b''
+    names_off = 0
+    if names is not None:
+        if len(names) != len(recs): raise ValueError("names and entries differ in length")
+        flags |= FLAG_NAMES
+        names_off = HEADER.size + len(recs) * RECORD.size + len(tail)
+        parts = []
+        for n in names:
+            raw = n.encode('utf-8'); parts.append(NAME_LEN.pack(len(raw)) + raw)
+        tail += b''.join(parts)
+    return HEADER.pack(MAGIC, BASE_VERSION, flags, 0, len(recs), off, names_off) + b''.join(recs) + tail
+
+def write(path: str, entries, names=None) -> int:
+    """임시 파일에 쓴 뒤 os.replace로 교체. 전체 크기 반환"""
+    data = encode(entries, names)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as w:
+        w.write(data)
+    os.replace(tmp, path)
+    return HEADER.unpack_from(data)[5]
+
+class Manifest:
+    """
+    바이너리 매니페스트 읽기 (bytes / mmap 어느 쪽이든)
+      m[i] → (digest 32B, size, offset),  len(m), m.total_size, m.names()
+    """
+    def __init__(self, buf, _closer=None):
+        self.buf, self._closer = buf, _closer
+        if len(buf) < HEADER.size:
+            raise ValueError("manifest too short")
+        magic, self.version, self.flags, _, self.count, self.total_size, self.names_off = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError("not a binary manifest")
+        if self.version > VERSION:
+            raise ValueError(f"unsupported manifest version {self.version}")
+        if len(buf) < HEADER.size + self.count * RECORD.size:
+            raise ValueError("manifest truncated")
+
+    @classmethod
+    def open(cls, path: str) -> 'Manifest':
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mm, mm.close)
+
+    def close(self):
+        if self._closer is not None:
+            self._closer(); self._closer = None
+        self.buf = None
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+    def __len__(self): return self.count
+
+    def __getitem__(self, i: int):
+        if not 0 <= i < self.count: raise IndexError(i)
+        return RECORD.unpack_from(self.buf, HEADER.size + i * RECORD.size)
+
+    def __iter__(self):
+        return RECORD.iter_unpack(self.buf[HEADER.size:HEADER.size + self.count * RECORD.size])
+
+    def hexdigests(self):
+        return [d.hex() for d, _, _ in self]
+
+    def names(self):
+        if not self.flags & FLAG_NAMES: return None
+        out, p, buf = [], self.names_off, self.buf
+        for _ in range(self.count):
+            (n,) = NAME_LEN.unpack_from(buf, p); p += NAME_LEN.size
+            out.append(bytes(buf[p:p + n]).decode('utf-8')); p += n
+        return out
+
+    def to_json(self):
+        """JSON 형식: 이름이 있으면 {filename, size, sha256} 목록, 없으면 hex digest 목록"""
+        names = self.names()
+        if names is None: return self.hexdigests()
+        return [{"filename": n, "size": size, "sha256": d.hex()} for n, (d, size, _) in zip(names, self)]
+
+def load_digests(path: str):
+    """hex digest 목록 (바이너리 매니페스트, 또는 이전 형식인 JSON 목록)"""
+    if is_binary(path):
+        with Manifest.open(path) as m:
+            return m.hexdigests()
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def load_entries(path: str):
+    """(hex digest 목록, size 목록). 이전 형식인 JSON 목록이면 size는 None"""
+    if is_binary(path):
+        with Manifest.open(path) as m:
+            entries = list(m)
+        return [d.hex() for d, _, _ in entries], [size for _, size, _ in entries]
+    with open(path, 'r') as f:
+        return json.load(f), None
+
+def export(path: str, out_path: str):
+    with Manifest.open(path) as m, open(out_path, 'w') as f:
+        json.dump(m.to_json(), f, indent=2)
+
+if __name__ == '__main__':
+    # python3 manifest_bin.py export <매니페스트> <출력 JSON>
+    if len(sys.argv) == 4 and sys.argv[1] == 'export':
+        export(sys.argv[2], sys.argv[3])
+    else:
+        print("usage: manifest_bin.py export <manifest> <out.json>", file=sys.stderr); sys.exit(2)
@@ -0,0 +1,133 @@
+# 분할 결과(매니페스트) 캐시: 바뀌지 않은 blob은 다시 청킹 / 해시하지 않는다
+#   키   : 원본 식별자 + 청커 파라미터
+#          - OCI blob(blobs/sha256/<64 hex>)은 파일 이름의 digest (내용 주소이므로 위치 / 시각과 무관)
+#          - 그 밖의 파일(index.json, oci-layout 등)은 (device, inode, size, mtime_ns)
+#          - 청커 파라미터: 알고리즘 이름 + MIN/AVG/MAX/WIN/mode (numpy / python 엔진은 같은 청크를 만들므로 제외)
+#   항목 : <root>/<sha256(키)>       바이너리 매니페스트 바이트 그대로 (manifest_bin 형식)
+#          <root>/<sha256(키)>.json  {source, params, size, split_time, manifest}  (manifest = 매니페스트 바이트의 sha256)
+#   두 파일은 따로 os.replace되므로, 동시에 put한 다른 프로세스의 짝과 섞여 보일 수 있다
+#     → lookup은 읽은 매니페스트 바이트가 .json의 manifest와 같을 때만 쓰고, 읽은 바이트를 그대로 복사
+#   히트여도 매니페스트의 모든 digest가 청크 저장소에 있을 때만 사용 (GC / 중단된 실행으로 빠진 청크 방지)
+#   prune(): 마지막 사용(.json mtime, 히트 시 갱신)이 오래된 항목부터 지워 크기 / 기간 상한을 지킨다
+#     (stat 키 항목은 원본이 바뀌면 다시 쓰이지 않으므로 여기서만 정리됨, 청크 GC 후 호출)
+# 캐시는 chunks_storage 아래에 두므로 ensure_dirs()가 manifests/를 지워도 유지된다
+
+import os, re, json, time, hashlib
+import manifest_bin
+
+HEX_NAME = re.compile(r'^[0-9a-f]{64}$')
+DIR_NAME = 'manifest_cache'
+STALE_TMP = 3600        # 이보다 오래된 임시 파일 / 짝 없는 파일은 중단된 put이 남긴 것으로 보고 삭제 (s)
+
+def source_key(path: str, st=None) -> str:
+    """blob이면 'sha256:<digest>', 아니면 'stat:<dev>:<ino>:<size>:<mtime_ns>'"""
+    name = os.path.basename(path)
+    if HEX_NAME.match(name) and os.path.basename(os.path.dirname(path)) == 'sha256':
+        return f'sha256:{name}'
+    st = st or os.stat(path)
+    return f'stat:{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}'
+
+def chunker_params(name: str, min_size: int, avg_size: int, max_size: int, win: int, mode: str) -> str:
+    return f'{name}:{min_size}:{avg_size}:{max_size}:{win}:{mode}'
+
+class ManifestCache:
+    """
+    lookup(path, mf_path, store) → 히트면 mf_path에 매니페스트를 복사하고 (digest 목록, size 목록, 기록된 분할 시간)
+    put(path, mf_path, split_time) → 방금 쓴 매니페스트를 캐시에 등록
+    prune(max_bytes, max_age) → 오래 쓰지 않은 항목 삭제
+    여러 프로세스가 동시에 써도 되도록 항목은 임시 파일 + os.replace로 기록
+    """
+    def __init__(self, root: str, params: str):
+        self.root, self.params = root, params
+        os.makedirs(root, exist_ok=True)
+
+    def _entry(self, path: str, st):
+        key = source_key(path, st)
+        name = hashlib.sha256(f'{key}|{self.params}'.encode()).hexdigest()
+        return key, os.path.join(self.root, name)
+
+    def lookup(self, path: str, mf_path: str, store):
+        st = os.stat(path)
+        _, entry = self._entry(path, st)
+        try:
+            with open(entry + '.json', 'r') as f:
+                meta = json.load(f)
+            if meta.get('size') != st.st_size or meta.get('params') != self.params:
+                return None
+            with open(entry, 'rb') as f:
+                raw = f.read()
+            if hashlib.sha256(raw).hexdigest() != meta.get('manifest'):
+                return None             # 다른 put의 매니페스트와 짝이 맞지 않음 (또는 이전 형식의 .json)
+            m = manifest_bin.Manifest(raw)
+            hashes, sizes = m.hexdigests(), [size for _, size, _ in m]
+        except (OSError, ValueError):
+            return None
+        if sum(sizes) != st.st_size:
+            return None
+        if not all(store.has(h) for h in hashes):
+            return None
+        with open(mf_path, 'wb') as w:
+            w.write(raw)
+        try:
+            os.utime(entry + '.json')   # prune의 최근 사용 기준
+        except OSError:
+            pass
+        return hashes, sizes, meta.get('split_time', 0.0)
+
+    def put(self, path: str, mf_path: str, split_time: float):
+        st = os.stat(path)
+        key, entry = self._entry(path, st)
+        with open(mf_path, 'rb') as f:
+            raw = f.read()
+        meta = {'source': key, 'params': self.params, 'size': st.st_size, 'split_time': split_time,
+                'manifest': hashlib.sha256(raw).hexdigest()}
+        tmp, meta_tmp = f'{entry}.{os.getpid()}.tmp', f'{entry}.json.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as w:
+            w.write(raw)
+        with open(meta_tmp, 'w') as w:
+            json.dump(meta, w)
+        os.replace(tmp, entry)
+        os.replace(meta_tmp, entry + '.json')
+
+    def entries(self):
+        """캐시에 있는 매니페스트 경로 목록"""
+        return [os.path.join(self.root, n) for n in os.listdir(self.root) if HEX_NAME.match(n)]
+
+    def prune(self, max_bytes: int, max_age: float):
+        """
+        마지막 사용이 max_age(s)보다 오래된 항목을 지우고, 남은 크기가 max_bytes를 넘으면 오래된 것부터 더 지움
+        (0이면 해당 상한 없음). 반환: (삭제한 항목 수, 바이트)
+        """
+        now = time.time()
+        items, removed, freed = [], 0, 0
+        for n in os.listdir(self.root):
+            p = os.path.join(self.root, n)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            if HEX_NAME.match(n):
+                try:
+                    meta_st = os.stat(p + '.json')
+                except OSError:
+                    meta_st = None
+                if meta_st is None:
+                    if now - st.st_mtime > STALE_TMP: items.append((0.0, [p], st.st_size))
+                    continue
+                items.append((meta_st.st_mtime, [p, p + '.json'], st.st_size + meta_st.st_size))
+            elif now - st.st_mtime > STALE_TMP and (n.endswith('.tmp') or (n.endswith('.json') and not os.path.exists(p[:-5]))):
+                items.append((0.0, [p], st.st_size))    # 중단된 put의 임시 파일 / 매니페스트 없는 .json
+        items.sort()
+        total = sum(size for _, _, size in items)
+        for used, paths, size in items:
+            if used and (not max_age or now - used <= max_age) and (not max_bytes or total <= max_bytes):
+                continue
+            for p in paths:
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            if used: removed += 1
+            freed += size
+        return removed, freed
@@ -0,0 +1,205 @@
+# 청크 참조 카운트 + 점진적 GC + 이미지별 사용량(du) 보고
+#   참조 단위는 "이미지": 분할이 끝난 manifests/ 전체(= 한 번 실행한 OCI 이미지)를 IMAGE_NAME으로 등록
+#   <chunks>/refs/counts         : digest 순 고정폭 레코드 (digest 32B | 참조하는 이미지 수 u32)
+#   <chunks>/refs/images/<이름>  : 이미지가 참조하는 고유 청크 목록 (manifest_bin 형식, digest 순, size = 원본 크기)
+#   <chunks>/refs/pending        : 참조 수가 0이 된 digest (32B씩 append, GC 후보)
+# 이미지를 다시 등록하면 이전 목록과의 차이만큼만 카운트를 바꾸고, GC는 pending에 쌓인 digest만 본다
+#   → 모든 매니페스트를 훑는 mark-and-sweep 없이 참조가 끊긴 청크만 index에서 빼고,
+#     죽은 바이트 비율이 높은 pack만 다시 써서 공간을 회수한다
+# 매니페스트 캐시(manifest_cache.py)는 참조를 잡지 않는다 (사용할 때 청크가 모두 있는지 확인)
+#
+#   python3 refcount.py du <chunks_dir>              이미지별 고유 / 공유 바이트
+#   python3 refcount.py gc <chunks_dir>              참조 0 청크 삭제 + pack 압축
+#   python3 refcount.py rm <chunks_dir> <이미지>      이미지 등록 해제 (다음 gc에서 청크 회수)
+#   python3 refcount.py rebuild <chunks_dir>         이미지 목록에서 카운트를 다시 계산 (중단된 실행 복구, 이전 청크 정리)
+# GC / rebuild는 같은 저장소에 쓰는 분할이 돌고 있지 않을 때 실행해야 한다
+
+import os, sys, struct
+from urllib.parse import quote, unquote
+import manifest_bin
+import chunk_store
+
+COUNTS_MAGIC = b'AECREF1\0'
+COUNT = struct.Struct('<32sI')
+GC_COMPACT_RATIO = float(os.environ.get("GC_COMPACT_RATIO", 0.5))  # pack에서 죽은 바이트가 이 비율 이상이면 다시 씀
+
+class RefIndex:
+    """
+    set_image(name, entries) : 이미지의 청크 목록을 등록 / 교체 (차이만큼 카운트 증감)
+    remove_image(name)       : 등록 해제
+    gc(store)                : pending 중 참조 0인 청크를 store에서 빼고 pack 압축
+    du(store)                : 이미지별 {chunks, logical, unique, shared} (저장 바이트 기준)
+    """
+    def __init__(self, chunks_dir: str):
+        self.root = os.path.join(chunks_dir, 'refs')
+        self.image_dir = os.path.join(self.root, 'images')
+        self.counts_path = os.path.join(self.root, 'counts')
+        self.pending_path = os.path.join(self.root, 'pending')
+        self.fresh = not os.path.exists(self.counts_path)  # 처음 만드는 index (이전 청크는 rebuild로 정리)
+        os.makedirs(self.image_dir, exist_ok=True)
+        self.counts = self._load_counts()
+
+    # ---------- 저장 ----------
+    def _load_counts(self):
+        counts = {}
+        if not os.path.exists(self.counts_path):
+            return counts
+        with open(self.counts_path, 'rb') as f:
+            data = f.read()
+        if data[:len(COUNTS_MAGIC)] != COUNTS_MAGIC:
+            raise ValueError(f"not a refcount index: {self.counts_path}")
+        for d, n in COUNT.iter_unpack(memoryview(data)[len(COUNTS_MAGIC):]):
+            counts[d] = n
+        return counts
+
+    def _save_counts(self):
+        tmp = self.counts_path + '.tmp'
+        with open(tmp, 'wb') as w:
+            w.write(COUNTS_MAGIC)
+            w.writelines(COUNT.pack(d, n) for d, n in sorted(self.counts.items()))
+        os.replace(tmp, self.counts_path)
+
+    def _add_pending(self, digests):
+        if digests:
+            with open(self.pending_path, 'ab') as w:
+                w.write(b''.join(digests))
+
+    def pending(self):
+        try:
+            with open(self.pending_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return set()
+        return {data[i:i + 32] for i in range(0, len(data) - 31, 32)}
+
+    # ---------- 이미지 ----------
+    def image_path(self, name: str) -> str:
+        return os.path.join(self.image_dir, quote(name, safe=''))
+
+    def images(self):
+        return sorted(unquote(n) for n in os.listdir(self.image_dir) if not n.endswith('.tmp'))
+
+    def load_image(self, name: str):
+        """digest(32B) → 원본 크기"""
+        path = self.image_path(name)
+        if not os.path.exists(path):
+            return {}
+        with manifest_bin.Manifest.open(path) as m:
+            return {d: size for d, size, _ in m}
+
+    def set_image(self, name: str, entries):
+        """
+        entries: (digest(32B 또는 hex), 원본 크기) 목록 (중복 가능, 매니페스트들의 청크를 이어 붙인 것)
+        반환: (새로 참조한 청크 수, 참조를 놓은 청크 수)
+        """
+        new = {}
+        for d, size in entries:
+            new[bytes.fromhex(d) if isinstance(d, str) else d] = size
+        old = self.load_image(name)
+        zero = []
+        for d in new.keys() - old.keys():
+            self.counts[d] = self.counts.get(d, 0) + 1
+        for d in old.keys() - new.keys():
+            n = self.counts.get(d, 0) - 1
+            if n > 0:
+                self.counts[d] = n
+            else:
+                self.counts.pop(d, None); zero.append(d)
+        # pending → counts → 이미지 순으로 기록 (중간에 끊기면 rebuild로 복구)
+        self._add_pending(zero)
+        self._save_counts()
+        if new:
+            manifest_bin.write(self.image_path(name), sorted(new.items()))
+        elif os.path.exists(self.image_path(name)):
+            os.remove(self.image_path(name))
+        return len(new.keys() - old.keys()), len(zero)
+
+    def remove_image(self, name: str):
+        return self.set_image(name, [])
+
+    # ---------- GC ----------
+    def gc(self, store, compact_ratio: float = GC_COMPACT_RATIO):
+        """
+        pending 중 지금도 참조 0인 청크만 store에서 빼고, 죽은 바이트 비율이 compact_ratio 이상인 pack을 다시 씀
+        반환: {removed_chunks, removed_bytes, compacted_packs, reclaimed_bytes}
+        """
+        dead = {d for d in self.pending() if self.counts.get(d, 0) == 0}
+        removed, removed_bytes = store.remove(dead)
+        packs = [p for p, (live, size) in store.pack_usage().items()
+                 if size and (size - live) >= size * compact_ratio]
+        reclaimed = store.compact(packs)
+        with open(self.pending_path, 'wb'):
+            pass
+        return {'removed_chunks': removed, 'removed_bytes': removed_bytes,
+                'compacted_packs': len(packs), 'reclaimed_bytes': reclaimed}
+
+    def rebuild(self, store):
+        """
+        이미지 목록에서 카운트를 다시 계산하고, index에는 있지만 어느 이미지도 참조하지 않는 청크를 pending에 넣는다
+        (refcount 도입 이전의 청크, 등록 전에 중단된 실행이 남긴 청크 정리용. 이것만 전체를 훑는다)
+        """
+        counts = {}
+        for name in self.images():
+            for d in self.load_image(name):
+                counts[d] = counts.get(d, 0) + 1
+        self.counts = counts
+        self._save_counts()
+        orphans = [rec[:32] for rec in store._records() if rec[:32] not in counts]
+        self._add_pending(orphans)
+        return len(orphans)
+
+    # ---------- 사용량 ----------
+    def du(self, store):
+        """
+        이미지 이름 → {chunks, logical, unique, shared}
+          logical: 이미지가 참조하는 고유 청크의 원본 크기 합
+          unique : 이 이미지만 참조하는 청크의 저장 바이트 (이미지를 지우면 회수되는 양)
+          shared : 다른 이미지와 함께 참조하는 청크의 저장 바이트
+        """
+        report = {}
+        for name in self.images():
+            r = {'chunks': 0, 'logical': 0, 'unique': 0, 'shared': 0}
+            for d, size in self.load_image(name).items():
+                loc = store.locate(d.hex())
+                stored = loc[2] if loc is not None else 0
+                r['chunks'] += 1; r['logical'] += size
+                r['unique' if self.counts.get(d, 0) <= 1 else 'shared'] += stored
+            report[name] = r
+        return report
+
+def format_du(report, store) -> list:
+    """du 형식 표: 이미지마다 한 줄 + 저장소 전체 (pack 파일 / 참조되는 바이트)"""
+    mb = lambda n: f"{n / 1024 / 1024:10.2f} MB"
+    lines = [f"{'unique':>13s} {'shared':>13s} {'logical':>13s} {'chunks':>8s}  image"]
+    for name, r in report.items():
+        lines.append(f"{mb(r['unique'])} {mb(r['shared'])} {mb(r['logical'])} {r['chunks']:8,d}  {name}")
+    usage = store.pack_usage()
+    live, size = sum(u[0] for u in usage.values()), sum(u[1] for u in usage.values())
+    lines.append(f"packs {len(usage):,}: {mb(size).strip()} on disk, {mb(live).strip()} in index, {mb(size - live).strip()} reclaimable")
+    return lines
+
+def image_entries(manifests_dir: str):
+    """manifests/ 아래 모든 매니페스트의 (hex digest, 원본 크기)"""
+    for root, _, files in os.walk(manifests_dir):
+        for n in files:
+            hashes, sizes = manifest_bin.load_entries(os.path.join(root, n))
+            yield from zip(hashes, sizes if sizes is not None else [0] * len(hashes))
+
+if __name__ == '__main__':
+    cmds = {'du': 3, 'gc': 3, 'rm': 4, 'rebuild': 3}
+    if len(sys.argv) < 2 or cmds.get(sys.argv[1]) != len(sys.argv):
+        print(f"사용법: {sys.argv[0]} du|gc|rebuild <chunks_dir> / rm <chunks_dir> <이미지>", file=sys.stderr); sys.exit(2)
+    cmd, chunks_dir = sys.argv[1], sys.argv[2]
+    refs, store = RefIndex(chunks_dir), chunk_store.PackStore(chunks_dir)
+    if cmd == 'rm':
+        _, dropped = refs.remove_image(sys.argv[3])
+        print(f"unregistered {sys.argv[3]}: {dropped:,} chunks now unreferenced (run gc to reclaim)")
+    elif cmd == 'rebuild':
+        print(f"recounted {len(refs.images())} images, {refs.rebuild(store):,} unreferenced chunks queued for gc")
+    elif cmd == 'gc':
+        r = refs.gc(store)
+        print(f"removed {r['removed_chunks']:,} chunks ({r['removed_bytes'] / 1024 / 1024:.2f} MB), "
+              f"compacted {r['compacted_packs']} packs, reclaimed {r['reclaimed_bytes'] / 1024 / 1024:.2f} MB")
+    else:
+        print("\n".join(format_du(refs.du(store), store)))
+    store.close()
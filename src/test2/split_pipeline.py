@@ -0,0 +1,93 @@
+# 분할 파이프라인: 경계 탐색 → SHA-256 해시 → 저장 단계를 겹쳐 실행
+#   - 경계 탐색(호출 스레드): 청크 view를 해시 스레드 풀에 넘기고 bounded queue에 넣는다
+#   - 해시(스레드 풀): hashlib은 큰 버퍼에서 GIL을 놓으므로 여러 청크를 동시에 해시
+#   - 저장(writer 스레드): queue 순서대로 해시를 기다려 저장 → 매니페스트 순서 유지
+
+import hashlib, queue, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+STAGE_KEYS = ('find_busy', 'find_idle', 'hash_busy', 'hash_idle', 'write_busy', 'write_idle')
+
+def new_stage_stats():
+    s = {'stage_' + k: 0.0 for k in STAGE_KEYS}
+    s.update({'queue_depth_sum': 0, 'queue_depth_samples': 0, 'queue_depth_max': 0})
+    return s
+
+def run(views, write, hash_threads: int = 2, depth: int = 64, stats=None):
+    """
+    views(ae_cdc.chunk_views 등, 청크 순서)의 각 청크를 해시해 write(h, data) 호출
+    반환: 청크 순서대로의 hex digest 목록
+    stats가 주어지면 단계별 busy/idle 시간(s)과 queue 깊이를 누적
+    """
+    q = queue.Queue(maxsize=depth)
+    hashes, err = [], []
+    hash_busy = [0.0]
+    lock = threading.Lock()
+
+    def hash_one(data):
+        t = time.perf_counter()
+        h = hashlib.sha256(data).hexdigest()
+        dt = time.perf_counter() - t
+        with lock: hash_busy[0] += dt
+        return h
+
+    def writer():
+        busy = idle = 0.0
+        while True:
+            t0 = time.perf_counter()
+            item = q.get()
+            if item is None: break
+            if err: continue                # 오류 후에는 남은 항목을 버리며 queue만 비운다
+            data, fut = item
+            try:
+                h = fut.result()
+                t1 = time.perf_counter()
+                write(h, data)
+                hashes.append(h)
+                idle += t1 - t0; busy += time.perf_counter() - t1
+            except BaseException as e:
+                err.append(e)
+        if stats is not None:
+            stats['stage_write_busy'] += busy; stats['stage_write_idle'] += idle
+
+    start = time.perf_counter()
+    find_busy = find_idle = 0.0
+    wt = threading.Thread(target=writer, name='split-writer')
+    wt.start()
+    with ThreadPoolExecutor(max_workers=hash_threads, thread_name_prefix='split-hash') as pool:
+        try:
+            it = iter(views)
+            while not err:
+                t0 = time.perf_counter()
+                data = next(it, None)
+                if data is None: break
+                fut = pool.submit(hash_one, data)
+                t1 = time.perf_counter()
+                if stats is not None:
+                    d = q.qsize()
+                    stats['queue_depth_sum'] += d; stats['queue_depth_samples'] += 1
+                    if d > stats['queue_depth_max']: stats['queue_depth_max'] = d
+                q.put((data, fut))
+                find_busy += t1 - t0; find_idle += time.perf_counter() - t1
+        finally:
+            q.put(None)
+            wt.join()
+    wall = time.perf_counter() - start
+    if err: raise err[0]
+    if stats is not None:
+        stats['stage_find_busy'] += find_busy; stats['stage_find_idle'] += find_idle
+        stats['stage_hash_busy'] += hash_busy[0]
+        stats['stage_hash_idle'] += max(hash_threads * wall - hash_busy[0], 0.0)
+    return hashes
+
+def format_stages(stats) -> str:
+    """단계별 busy/idle 요약 한 줄 (가장 바쁜 단계 표시)"""
+    parts = []
+    for name in ('find', 'hash', 'write'):
+        b, i = stats[f'stage_{name}_busy'], stats[f'stage_{name}_idle']
+        parts.append((b / (b + i) if b + i else 0.0, name, b, i))
+    top = max(parts)[1]
+    n = stats['queue_depth_samples']
+    avg_q = stats['queue_depth_sum'] / n if n else 0.0
+    body = ", ".join(f"{name} busy {b:.3f}s / idle {i:.3f}s ({u*100:.0f}%)" for u, name, b, i in parts)
+    return f"{body} | queue 평균 {avg_q:.1f}, 최대 {stats['queue_depth_max']} | 병목: {top}"
@@ -0,0 +1,4 @@
+import os, sys
+
+# 테스트는 스크립트와 같은 기준(src/test2)에서 container_dedup / layer_plan / chunk_store 등을 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
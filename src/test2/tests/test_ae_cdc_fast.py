@@ -0,0 +1,49 @@
+import random
+import pytest
+import ae_cdc
+
+# iter_chunks_fast(NumPy 블록 단위, AECDC_ENGINE=numpy 기본)가 iter_chunks와 같은 Chunk를 내는지 확인
+# 두 gear 테이블, max / min 모드, AVG / MAX보다 짧은 버퍼, 블록 크기(FAST_BLOCK_MIN)를 넘는 청크 포함
+
+# (MIN, AVG, MAX, win_left)
+PARAMS = [
+    (64, 256, 1024, 48),
+    (16, 64, 256, 48),          # win_left가 AVG에 가까움: 좌측창이 청크 시작점에서 잘리는 경우
+    (512, 2048, 8192, 256),
+    (1024, 6000, 20000, 256),   # AVG ~ MAX 구간이 FAST_BLOCK_MIN보다 길어 블록을 여러 번 키움
+    (1, 1, 2, 1),
+]
+
+def _inputs():
+    rng = random.Random(9)
+    return {
+        'random': rng.randbytes(30000),
+        'periodic': rng.randbytes(61) * 300,
+        'constant': b'\xab' * 8000,
+        'ramp': bytes(i % 256 for i in range(8000)),
+        'shorter-than-avg': rng.randbytes(50),
+        'between-avg-and-max': rng.randbytes(1500),
+        'one-byte': b'\x01',
+        'empty': b'',
+    }
+
+INPUTS = _inputs()
+
+@pytest.mark.parametrize('gear', ['GEAR', 'GEAR_256'])
+@pytest.mark.parametrize('mode', ['max', 'min'])
+@pytest.mark.parametrize('params', PARAMS, ids=str)
+@pytest.mark.parametrize('kind', list(INPUTS))
+def test_matches_iter_chunks(kind, params, mode, gear):
+    data = INPUTS[kind]
+    mn, avg, mx, win = params
+    table = getattr(ae_cdc, gear)
+    expected = list(ae_cdc.iter_chunks(memoryview(data), mn, avg, mx, win_left=win, mode=mode, gear=table))
+    got = list(ae_cdc.iter_chunks_fast(data, mn, avg, mx, win_left=win, mode=mode, gear=table))
+    assert got == expected
+    assert sum(c.length for c in got) == len(data)
+
+def test_accepts_mmap_like_buffers():
+    data = INPUTS['random']
+    expected = list(ae_cdc.iter_chunks(memoryview(data), 64, 256, 1024, win_left=48))
+    assert list(ae_cdc.iter_chunks_fast(memoryview(data), 64, 256, 1024, win_left=48)) == expected
+    assert list(ae_cdc.iter_chunks_fast(bytearray(data), 64, 256, 1024, win_left=48)) == expected
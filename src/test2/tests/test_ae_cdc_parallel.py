@@ -0,0 +1,70 @@
+import random
+import pytest
+import ae_cdc
+
+# iter_chunks_parallel(파일을 구간으로 나눠 워커마다 극값 계산)이 iter_chunks와 같은 청크를 내는지 확인
+# 구간 이음매 바로 앞 / 뒤에 컷이 오도록 파일 길이를 잘라 이음매 보정(win_left + HASH_SPAN 이내 재스캔)을 확인한다
+
+# (MIN, AVG, MAX, win_left): 두 번째는 win_left + HASH_SPAN > AVG라 청크 시작점 부근을 다시 스캔하는 경로를 탄다
+PARAMS = [(64, 256, 1024, 48), (16, 64, 256, 48)]
+WIN = 48
+
+def _sequential(data, mode, params=PARAMS[0], gear=ae_cdc.GEAR):
+    mn, avg, mx, win = params
+    return list(ae_cdc.iter_chunks(memoryview(data), mn, avg, mx, win_left=win, mode=mode, gear=gear))
+
+def _parallel(tmp_path, data, mode, workers, params=PARAMS[0], gear=ae_cdc.GEAR):
+    mn, avg, mx, win = params
+    path = tmp_path / 'blob'
+    path.write_bytes(data)
+    return ae_cdc.iter_chunks_parallel(str(path), mn, avg, mx, win_left=win, mode=mode, workers=workers, gear=gear)
+
+def _seam_cases(data, mode, workers, params):
+    """이음매(= ceil(n / workers))가 순차 모드 컷 위치 근처에 오도록 자른 길이들"""
+    cuts = [c.offset + c.length - 1 for c in _sequential(data, mode, params)][2:6]
+    lengths = set()
+    for c in cuts:
+        for d in (-WIN - ae_cdc.HASH_SPAN, -WIN, -1, 0, 1, 2, WIN, WIN + ae_cdc.HASH_SPAN):
+            n = (c + d) * workers
+            if 0 < n <= len(data):
+                lengths.add(n)
+    return sorted(lengths)
+
+DATA = random.Random(5).randbytes(40000)
+
+@pytest.mark.parametrize('params', PARAMS, ids=str)
+@pytest.mark.parametrize('mode', ['max', 'min'])
+@pytest.mark.parametrize('workers', [2, 3])
+def test_cuts_near_seams(tmp_path, mode, workers, params):
+    lengths = _seam_cases(DATA, mode, workers, params)
+    assert len(lengths) >= 8
+    for n in lengths:
+        data = DATA[:n]
+        assert _parallel(tmp_path, data, mode, workers, params) == _sequential(data, mode, params), n
+
+@pytest.mark.parametrize('params', PARAMS, ids=str)
+@pytest.mark.parametrize('mode', ['max', 'min'])
+@pytest.mark.parametrize('workers', [1, 4, 7])
+@pytest.mark.parametrize('kind', ['random', 'periodic', 'constant', 'short'])
+def test_matches_sequential(tmp_path, kind, workers, mode, params):
+    rng = random.Random(11)
+    if kind == 'random':
+        data = rng.randbytes(30011)
+    elif kind == 'periodic':
+        data = rng.randbytes(97) * 300
+    elif kind == 'constant':
+        data = b'\x07' * 9000
+    else:
+        data = rng.randbytes(params[1] - 10)
+    assert _parallel(tmp_path, data, mode, workers, params) == _sequential(data, mode, params)
+
+@pytest.mark.parametrize('params', PARAMS, ids=str)
+@pytest.mark.parametrize('mode', ['max', 'min'])
+def test_gear_table(tmp_path, mode, params):
+    data = random.Random(2).randbytes(20000)
+    expected = _sequential(data, mode, params, gear=ae_cdc.GEAR_256)
+    assert expected != _sequential(data, mode, params)
+    assert _parallel(tmp_path, data, mode, 3, params, gear=ae_cdc.GEAR_256) == expected
+
+def test_empty(tmp_path):
+    assert _parallel(tmp_path, b'', 'max', 4) == []
@@ -0,0 +1,44 @@
+import os, random, importlib.util
+import pytest
+import chunk_codec
+
+# test2(pack 저장소) / test1(OTA 서버) chunk_codec 복사본이 같은 codec id / 압축 규칙을 쓰는지 확인
+
+TEST1_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'test1', 'utils', 'chunk_codec.py')
+
+def _load_test1():
+    spec = importlib.util.spec_from_file_location('test1_chunk_codec', TEST1_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+other = _load_test1()
+
+SAMPLES = {
+    'text': b'the quick brown fox jumps over the lazy dog\n' * 2000,
+    'random': random.Random(1).randbytes(100000),
+    'small': b'abc' * 10,
+    'empty': b'',
+}
+
+def test_same_ids():
+    assert chunk_codec.NAMES == other.NAMES
+    assert (chunk_codec.MIN_SIZE, chunk_codec.SAMPLE, chunk_codec.SAMPLE_RATIO, chunk_codec.MAX_RATIO) == \
+           (other.MIN_SIZE, other.SAMPLE, other.SAMPLE_RATIO, other.MAX_RATIO)
+
+@pytest.mark.parametrize('name', list(SAMPLES))
+@pytest.mark.parametrize('codec', [chunk_codec.RAW, chunk_codec.ZLIB, chunk_codec.LZMA])
+def test_same_output(name, codec):
+    data = SAMPLES[name]
+    used, out = chunk_codec.compress(data, codec)
+    other_used, other_out = other.compress(data, codec)
+    assert (used, bytes(out)) == (other_used, bytes(other_out))
+    assert other.decompress(used, out) == data
+    dec = other.Decoder(used) if used else None
+    if dec is not None:
+        got = b''.join(dec.feed(out[i:i + 777]) for i in range(0, len(out), 777)) + dec.finish()
+        assert got == data
+
+def test_incompressible_stays_raw():
+    used, out = chunk_codec.compress(SAMPLES['random'], chunk_codec.ZLIB)
+    assert used == chunk_codec.RAW and out is SAMPLES['random']
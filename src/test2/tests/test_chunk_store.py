@@ -0,0 +1,189 @@
+import os, random, hashlib
+import pytest
+import chunk_store
+import chunk_codec
+import manifest_bin
+
+# PackStore 왕복: put → flush → (다시 열어서) read / locate / copy_to / ChunkedFile,
+# 워커 프로세스 항목 병합(같은 digest를 두 번 쓴 경우), remove 후 compact
+
+def _chunks(n, seed=1, text=False):
+    rng = random.Random(seed)
+    out = {}
+    for i in range(n):
+        if text:
+            data = (f'line {i} of some compressible text\n' * rng.randrange(20, 200)).encode()
+        else:
+            data = rng.randbytes(rng.randrange(1, 5000))
+        out[hashlib.sha256(data).hexdigest()] = data
+    return out
+
+def _open(root, **kw):
+    return chunk_store.PackStore(str(root), **kw)
+
+@pytest.mark.parametrize('bloom', [True, False])
+def test_put_flush_read(tmp_path, bloom):
+    chunks = _chunks(200)
+    store = _open(tmp_path, bloom=bloom)
+    for h, data in chunks.items():
+        assert store.put(h, data)
+    for h, data in chunks.items():
+        assert not store.put(h, data)               # 이미 있음
+        assert store.read(h) == data                # flush 전에도 읽힘
+    store.flush()
+    store.close()
+
+    store = _open(tmp_path, bloom=bloom)
+    assert store.count == len(chunks) and len(store.fp) == len(chunks)
+    for h, data in chunks.items():
+        assert store.has(h)
+        loc = store.locate(h)
+        assert loc[2] == len(data) and loc[3] == chunk_codec.RAW
+        assert store.read(h) == data
+        assert not store.put(h, data)
+    missing = hashlib.sha256(b'missing').hexdigest()
+    assert store.locate(missing) is None and not store.has(missing)
+    with pytest.raises(KeyError):
+        store.read(missing)
+    store.close()
+
+def test_memoryview_put_and_multiple_packs(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunk_store, 'PACK_SIZE', 20000)
+    chunks = _chunks(100, seed=2)
+    blob = b''.join(chunks.values())
+    store = _open(tmp_path)
+    pos, mv = 0, memoryview(bytearray(blob))
+    for h, data in chunks.items():
+        store.put(h, mv[pos:pos + len(data)]); pos += len(data)
+    store.drain()
+    mv.obj[:] = b'\0' * len(blob)                  # drain 후에는 원본 버퍼를 바꿔도 저장된 내용은 그대로
+    store.flush()
+    assert len(store.pack_usage()) > 1
+    for h, data in chunks.items():
+        assert store.read(h) == data
+    store.close()
+
+def test_codec_round_trip(tmp_path):
+    chunks = _chunks(30, seed=3, text=True)
+    store = _open(tmp_path, codec=chunk_codec.ZLIB)
+    for h, data in chunks.items():
+        store.put(h, data)
+    store.flush(); store.close()
+    store = _open(tmp_path)
+    for h, data in chunks.items():
+        loc = store.locate(h)
+        assert loc[3] == chunk_codec.ZLIB and loc[2] < len(data)
+        assert store.read(h) == data
+    store.close()
+
+def test_copy_to_and_chunked_file(tmp_path):
+    chunks = _chunks(50, seed=4)
+    chunks.update(_chunks(10, seed=5, text=True))
+    store = _open(tmp_path, codec=chunk_codec.ZLIB)
+    for h, data in chunks.items():
+        store.put(h, data)
+    store.flush()
+    order = list(chunks) + list(chunks)[:5]        # 같은 청크를 여러 번 참조하는 매니페스트
+    expected = b''.join(chunks[h] for h in order)
+
+    out = tmp_path / 'out.bin'
+    fd = os.open(out, os.O_RDWR | os.O_CREAT)
+    pos = 0
+    for h in order:
+        pos += store.copy_to(h, fd, pos)
+    os.close(fd)
+    assert out.read_bytes() == expected
+
+    mf = str(tmp_path / 'm.bin')
+    manifest_bin.write(mf, [(h, len(chunks[h])) for h in order])
+    with store.open_manifest(mf, read_ahead=3000) as f:
+        assert f.read() == expected
+        f.seek(12345)
+        assert f.read(777) == expected[12345:12345 + 777]
+        f.seek(-10, os.SEEK_END)
+        assert f.read() == expected[-10:]
+    store.close()
+
+def test_worker_entries_merge(tmp_path):
+    shared = _chunks(20, seed=6)
+    only_a, only_b = _chunks(10, seed=7), _chunks(10, seed=8)
+    main = _open(tmp_path)
+    a, b = _open(tmp_path), _open(tmp_path)          # 워커마다 자기 pack에 씀
+    for h, data in {**shared, **only_a}.items():
+        assert a.put(h, data)
+    for h, data in {**shared, **only_b}.items():
+        assert b.put(h, data)
+    ea, eb = a.take_entries(), b.take_entries()
+    assert a.read(next(iter(shared))) == next(iter(shared.values()))   # 넘긴 항목도 워커에서 읽힘
+    a.close(); b.close()
+
+    assert main.add_entries(ea) == (30, sum(len(d) for d in {**shared, **only_a}.values()))
+    count, _ = main.add_entries(eb)
+    assert count == 10                                # 중복 digest는 먼저 병합된 쪽만
+    main.flush(); main.close()
+
+    store = _open(tmp_path)
+    everything = {**shared, **only_a, **only_b}
+    assert store.count == len(everything)
+    for h, data in everything.items():
+        assert store.read(h) == data
+    a_pack = ea[0][1]
+    assert all(store.locate(h)[0] == a_pack for h in shared)
+    store.close()
+
+def test_remove_then_compact(tmp_path):
+    chunks = _chunks(300, seed=9)
+    store = _open(tmp_path)
+    for h, data in chunks.items():
+        store.put(h, data)
+    store.flush()
+    names = list(chunks)
+    dead = {bytes.fromhex(h) for h in names[::2]}
+    removed, removed_bytes = store.remove(dead | {b'\0' * 32})
+    assert removed == len(dead)
+    assert removed_bytes == sum(len(chunks[d.hex()]) for d in dead)
+    usage = store.pack_usage()
+    live, size = usage[0]
+    assert size - live == removed_bytes
+
+    reclaimed = store.compact(list(usage))
+    assert reclaimed == removed_bytes
+    assert not os.path.exists(store.pack_path(0))
+    store.close()
+
+    store = _open(tmp_path)
+    assert store.count == len(chunks) - len(dead) and len(store.fp) == store.count
+    for h, data in chunks.items():
+        if bytes.fromhex(h) in dead:
+            assert not store.has(h)
+        else:
+            assert store.read(h) == data
+    assert sum(u[1] - u[0] for u in store.pack_usage().values()) == 0
+    h = names[0]
+    assert store.put(h, chunks[h])                   # 지운 청크는 다시 저장된다
+    store.flush()
+    assert store.read(h) == chunks[h]
+    store.close()
+
+def test_fingerprints_rebuilt_from_index(tmp_path):
+    chunks = _chunks(50, seed=10)
+    store = _open(tmp_path)
+    for h, data in chunks.items():
+        store.put(h, data)
+    store.flush(); store.close()
+    os.remove(tmp_path / 'fingerprints')            # 스냅샷이 없거나 index와 맞지 않으면 index에서 다시 만든다
+    store = _open(tmp_path)
+    assert len(store.fp) == len(chunks)
+    assert all(not store.put(h, data) for h, data in chunks.items())
+    store.close()
+
+def test_migrate_flat_dir(tmp_path):
+    chunks = _chunks(20, seed=11)
+    for h, data in chunks.items():
+        (tmp_path / h).write_bytes(data)
+    assert chunk_store.migrate_flat_dir(str(tmp_path)) == len(chunks)
+    assert not any(chunk_store.HEX_NAME.match(n) for n in os.listdir(tmp_path))
+    store = _open(tmp_path)
+    for h, data in chunks.items():
+        assert store.read(h) == data
+    store.close()
@@ -0,0 +1,88 @@
+import hashlib
+import pytest
+import fingerprint_index
+from fingerprint_index import FingerprintIndex, MIN_CAPACITY, MAX_LOAD
+
+# FingerprintIndex: 확장(_grow)을 넘나드는 add / contains, hit·miss 카운터 보존,
+# save → load 왕복, Bloom 끈 모드, Bloom 없이 저장된 파일을 Bloom 켜고 읽는 경우
+
+N = int(MIN_CAPACITY * MAX_LOAD) * 2 + 100          # 최소 두 번 확장
+
+def _digests(n, tag=b''):
+    return [hashlib.sha256(tag + i.to_bytes(4, 'little')).digest() for i in range(n)]
+
+DIGESTS = _digests(N)
+ABSENT = _digests(500, tag=b'absent')
+
+@pytest.mark.parametrize('bloom', [True, False])
+def test_add_and_contains_across_growth(bloom):
+    idx = FingerprintIndex(bloom=bloom)
+    for d in DIGESTS:
+        assert idx.add(d)
+        assert not idx.add(d)
+    assert len(idx) == N and idx.cap > MIN_CAPACITY and idx.dirty
+    assert (idx.bloom is not None) == bloom
+    assert all(idx.contains(d) for d in DIGESTS)
+    assert not any(idx.contains(d) for d in ABSENT)
+
+@pytest.mark.parametrize('bloom', [True, False])
+def test_stats_survive_growth(bloom):
+    idx = FingerprintIndex(bloom=bloom)
+    lookups = 0
+    for d in DIGESTS:                                # 파이프라인처럼 contains 후 add
+        assert not idx.contains(d)
+        idx.add(d)
+        assert idx.contains(d)
+        lookups += 2
+    for d in ABSENT:
+        idx.contains(d); lookups += 1
+    assert idx.cap > MIN_CAPACITY
+    s = idx.take_stats()
+    assert s['fp_hits'] == N
+    assert s['fp_hits'] + s['fp_misses'] == lookups
+    if bloom:
+        assert 0 < s['fp_bloom_skips'] <= s['fp_misses']
+    else:
+        assert s['fp_bloom_skips'] == 0
+    assert idx.take_stats() == {'fp_hits': 0, 'fp_misses': 0, 'fp_bloom_skips': 0}
+
+def test_for_items_does_not_grow():
+    idx = FingerprintIndex.for_items(N)
+    cap = idx.cap
+    for d in DIGESTS: idx.add(d)
+    assert idx.cap == cap
+
+@pytest.mark.parametrize('saved_bloom, load_bloom', [(True, True), (False, False), (False, True), (True, False)])
+def test_save_load_round_trip(tmp_path, saved_bloom, load_bloom):
+    path = str(tmp_path / 'fingerprints')
+    idx = FingerprintIndex(bloom=saved_bloom)
+    for d in DIGESTS: idx.add(d)
+    idx.save(path)
+    assert not idx.dirty
+    assert not (tmp_path / 'fingerprints.tmp').exists()
+
+    loaded = FingerprintIndex.load(path, load_bloom)
+    assert len(loaded) == N and loaded.cap == idx.cap
+    assert (loaded.bloom is not None) == load_bloom
+    assert loaded.dirty == (load_bloom and not saved_bloom)    # Bloom을 다시 만든 경우만 다시 저장 필요
+    assert all(loaded.contains(d) for d in DIGESTS)
+    assert not any(loaded.contains(d) for d in ABSENT)
+    extra = _digests(10, tag=b'extra')
+    for d in extra: assert loaded.add(d)
+    assert all(loaded.contains(d) for d in extra)
+
+def test_load_rejects_bad_files(tmp_path):
+    path = tmp_path / 'fingerprints'
+    assert FingerprintIndex.load(str(path)) is None
+    idx = FingerprintIndex()
+    for d in DIGESTS[:100]: idx.add(d)
+    idx.save(str(path))
+    raw = path.read_bytes()
+    path.write_bytes(b'XXXXXXXX' + raw[8:])
+    assert FingerprintIndex.load(str(path)) is None
+    path.write_bytes(raw[:fingerprint_index.HEADER.size + 1000])    # 테이블이 잘린 파일
+    assert FingerprintIndex.load(str(path)) is None
+
+def test_zero_digest_reserved():
+    with pytest.raises(ValueError):
+        FingerprintIndex().add(fingerprint_index.EMPTY)
@@ -0,0 +1,71 @@
+import os, json, hashlib, importlib.util
+import pytest
+import manifest_bin
+
+# test2 / test1 두 트리의 manifest_bin 복사본이 같은 형식을 쓰는지 확인 (한쪽만 고치면 여기서 깨짐)
+
+TEST1_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'test1', 'utils', 'manifest_bin.py')
+
+def _load_test1():
+    spec = importlib.util.spec_from_file_location('test1_manifest_bin', TEST1_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+other = _load_test1()
+
+ENTRIES = [(hashlib.sha256(bytes([i])).hexdigest(), 1000 + i * 37) for i in range(50)]
+NAMES = [f'chunk_{i:04d}.bin' for i in range(50)]
+
+def test_same_format_constants():
+    assert (manifest_bin.MAGIC, manifest_bin.VERSION) == (other.MAGIC, other.VERSION)
+    assert manifest_bin.BASE_VERSION == other.BASE_VERSION
+    assert manifest_bin.HEADER.format == other.HEADER.format
+    assert manifest_bin.RECORD.format == other.RECORD.format
+    assert manifest_bin.FLAG_NAMES == other.FLAG_NAMES
+
+@pytest.mark.parametrize('names', [None, NAMES], ids=['digests', 'names'])
+def test_same_bytes(names):
+    assert manifest_bin.encode(ENTRIES, names) == other.encode(ENTRIES, names)
+
+@pytest.mark.parametrize('writer,reader', [(manifest_bin, other), (other, manifest_bin)],
+                         ids=['test2-to-test1', 'test1-to-test2'])
+def test_read_each_other(tmp_path, writer, reader):
+    path = str(tmp_path / 'm.bin')
+    total = writer.write(path, ENTRIES, NAMES)
+    assert total == sum(size for _, size in ENTRIES)
+    assert reader.load_entries(path) == ([d for d, _ in ENTRIES], [size for _, size in ENTRIES])
+    with reader.Manifest.open(path) as m:
+        assert m.names() == NAMES
+        assert m.total_size == total
+        assert [off for _, _, off in m][-1] == total - ENTRIES[-1][1]
+
+def test_test2_reads_codec_table(tmp_path):
+    """test1 서버가 쓰는 codec 테이블(압축된 청크)이 있어도 레코드 / 이름은 그대로 읽힌다"""
+    path = str(tmp_path / 'm.bin')
+    other.write(path, ENTRIES, NAMES, codecs=[i % 3 for i in range(len(ENTRIES))])
+    with manifest_bin.Manifest.open(path) as m:
+        assert m.version == manifest_bin.VERSION
+        assert m.hexdigests() == [d for d, _ in ENTRIES]
+        assert m.names() == NAMES
+
+def test_codec_table_bumps_version():
+    """codec 테이블이 있을 때만 version 2: 없으면 이전 reader(version 1)도 읽는다"""
+    plain = other.Manifest(other.encode(ENTRIES, NAMES))
+    assert plain.version == other.BASE_VERSION and plain.codecs() is None
+    coded = other.Manifest(other.encode(ENTRIES, NAMES, codecs=[1] * len(ENTRIES)))
+    assert coded.version == other.VERSION > other.BASE_VERSION
+    assert manifest_bin.Manifest(manifest_bin.encode(ENTRIES, NAMES)).version == manifest_bin.BASE_VERSION
+
+def test_json_fallback(tmp_path):
+    path = str(tmp_path / 'm.json')
+    with open(path, 'w') as f:
+        json.dump([d for d, _ in ENTRIES], f)
+    assert not manifest_bin.is_binary(path)
+    assert manifest_bin.load_entries(path) == ([d for d, _ in ENTRIES], None)
+
+def test_rejects_newer_version():
+    data = bytearray(manifest_bin.encode(ENTRIES))
+    data[8:10] = (manifest_bin.VERSION + 1).to_bytes(2, 'little')
+    with pytest.raises(ValueError):
+        manifest_bin.Manifest(bytes(data))
@@ -0,0 +1,114 @@
+import os, json, time, hashlib
+import pytest
+import manifest_bin
+import manifest_cache
+
+# ManifestCache: put → lookup 왕복, 짝이 맞지 않는 매니페스트 / .json 거부, 빠진 청크, prune 크기 / 기간 상한
+
+PARAMS = manifest_cache.chunker_params('aecdc-gear', 64, 256, 1024, 48, 'max')
+
+class _Store:
+    def __init__(self, hashes=()): self.hashes = set(hashes)
+    def has(self, h): return h in self.hashes
+
+def _source(tmp_path, name, data):
+    blobs = tmp_path / 'blobs' / 'sha256'
+    blobs.mkdir(parents=True, exist_ok=True)
+    path = blobs / name
+    path.write_bytes(data)
+    return str(path)
+
+def _manifest(tmp_path, data, parts, name='m.bin'):
+    step = -(-len(data) // parts)
+    pieces = [data[i:i + step] for i in range(0, len(data), step)]
+    hashes = [hashlib.sha256(p).hexdigest() for p in pieces]
+    path = str(tmp_path / name)
+    manifest_bin.write(path, zip(hashes, map(len, pieces)))
+    return path, hashes, [len(p) for p in pieces]
+
+@pytest.fixture
+def cache(tmp_path):
+    return manifest_cache.ManifestCache(str(tmp_path / 'cache'), PARAMS)
+
+def test_put_lookup_round_trip(tmp_path, cache):
+    data = os.urandom(5000)
+    src = _source(tmp_path, hashlib.sha256(data).hexdigest(), data)
+    mf, hashes, sizes = _manifest(tmp_path, data, 4)
+    out = str(tmp_path / 'out.bin')
+    assert cache.lookup(src, out, _Store(hashes)) is None
+    cache.put(src, mf, 1.5)
+    assert cache.lookup(src, out, _Store(hashes)) == (hashes, sizes, 1.5)
+    assert open(out, 'rb').read() == open(mf, 'rb').read()
+    assert cache.lookup(src, out, _Store(hashes[1:])) is None                  # 빠진 청크
+    other = manifest_cache.ManifestCache(cache.root, PARAMS.replace('max', 'min'))
+    assert other.lookup(src, out, _Store(hashes)) is None                      # 다른 청커 파라미터
+    assert not [n for n in os.listdir(cache.root) if n.endswith('.tmp')]
+
+def test_mismatched_pair_is_a_miss(tmp_path, cache):
+    """두 put의 os.replace가 엇갈려 다른 매니페스트와 .json이 짝지어진 경우"""
+    data = os.urandom(5000)
+    src = _source(tmp_path, hashlib.sha256(data).hexdigest(), data)
+    mf_a, hashes_a, _ = _manifest(tmp_path, data, 4, 'a.bin')
+    mf_b, hashes_b, _ = _manifest(tmp_path, data, 5, 'b.bin')
+    cache.put(src, mf_a, 1.0)
+    entry = cache.entries()[0]
+    meta_a = open(entry + '.json').read()
+    cache.put(src, mf_b, 2.0)
+    with open(entry + '.json', 'w') as w: w.write(meta_a)                      # 매니페스트는 b, .json은 a
+    store = _Store(hashes_a + hashes_b)
+    assert cache.lookup(src, str(tmp_path / 'out.bin'), store) is None
+    meta = json.loads(meta_a)
+    del meta['manifest']                                                       # 이전 형식의 .json
+    with open(entry + '.json', 'w') as w: json.dump(meta, w)
+    assert cache.lookup(src, str(tmp_path / 'out.bin'), store) is None
+    cache.put(src, mf_b, 2.0)
+    assert cache.lookup(src, str(tmp_path / 'out.bin'), store)[0] == hashes_b
+
+def test_stat_key_changes_with_file(tmp_path, cache):
+    path = tmp_path / 'index.json'
+    path.write_bytes(b'{"a": 1}' * 100)
+    mf, hashes, _ = _manifest(tmp_path, path.read_bytes(), 2)
+    cache.put(str(path), mf, 0.1)
+    assert cache.lookup(str(path), str(tmp_path / 'o'), _Store(hashes)) is not None
+    path.write_bytes(b'{"a": 2}' * 100)
+    os.utime(path, ns=(0, time.time_ns() + 10**9))
+    assert cache.lookup(str(path), str(tmp_path / 'o'), _Store(hashes)) is None
+
+def _fill(tmp_path, cache, n):
+    entries = []
+    for i in range(n):
+        data = os.urandom(3000)
+        src = _source(tmp_path, hashlib.sha256(data).hexdigest(), data)
+        mf, hashes, _ = _manifest(tmp_path, data, 3)
+        cache.put(src, mf, 0.0)
+        entry = cache._entry(src, os.stat(src))[1]
+        os.utime(entry + '.json', (time.time() - (n - i) * 100,) * 2)         # 뒤로 갈수록 최근 사용
+        entries.append((src, entry, hashes))
+    return entries
+
+def test_prune_by_age_and_size(tmp_path, cache):
+    entries = _fill(tmp_path, cache, 6)
+    one = os.path.getsize(entries[0][1]) + os.path.getsize(entries[0][1] + '.json')
+    assert cache.prune(0, 0) == (0, 0)                                         # 상한 없음
+    assert cache.prune(0, 350) == (3, 3 * one)                                 # 350 s보다 오래된 3개
+    assert sorted(cache.entries()) == sorted(e for _, e, _ in entries[3:])
+    # 가장 오래된 항목을 히트시키면 최근 사용이 되어 크기 상한에서 살아남는다
+    src, entry, hashes = entries[3]
+    assert cache.lookup(src, str(tmp_path / 'o'), _Store(hashes)) is not None
+    assert cache.prune(2 * one, 0) == (1, one)
+    assert sorted(cache.entries()) == sorted([entry, entries[5][1]])
+
+def test_prune_removes_leftovers(tmp_path, cache):
+    entries = _fill(tmp_path, cache, 2)
+    root = cache.root
+    old = time.time() - 2 * manifest_cache.STALE_TMP
+    leftovers = [os.path.join(root, 'a' * 64 + '.123.tmp'), os.path.join(root, 'b' * 64),
+                 os.path.join(root, 'c' * 64 + '.json')]
+    for p in leftovers:
+        open(p, 'w').write('x')
+        os.utime(p, (old, old))
+    fresh = os.path.join(root, 'd' * 64 + '.json.7.tmp')                      # 진행 중인 put일 수 있음
+    open(fresh, 'w').write('x')
+    assert cache.prune(0, 0) == (0, 3)
+    assert not any(os.path.exists(p) for p in leftovers) and os.path.exists(fresh)
+    assert len(cache.entries()) == len(entries)
@@ -0,0 +1,106 @@
+import os, hashlib
+import pytest
+import chunk_store
+import refcount
+
+# RefIndex: 이미지 두 개가 공유하는 청크는 한쪽을 지워도 남고, gc는 pending 중 지금도 참조 0인 청크만 지운다
+# rebuild는 어느 이미지도 참조하지 않는 청크(refcount 이전 / 중단된 실행)를 pending에 넣는다
+
+def _chunks(tag, n):
+    out = {}
+    for i in range(n):
+        data = hashlib.sha256(f'{tag}{i}'.encode()).digest() * (20 + i)
+        out[hashlib.sha256(data).hexdigest()] = data
+    return out
+
+SHARED, ONLY_A, ONLY_B = _chunks('s', 10), _chunks('a', 8), _chunks('b', 6)
+
+def _entries(*groups):
+    return [(h, len(d)) for g in groups for h, d in g.items()]
+
+@pytest.fixture
+def setup(tmp_path):
+    store = chunk_store.PackStore(str(tmp_path))
+    for g in (SHARED, ONLY_A, ONLY_B):
+        for h, d in g.items(): store.put(h, d)
+    store.flush()
+    refs = refcount.RefIndex(str(tmp_path))
+    assert refs.set_image('a', _entries(SHARED, ONLY_A) + _entries(SHARED)) == (len(SHARED) + len(ONLY_A), 0)
+    assert refs.set_image('b', _entries(SHARED, ONLY_B)) == (len(SHARED) + len(ONLY_B), 0)
+    yield tmp_path, store, refs
+    store.close()
+
+def _digest(h): return bytes.fromhex(h)
+
+def test_counts(setup):
+    _, _, refs = setup
+    assert refs.images() == ['a', 'b']
+    assert all(refs.counts[_digest(h)] == 2 for h in SHARED)
+    assert all(refs.counts[_digest(h)] == 1 for h in {**ONLY_A, **ONLY_B})
+    assert refs.pending() == set()
+
+def test_shared_chunk_survives_removing_one_image(setup):
+    tmp_path, store, refs = setup
+    assert refs.remove_image('a') == (0, len(ONLY_A))
+    assert refs.pending() == {_digest(h) for h in ONLY_A}
+    r = refs.gc(store, compact_ratio=1.1)
+    assert r['removed_chunks'] == len(ONLY_A)
+    assert r['removed_bytes'] == sum(map(len, ONLY_A.values()))
+    assert refs.pending() == set()
+    for h, d in {**SHARED, **ONLY_B}.items():
+        assert store.read(h) == d
+    assert not any(store.has(h) for h in ONLY_A)
+
+    reopened = refcount.RefIndex(str(tmp_path))
+    assert reopened.images() == ['b'] and not reopened.fresh
+    assert all(reopened.counts[_digest(h)] == 1 for h in SHARED)
+    du = reopened.du(store)['b']                    # 이제 공유 청크도 b만 참조
+    assert du['shared'] == 0 and du['chunks'] == len(SHARED) + len(ONLY_B)
+    assert du['unique'] == du['logical'] == sum(map(len, {**SHARED, **ONLY_B}.values()))
+
+def test_gc_removes_only_zero_ref_pending(setup):
+    tmp_path, store, refs = setup
+    refs.remove_image('a')
+    revived = dict(list(ONLY_A.items())[:3])
+    refs.set_image('c', _entries(revived))          # pending에 있지만 다시 참조됨
+    orphan = _chunks('o', 4)                         # 참조 0이지만 pending에 없음 (rebuild 전에는 건드리지 않음)
+    for h, d in orphan.items(): store.put(h, d)
+    store.flush()
+    r = refs.gc(store)
+    assert r['removed_chunks'] == len(ONLY_A) - len(revived)
+    for h, d in {**SHARED, **ONLY_B, **revived, **orphan}.items():
+        assert store.read(h) == d
+    assert not any(store.has(h) for h in ONLY_A if h not in revived)
+    assert refs.gc(store)['removed_chunks'] == 0    # pending을 비웠으므로 두 번째 gc는 아무것도 지우지 않음
+
+def test_reregister_changes_only_difference(setup):
+    _, store, refs = setup
+    kept = dict(list(ONLY_A.items())[:5])
+    added = _chunks('a2', 3)
+    for h, d in added.items(): store.put(h, d)
+    assert refs.set_image('a', _entries(SHARED, kept, added)) == (len(added), len(ONLY_A) - len(kept))
+    refs.gc(store)
+    assert all(store.has(h) for h in {**SHARED, **kept, **added, **ONLY_B})
+    assert not any(store.has(h) for h in ONLY_A if h not in kept)
+
+def test_gc_compacts_mostly_dead_packs(setup):
+    _, store, refs = setup
+    refs.remove_image('a'); refs.remove_image('b')
+    r = refs.gc(store, compact_ratio=0.5)
+    assert r['removed_chunks'] == len(SHARED) + len(ONLY_A) + len(ONLY_B)
+    assert r['compacted_packs'] == 1 and r['reclaimed_bytes'] == r['removed_bytes']
+    assert store.pack_usage() == {} or all(live == size for live, size in store.pack_usage().values())
+
+def test_rebuild_queues_unreferenced_chunks(setup):
+    tmp_path, store, refs = setup
+    orphan = _chunks('o', 5)
+    for h, d in orphan.items(): store.put(h, d)
+    store.flush()
+    os.remove(refs.counts_path)                     # counts가 없거나 어긋난 경우 (중단된 실행)
+    refs = refcount.RefIndex(str(tmp_path))
+    assert refs.fresh and refs.counts == {}
+    assert refs.rebuild(store) == len(orphan)
+    assert all(refs.counts[_digest(h)] == 2 for h in SHARED)
+    assert refs.gc(store)['removed_chunks'] == len(orphan)
+    assert not any(store.has(h) for h in orphan)
+    assert all(store.has(h) for h in {**SHARED, **ONLY_A, **ONLY_B})
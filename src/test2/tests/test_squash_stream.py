@@ -0,0 +1,150 @@
+import io, os, sys, random, shutil, hashlib, tarfile
+import pytest
+import container_dedup
+import container_dedup_metrics
+from layer_plan import clean_path
+
+# IMPORT_MODE=stream(레이어 tar → squash 스트림)이 IMPORT_MODE=rootfs(병합 후 `tar -C _merged_rootfs -cf - .`)와
+# 같은 tar를 podman import에 넘기는지 확인 (podman 대신 stdin을 파일로 받아 두는 로컬 stub)
+
+MTIME = 1700000000
+# rootfs 추출은 root가 아니면 소유자를 바꾸지 못하므로(추출한 사용자 소유가 됨) uid/gid는 root일 때만 비교
+AS_ROOT = hasattr(os, 'geteuid') and os.geteuid() == 0
+
+# (이름, 종류, 내용 / 링크 대상, mode)
+LAYERS = [
+    [
+        ('usr/', 'dir', None, 0o755),
+        ('usr/bin/', 'dir', None, 0o755),
+        ('usr/bin/a', 'file', b'old a', 0o644),
+        ('usr/rm', 'file', b'removed later', 0o644),
+        ('etc/', 'dir', None, 0o750),
+        ('etc/conf', 'file', b'conf', 0o644),
+        ('etc/sub/', 'dir', None, 0o755),
+        ('etc/sub/x', 'file', b'x', 0o600),
+        ('opt/d/', 'dir', None, 0o755),
+        ('opt/d/x', 'file', b'dx' * 1000, 0o644),
+        ('home/u/f', 'file', b'f1', 0o644),            # 상위 디렉토리 항목 없음, 다음 레이어에서 덮어씀
+        ('srv/x/y', 'file', b'y', 0o644),              # 상위 디렉토리 항목 없음, 마지막 레이어에서 whiteout
+        ('keep/me/z', 'file', b'z', 0o644),            # 상위 디렉토리 항목 없음, 끝까지 남음
+        ('var/', 'dir', None, 0o700),
+        ('var/log', 'file', b'log', 0o640),
+        ('link', 'sym', 'usr/bin/a', 0o777),
+        ('bin/', 'dir', None, 0o755),
+        ('bin/tool', 'file', random.Random(0).randbytes(300000), 0o755),
+    ],
+    [
+        ('usr/.wh.rm', 'file', b'', 0o644),
+        ('usr/bin/a', 'file', b'new a', 0o700),
+        ('etc/.wh..wh..opq', 'file', b'', 0o644),
+        ('etc/new', 'file', b'new', 0o644),
+        ('opt/.wh.d', 'file', b'', 0o644),
+        ('home/u/f', 'file', b'f2', 0o644),
+        ('var/', 'dir', None, 0o711),
+    ],
+    [
+        ('tmp/.wh.gone', 'file', b'', 0o644),
+        ('srv/x/.wh.y', 'file', b'', 0o644),
+        ('new/deep/file', 'file', b'deep', 0o644),
+    ],
+]
+
+def _layer_tar(members) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w', format=tarfile.PAX_FORMAT) as t:
+        for name, kind, data, mode in members:
+            ti = tarfile.TarInfo(name)
+            ti.mode, ti.mtime = mode, MTIME
+            if kind == 'dir':
+                ti.type = tarfile.DIRTYPE
+                t.addfile(ti)
+            elif kind == 'sym':
+                ti.type, ti.linkname = tarfile.SYMTYPE, data
+                t.addfile(ti)
+            else:
+                ti.size = len(data)
+                t.addfile(ti, io.BytesIO(data))
+    return buf.getvalue()
+
+def _entries(path: str) -> dict:
+    """
+    tar 항목 → 비교용 속성. rootfs 자체('.')는 제외
+    디렉토리는 안에 파일을 추출할 때 mtime이 바뀌고, tarfile은 심볼릭 링크 mtime을 설정하지 않으므로 둘은 mtime을 보지 않는다
+    uid/gid는 AS_ROOT일 때만 본다
+    """
+    out = {}
+    with tarfile.open(path, 'r:') as t:
+        for m in t:
+            name = clean_path(m.name)
+            if not name: continue
+            assert name not in out, f"duplicate entry: {name}"
+            e = {'type': m.type, 'mode': m.mode}
+            if AS_ROOT: e['uid'], e['gid'] = m.uid, m.gid
+            if m.isreg():
+                e['size'] = m.size
+                e['sha256'] = hashlib.sha256(t.extractfile(m).read()).hexdigest()
+                e['mtime'] = m.mtime
+            elif m.issym():
+                e['linkname'] = m.linkname
+            out[name] = e
+    return out
+
+@pytest.fixture
+def oci(tmp_path):
+    old = os.umask(0o022)       # 추출 시 암묵적으로 만들어지는 디렉토리 mode(0755)를 고정
+    reassembled = tmp_path / 'reassembled_oci'
+    blobs = reassembled / 'blobs' / 'sha256'
+    blobs.mkdir(parents=True)
+    layers = []
+    for members in LAYERS:
+        data = _layer_tar(members)
+        dg = hashlib.sha256(data).hexdigest()
+        (blobs / dg).write_bytes(data)
+        layers.append(dg)
+    yield tmp_path, reassembled, layers
+    os.umask(old)
+
+def _patch(monkeypatch, mod, tmp_path, reassembled, out, merge_mode='plan'):
+    stub = [sys.executable, '-c',
+            'import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], "wb"))', str(out)]
+    monkeypatch.setattr(mod, 'REASSEMBLED_DIR', str(reassembled))
+    monkeypatch.setattr(mod, 'MERGED_ROOTFS_DIR', str(reassembled / '_merged_rootfs'))
+    monkeypatch.setattr(mod, 'PODMAN_IMPORT', stub)
+    monkeypatch.setattr(mod, 'MERGE_MODE', merge_mode)
+
+def _rootfs_tar(mod, monkeypatch, tmp_path, reassembled, layers, merge_mode):
+    out = tmp_path / f'rootfs-{merge_mode}.tar'
+    _patch(monkeypatch, mod, tmp_path, reassembled, out, merge_mode)
+    mod.merge_layers(layers)
+    mod.import_image()
+    return _entries(str(out))
+
+def _stream_tar(mod, monkeypatch, tmp_path, reassembled, layers):
+    out = tmp_path / 'stream.tar'
+    _patch(monkeypatch, mod, tmp_path, reassembled, out)
+    assert mod.import_squashed(layers) not in (None, False)
+    return _entries(str(out))
+
+@pytest.mark.skipif(shutil.which('tar') is None, reason='IMPORT_MODE=rootfs needs the tar binary')
+@pytest.mark.parametrize('mod', [container_dedup, container_dedup_metrics], ids=lambda m: m.__name__)
+@pytest.mark.parametrize('merge_mode', ['sequential', 'plan'])
+def test_stream_matches_rootfs_tar(oci, monkeypatch, mod, merge_mode):
+    tmp_path, reassembled, layers = oci
+    expected = _rootfs_tar(mod, monkeypatch, tmp_path, reassembled, layers, merge_mode)
+    got = _stream_tar(mod, monkeypatch, tmp_path, reassembled, layers)
+    assert sorted(got) == sorted(expected)
+    for name in expected:
+        assert got[name] == expected[name], name
+
+def test_fixture_covers_layer_rules(oci, monkeypatch):
+    tmp_path, reassembled, layers = oci
+    got = _stream_tar(container_dedup, monkeypatch, tmp_path, reassembled, layers)
+    assert 'usr/rm' not in got                                  # whiteout
+    assert 'etc/conf' not in got and 'etc/sub' not in got       # opaque 디렉토리
+    assert 'etc/new' in got and got['etc']['mode'] == 0o750
+    assert 'opt/d' not in got and 'opt' in got                  # 디렉토리 whiteout
+    assert got['usr/bin/a']['mode'] == 0o700                    # 덮어쓰기
+    assert got['var']['mode'] == 0o711
+    assert 'srv/x' in got and 'srv/x/y' not in got              # 지워진 멤버가 남긴 상위 디렉토리
+    for d in ('home', 'home/u', 'keep', 'keep/me', 'new', 'new/deep'):
+        assert got[d]['type'] == tarfile.DIRTYPE                # 항목 없이 암묵적으로 생기는 상위 디렉토리